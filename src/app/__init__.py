@@ -54,6 +54,12 @@ def create_app(config_name=None):
         from flask_wtf.csrf import generate_csrf
         return dict(csrf_token=lambda: generate_csrf())
 
+    @app.context_processor
+    def inject_chart_src():
+        """Make chart_src() available in templates: a chart inlined as data URI, or its download URL."""
+        from app.charts import chart_src
+        return dict(chart_src=chart_src)
+
     # Load configurations
     from app.utils.config import configure_app
     configure_app(app)
@@ -85,6 +91,10 @@ def create_app(config_name=None):
     # Register cleanup functions
     TemporaryFileManager.register_cleanup(app)
 
+    # Start the chart render workers now, so the first upload does not wait for them
+    from app.charts import start_render_pool
+    start_render_pool()
+
     # Configure limiter at the end
     try:
         # Using in-memory storage for rate limiting to ensure no persistent data is stored,
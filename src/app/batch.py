@@ -0,0 +1,147 @@
+"""
+Offline batch processing of donated data exports.
+
+Runs the YouTube, TikTok and Instagram pipelines over a directory tree of
+exports, without a web server:
+
+    PYTHONPATH=src python -m app.batch INPUT_DIR OUTPUT_DIR [--workers N]
+
+Every directory holding JSON files is treated as one donation; its files are
+grouped by platform (recognised from their content) and each group is processed
+by the same handler code the dashboards use, in a pool of worker processes.
+For a donation in INPUT_DIR/<path>, OUTPUT_DIR/<path>/<platform>/ receives the
+charts, the exports and insights.json with the aggregates.
+"""
+import os
+import io
+import sys
+import json
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from werkzeug.datastructures import FileStorage
+
+from app.utils.output_sink import DirectorySink
+
+logger = logging.getLogger(__name__)
+
+# Top-level keys of the Instagram activity files the Instagram handler reads
+INSTAGRAM_KEY_PREFIXES = ('saved_', 'likes_', 'impressions_history_', 'relationships_')
+TIKTOK_KEYS = {'Activity', 'Your Activity', 'Watch History'}
+
+def _handlers():
+    # Imported in the worker, so only processes that process files load pandas and Matplotlib
+    from app.handlers.youtube import process_youtube_file
+    from app.handlers.tiktok import process_tiktok_file
+    from app.handlers.instagram import process_instagram_file
+    return {'youtube': process_youtube_file, 'tiktok': process_tiktok_file, 'instagram': process_instagram_file}
+
+def detect_platform(path: str) -> Optional[str]:
+    """Platform of an export file, recognised from the shape of its JSON, or None."""
+    try:
+        with open(path, 'rb') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if isinstance(data, list):
+        return 'youtube'
+    if isinstance(data, dict):
+        if TIKTOK_KEYS & data.keys():
+            return 'tiktok'
+        if any(key.startswith(INSTAGRAM_KEY_PREFIXES) for key in data):
+            return 'instagram'
+    return None
+
+def find_jobs(input_dir: str) -> List[Tuple[str, str, List[str]]]:
+    """(relative donation directory, platform, file paths) for every donation in input_dir."""
+    jobs = []
+    for directory, _, filenames in sorted(os.walk(input_dir)):
+        by_platform: Dict[str, List[str]] = {}
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.json'):
+                path = os.path.join(directory, filename)
+                platform = detect_platform(path)
+                if platform:
+                    by_platform.setdefault(platform, []).append(path)
+        relative = os.path.relpath(directory, input_dir)
+        jobs.extend((relative, platform, paths) for platform, paths in sorted(by_platform.items()))
+    return jobs
+
+def process_export(platform: str, paths: List[str], output_dir: str) -> Dict:
+    """Run platform's pipeline on paths, writing charts, exports and insights.json to output_dir."""
+    files = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            files.append(FileStorage(stream=io.BytesIO(f.read()), filename=os.path.basename(path),
+                                     content_type='application/json'))
+
+    # The sink writes the charts and builds the exports (as '<platform>.<ext>') straight into output_dir
+    result = _handlers()[platform](files, DirectorySink(output_dir))
+
+    # Generated chart names are random; give them stable, descriptive ones
+    charts = {chart: _rename(output_dir, name, f"{chart}.{name.rsplit('.', 1)[1]}")
+              for chart, name in result.charts.items() if name}
+
+    summary = {
+        'platform': platform,
+        'files': [os.path.basename(path) for path in paths],
+        'insights': result.insights,
+        'charts': charts,
+        'exports': list(result.exports.values()),
+    }
+    with open(os.path.join(output_dir, 'insights.json'), 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    return summary
+
+def _rename(directory: str, name: str, new_name: str) -> str:
+    os.replace(os.path.join(directory, name), os.path.join(directory, new_name))
+    return new_name
+
+def run(input_dir: str, output_dir: str, workers: int = 1) -> List[Dict]:
+    """Process every donation in input_dir; returns a summary per job (with 'error' for failed ones)."""
+    jobs = find_jobs(input_dir)
+    logger.info(f"Processing {len(jobs)} export(s) from {input_dir} with {workers} worker(s)")
+    targets = [os.path.join(output_dir, relative, platform) for relative, platform, _ in jobs]
+
+    summaries: List[Optional[Dict]] = [None] * len(jobs)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(process_export, platform, paths, target): i
+                       for i, ((_, platform, paths), target) in enumerate(zip(jobs, targets))}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    summaries[i] = future.result()
+                except Exception as e:
+                    summaries[i] = {'platform': jobs[i][1], 'error': str(e)}
+    else:
+        for i, ((_, platform, paths), target) in enumerate(zip(jobs, targets)):
+            try:
+                summaries[i] = process_export(platform, paths, target)
+            except Exception as e:
+                summaries[i] = {'platform': platform, 'error': str(e)}
+
+    for (relative, platform, _), summary in zip(jobs, summaries):
+        summary['output'] = os.path.join(output_dir, relative, platform)
+        if 'error' in summary:
+            logger.error(f"{relative} ({platform}) failed: {summary['error']}")
+    return summaries
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.batch', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input_dir', help="directory tree of exports, one donation per directory")
+    parser.add_argument('output_dir', help="directory the results are written to")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    summaries = run(args.input_dir, args.output_dir, max(1, args.workers))
+    failed = sum('error' in summary for summary in summaries)
+    print(f"Processed {len(summaries) - failed} of {len(summaries)} export(s) into {args.output_dir}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,597 @@
+"""
+Chart rendering shared by all platform handlers.
+
+Handlers describe a chart as a plain dict spec and call render_chart(), e.g.
+
+    render_chart({'type': 'heatmap', 'data': counts_frame, 'size': (8, 2), 'fmt': 'd'})
+
+Every chart type has a drawing function in CHART_TYPES and an rcParams style
+context in STYLE_CONTEXTS, applied while the chart is drawn and saved. Figures
+are Agg figures created without pyplot and reused per thread and chart type, so
+a render only clears and resizes an existing figure instead of building a new
+figure, canvas and figure manager. Rendering optimisations belong here.
+
+render_charts() renders all charts of an upload at once, in a pool of warm worker
+processes when more than one CPU is available; workers return the encoded images.
+Each chart is drawn once on the Agg canvas and encoded by Pillow (see encode_image),
+and rendered images are cached per session by content (see chart_fingerprint).
+The images are stored by an OutputSink, the session's artifact stores by default.
+"""
+import io
+import os
+import base64
+import hashlib
+import uuid
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import matplotlib
+
+# Use 'Agg' backend to avoid GUI issues
+matplotlib.use('Agg')
+
+import matplotlib.patches as patches
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import Normalize, to_rgba
+from matplotlib.figure import Figure, SubplotParams
+from matplotlib.path import Path
+import squarify
+from PIL import Image, features
+
+from flask import url_for
+
+from app.utils.artifact_store import get_memory_artifact
+from app.utils.chart_cache import cache_session_chart, get_session_charts
+from app.utils.output_sink import OutputSink, SessionSink
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+TIME_RANGES = ['12-4 AM', '4-8 AM', '8-12 PM', '12-4 PM', '4-8 PM', '8-12 AM']
+
+IMAGE_MIMETYPES = {'png': 'image/png', 'webp': 'image/webp'}
+
+# Resolution charts are saved at unless a spec sets 'dpi'
+DEFAULT_DPI = 100
+
+# Charts are encoded by Pillow from a single Agg draw: 'png' or (lossless) 'webp'
+CHART_IMAGE_FORMAT = os.getenv('CHART_IMAGE_FORMAT', 'png').lower()
+if CHART_IMAGE_FORMAT not in IMAGE_MIMETYPES or (CHART_IMAGE_FORMAT == 'webp' and not features.check('webp')):
+    logger.warning(f"Chart image format {CHART_IMAGE_FORMAT} is not available, using png")
+    CHART_IMAGE_FORMAT = 'png'
+
+# zlib level of PNG charts: 1 is fastest, 9 smallest
+CHART_PNG_COMPRESSION = int(os.getenv('CHART_PNG_COMPRESSION', '6'))
+
+# If set, PNG charts are quantised to a palette of this many colours (at most 256)
+CHART_PNG_COLORS = int(os.getenv('CHART_PNG_COLORS', '0'))
+
+# Dashboards embed charts up to this size as data URIs instead of linking to download_image
+INLINE_CHARTS = os.getenv('INLINE_CHARTS', 'true').lower() == 'true'
+INLINE_CHART_MAX_BYTES = int(os.getenv('INLINE_CHART_MAX_KB', '512')) * 1024
+
+# Background kept around the drawn content of a chart
+PAD_INCHES = 0.1
+
+# Worker processes rendering the charts of one upload concurrently (capped at the CPU
+# count); with fewer than two, charts are rendered inline in the request thread
+CHART_RENDER_WORKERS = int(os.getenv('CHART_RENDER_WORKERS', '4'))
+
+_NO_SPINES = {f'axes.spines.{side}': False for side in ('left', 'right', 'top', 'bottom')}
+_NO_TICKS = {
+    'xtick.major.size': 0, 'xtick.minor.size': 0,
+    'ytick.major.size': 0, 'ytick.minor.size': 0,
+}
+
+# rcParams applied while a chart of each type is drawn and saved
+STYLE_CONTEXTS: Dict[str, Dict] = {
+    'heatmap': {**_NO_SPINES, **_NO_TICKS, 'axes.grid': False},
+    'bump': {**_NO_SPINES, 'axes.grid': False},
+    'treemap': {**_NO_SPINES, **_NO_TICKS, 'axes.grid': False},
+    'stacked_bar': {
+        'axes.spines.top': False, 'axes.spines.right': False,
+        'ytick.major.size': 0, 'ytick.minor.size': 0, 'legend.frameon': False,
+    },
+}
+
+# --- Chart data ---
+
+def day_of_week_counts(timestamps: pd.Series) -> pd.Series:
+    """Number of events per weekday, Monday first (NaN for weekdays without events)."""
+    return pd.to_datetime(timestamps).dt.day_name().value_counts().reindex(DAY_NAMES)
+
+def time_range_counts(timestamps: pd.Series) -> pd.Series:
+    """Number of events per four-hour range of the day (NaN for empty ranges)."""
+    hours = pd.to_datetime(timestamps).dt.hour
+    return hours.map(dict(enumerate(np.repeat(TIME_RANGES, 4)))).value_counts().reindex(TIME_RANGES)
+
+def year_month_counts(timestamps: pd.Series) -> pd.DataFrame:
+    """Events per year (rows) and month (columns, named Jan-Dec); only months with events are included."""
+    timestamps = pd.to_datetime(timestamps)
+    counts = pd.crosstab(timestamps.dt.year.rename('year'), timestamps.dt.month.rename('month'))
+    counts.columns = [MONTH_NAMES[m - 1] for m in counts.columns]
+    return counts
+
+def as_row(counts: pd.Series, name: str = 'Count') -> pd.DataFrame:
+    """A single-row frame for heatmaps of one series (one column per index value)."""
+    return pd.DataFrame([counts.to_numpy()], index=[name], columns=counts.index)
+
+# --- Chart types ---
+
+def _annotation_colours(rgba: np.ndarray) -> np.ndarray:
+    """Dark text on light cells and white text on dark ones, by W3C relative luminance."""
+    rgb = rgba[..., :3]
+    rgb = np.where(rgb <= .03928, rgb / 12.92, ((rgb + .055) / 1.055) ** 2.4)
+    luminance = rgb @ np.array([.2126, .7152, .0722])
+    return np.where(luminance > .408, '.15', 'w')
+
+def _labels_fit(labels, cell_inches: float, font_size: float) -> bool:
+    """Rough check (without drawing the figure) whether labels fit along cells of the given size."""
+    # Average glyph width is a bit over half the font size; 72 points per inch
+    longest = max((len(label) for label in labels), default=0)
+    return longest * font_size * 0.6 / 72 <= cell_inches
+
+def _draw_heatmap(fig: Figure, spec: Dict) -> None:
+    """
+    Annotated heatmap of spec['data'] (a DataFrame); missing values are left blank.
+
+    Drawn directly as a QuadMesh with one text per cell, laid out like the seaborn
+    heatmaps the dashboards used before (cells in matrix order, centred tick
+    labels, vertical row labels where they fit, white annotations on dark cells).
+    The figure is persistent: the Axes, mesh and texts of the previous heatmap
+    are updated in place instead of being rebuilt.
+    Optional keys: fmt ('d'), xlabel, ylabel, annot_size, label_size, pad (tight_layout).
+    """
+    data = spec['data']
+    values = np.ma.masked_invalid(data.to_numpy(dtype=float))
+    rows, cols = values.shape
+    fmt = spec.get('fmt', 'd')
+
+    cmap = matplotlib.colormaps['Blues']
+    norm = Normalize(values.min(), values.max()) if values.count() else Normalize(0, 1)
+    if fig.axes:
+        ax = fig.axes[0]
+        mesh = ax.collections[0]
+    else:
+        ax = fig.add_subplot()
+        mesh = None
+    if mesh is not None and mesh.get_coordinates().shape[:2] == (rows + 1, cols + 1):
+        mesh.set_array(values)
+        mesh.set_norm(norm)
+    else:
+        # A new grid shape needs a new mesh; cells are one unit wide, first row at the top
+        if mesh is not None:
+            mesh.remove()
+        mesh = ax.pcolormesh(values, cmap=cmap, norm=norm)
+        ax.set_xlim(0, cols)
+        ax.set_ylim(rows, 0)
+
+    # Annotations, coloured by the luminance of the cell behind them; existing texts are reused
+    text_colours = _annotation_colours(cmap(norm(values.filled(0))))
+    font_size = spec.get('annot_size') or matplotlib.rcParams['font.size']
+    cells = list(zip(*np.nonzero(~np.ma.getmaskarray(values))))
+    texts = list(ax.texts)
+    for text in texts[len(cells):]:
+        text.remove()
+    for n, (i, j) in enumerate(cells):
+        value = values[i, j]
+        label = format(int(value) if fmt.endswith('d') else value, fmt)
+        if n < len(texts):
+            text = texts[n]
+            text.set_position((j + .5, i + .5))
+            text.set_text(label)
+        else:
+            text = ax.text(j + .5, i + .5, label, ha='center', va='center')
+        text.set_color(text_colours[i, j])
+        text.set_fontsize(font_size)
+
+    label_size = spec.get('label_size') or matplotlib.rcParams['font.size']
+    xticklabels = [str(label) for label in data.columns]
+    yticklabels = [str(label) for label in data.index]
+    width, height = fig.get_size_inches()
+    ax.set_xticks(np.arange(cols) + .5, labels=xticklabels, fontsize=label_size,
+                  rotation=0 if _labels_fit(xticklabels, 0.8 * width / cols, label_size) else 'vertical')
+    ax.set_yticks(np.arange(rows) + .5, labels=yticklabels, fontsize=label_size, va='center',
+                  rotation='vertical' if _labels_fit(yticklabels, 0.8 * height / rows, label_size) else 'horizontal')
+
+    ax.set_xlabel(spec.get('xlabel', ''), fontsize=10)
+    ax.set_ylabel(spec.get('ylabel', ''), fontsize=10)
+    fig.tight_layout(**({'pad': spec['pad']} if 'pad' in spec else {}))
+
+# Path codes of one bump-chart flow: a Bezier band from one node to the next and back
+FLOW_CODES = np.array([Path.MOVETO] + [Path.CURVE4] * 3 + [Path.LINETO] + [Path.CURVE4] * 3 + [Path.CLOSEPOLY],
+                      dtype=Path.code_type)
+
+def _draw_bump(fig: Figure, spec: Dict) -> None:
+    """
+    Alluvial (bump) chart of the top entries per year with flows between years.
+
+    spec['data'] has 'year', 'rank' and spec['label_column'] columns, and optionally
+    spec['value_column'] with the counts shown on the nodes and used to order them.
+    Optional keys: title, label_length_limit (25), figure_width (18), figure_height_scale (0.6).
+    """
+    channel_ranking = spec['data']
+    channel_col = spec['label_column']
+    value_col = spec.get('value_column')
+    title = spec.get('title', '')
+    label_length_limit = spec.get('label_length_limit', 25)
+    figure_width = spec.get('figure_width', 18)
+    figure_height_scale = spec.get('figure_height_scale', 0.6)
+
+    if not {'year', 'rank', channel_col}.issubset(channel_ranking.columns):
+        raise ValueError(f"DataFrame must contain 'year', 'rank' and '{channel_col}' columns.")
+
+    has_engagement = value_col is not None and value_col in channel_ranking.columns
+
+    # Data Preparation
+    df = channel_ranking.copy()
+    if has_engagement:
+        df[value_col] = pd.to_numeric(df[value_col], errors='coerce').fillna(-np.inf)
+
+    df['year'] = df['year'].astype(int)
+    df['rank'] = df['rank'].astype(int)
+    years = np.sort(df['year'].unique())
+    channels = df[channel_col].dropna().unique()
+
+    # Figure Setup
+    fig.set_size_inches(figure_width, max(8, len(channels) * figure_height_scale))
+    ax = fig.add_subplot()
+
+    # Colors
+    cmap = matplotlib.colormaps["tab20" if len(channels) > 10 else "tab10"]
+    palette = cmap(np.arange(len(channels)) % cmap.N)
+
+    # Layout Parameters
+    node_width = 0.6
+    node_spacing = 0.2
+    year_spacing = (figure_width - 3) / max(1, len(years) - 1) if len(years) > 1 else 3
+    node_height = 0.7
+    left_margin = 2.5
+
+    # Node geometry for all years at once: largest counts on top if available, else by rank
+    if has_engagement:
+        df = df.sort_values(['year', value_col], ascending=[True, False], kind='mergesort')
+    else:
+        df = df.sort_values(['year', 'rank'], kind='mergesort')
+    by_year = df.groupby('year', sort=False)
+    position = by_year.cumcount().to_numpy()
+    year_size = by_year['year'].transform('size').to_numpy()
+    max_nodes_in_year = int(year_size.max()) if len(df) else 0
+    df['x'] = left_margin + np.searchsorted(years, df['year'].to_numpy()) * year_spacing
+    df['y'] = (year_size - 1 - position) * (node_height + node_spacing)
+
+    # Rows without a label keep their slot but are not drawn
+    nodes = df[df[channel_col].notna()]
+    colour_codes = pd.Categorical(nodes[channel_col], categories=channels).codes
+    x, y = nodes['x'].to_numpy(), nodes['y'].to_numpy()
+
+    # Draw Nodes, as a single collection of rectangles
+    corners = np.array([(0, 0), (node_width, 0), (node_width, node_height), (0, node_height)])
+    node_verts = np.stack([x, y], axis=1)[:, None, :] + corners
+    ax.add_collection(PolyCollection(node_verts, facecolors=palette[colour_codes],
+                                     edgecolors='white', linewidths=0.5, alpha=0.9))
+
+    for channel, x_pos, y_pos, value in zip(nodes[channel_col], x, y,
+                                            nodes[value_col] if has_engagement else repeat(None)):
+        # Label
+        name_part = str(channel)
+        if len(name_part) > (label_length_limit - 5):
+            name_part = name_part[:label_length_limit-8] + "..."
+
+        ax.text(
+            x_pos + node_width / 2,
+            y_pos + node_height + 0.05,
+            name_part,
+            va='bottom', ha='center', fontsize=7, fontweight='normal', color='black'
+        )
+
+        # Count
+        if value is not None and value != -np.inf:
+            ax.text(
+                x_pos + node_width / 2, y_pos + node_height / 2, f"{int(value):,}",
+                va='center', ha='center', fontsize=8, fontweight='bold', color='black'
+            )
+
+    # Draw Connections between consecutive years of each channel, one compound path per colour
+    links = nodes.assign(colour=colour_codes).drop_duplicates(['year', channel_col], keep='last')
+    links = links.sort_values([channel_col, 'year'], kind='mergesort')
+    same_channel = (links[channel_col].to_numpy()[1:] == links[channel_col].to_numpy()[:-1])
+    start_x = links['x'].to_numpy()[:-1][same_channel] + node_width
+    end_x = links['x'].to_numpy()[1:][same_channel]
+    start_y = links['y'].to_numpy()[:-1][same_channel] + node_height / 2
+    end_y = links['y'].to_numpy()[1:][same_channel] + node_height / 2
+    flow_colours = links['colour'].to_numpy()[1:][same_channel]
+
+    half = node_height / 4.0
+    cp1_x = start_x + (end_x - start_x) * 0.35
+    cp2_x = start_x + (end_x - start_x) * 0.65
+    flow_verts = np.stack([
+        np.stack([start_x, cp1_x, cp2_x, end_x, end_x, cp2_x, cp1_x, start_x, start_x], axis=1),
+        np.stack([start_y + half, start_y + half, end_y + half, end_y + half,
+                  end_y - half, end_y - half, start_y - half, start_y - half, start_y + half], axis=1),
+    ], axis=2)
+    for colour in np.unique(flow_colours):
+        verts = flow_verts[flow_colours == colour]
+        path = Path(verts.reshape(-1, 2), np.tile(FLOW_CODES, len(verts)))
+        ax.add_patch(patches.PathPatch(path, facecolor=palette[colour], alpha=0.5, edgecolor='none', lw=0))
+
+    # Year Labels
+    for year_idx, year in enumerate(years):
+        ax.text(
+            left_margin + year_idx * year_spacing + node_width / 2, -0.5, str(year),
+            ha='center', va='top', fontsize=11, fontweight='bold', color='black'
+        )
+
+    # Settings
+    right_limit = left_margin + (len(years) - 1) * year_spacing + node_width + 1.0
+    ax.set_xlim(0, right_limit)
+    ax.set_ylim(-1.0, max_nodes_in_year * (node_height + node_spacing) + 0.5)
+    ax.set_title(title, fontsize=16, fontweight='bold', pad=25, color='black')
+    ax.set_axis_off()
+    fig.tight_layout(rect=[0.02, 0.05, 0.98, 0.95])
+
+def _draw_treemap(fig: Figure, spec: Dict) -> None:
+    """Treemap of spec['data'], a Series of counts indexed by label."""
+    counts = spec['data']
+    ax = fig.add_subplot()
+
+    if not counts.empty:
+        sizes = counts.to_numpy()
+        labels = [f"{label}\n({count})" if len(str(label)) < 15 else f"{str(label)[:12]}...\n({count})"
+                  for label, count in counts.items()]
+
+        cmap = matplotlib.colormaps['Blues']
+        norm = Normalize(sizes.min(), sizes.max())
+        squarify.plot(sizes=sizes, label=labels, color=[cmap(norm(size)) for size in sizes], alpha=0.8, ax=ax)
+
+    ax.set_xticks([])
+    ax.set_yticks([])
+    fig.tight_layout()
+
+def _draw_stacked_bar(fig: Figure, spec: Dict) -> None:
+    """
+    Horizontal bars for the rows of spec['data'] (first row on top), stacked by column.
+
+    spec['colors'] and spec['labels'] map columns to bar colours and legend labels.
+    """
+    data = spec['data'].iloc[::-1]  # matplotlib draws the first bar at the bottom
+    ax = fig.add_subplot()
+    left = np.zeros(len(data))
+    for column in data.columns:
+        values = data[column].to_numpy()
+        if values.any():
+            ax.barh(data.index.astype(str), values, left=left,
+                    color=spec['colors'].get(column), label=spec['labels'].get(column, column))
+        left += values
+
+    ax.legend(loc='lower right')
+    fig.tight_layout()
+
+CHART_TYPES: Dict[str, Callable[[Figure, Dict], None]] = {
+    'heatmap': _draw_heatmap,
+    'bump': _draw_bump,
+    'treemap': _draw_treemap,
+    'stacked_bar': _draw_stacked_bar,
+}
+
+# Chart types whose drawing function updates the artists of the previous render in
+# place; their figures are not cleared between renders (they hold very little data)
+PERSISTENT_CHART_TYPES = {'heatmap'}
+
+# --- Rendering ---
+
+_thread_figures = threading.local()
+
+def _reusable_figure(chart_type: str) -> Figure:
+    """This thread's figure for chart_type, cleared and reset to the default layout unless persistent."""
+    figures = getattr(_thread_figures, 'figures', None)
+    if figures is None:
+        figures = _thread_figures.figures = {}
+
+    fig = figures.get(chart_type)
+    if fig is None:
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        figures[chart_type] = fig
+    elif chart_type not in PERSISTENT_CHART_TYPES:
+        fig.clear()
+        # tight_layout() adjusts the subplot parameters, start every render from the defaults
+        fig.subplotpars = SubplotParams()
+    return fig
+
+def draw_chart(spec: Dict) -> Figure:
+    """Draw spec on this thread's reusable figure for its type and return the figure."""
+    chart_type = spec['type']
+    fig = _reusable_figure(chart_type)
+    fig.set_dpi(spec.get('dpi', DEFAULT_DPI))
+    if 'size' in spec:
+        fig.set_size_inches(*spec['size'])
+    with matplotlib.rc_context(STYLE_CONTEXTS.get(chart_type, {})):
+        CHART_TYPES[chart_type](fig, spec)
+    return fig
+
+def _figure_pixels(fig: Figure) -> np.ndarray:
+    """
+    Draw fig once and return its RGB pixels, cropped to the drawn content plus
+    PAD_INCHES of background on every side (what bbox_inches='tight' produces,
+    without the extra draws savefig needs to measure the tight bounding box).
+    """
+    fig.canvas.draw()
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+    background = np.round(np.asarray(to_rgba(fig.get_facecolor())) * 255).astype(np.uint8)
+    content = np.any(rgba != background, axis=2)
+    rows = np.flatnonzero(content.any(axis=1))
+    cols = np.flatnonzero(content.any(axis=0))
+    if len(rows) == 0:
+        return np.ascontiguousarray(rgba[..., :3])
+
+    pad = int(round(PAD_INCHES * fig.dpi))
+    height, width = rows[-1] - rows[0] + 1 + 2 * pad, cols[-1] - cols[0] + 1 + 2 * pad
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[...] = background[:3]
+    pixels[pad:height - pad, pad:width - pad] = rgba[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1, :3]
+    return pixels
+
+def encode_image(pixels: np.ndarray, image_format: Optional[str] = None, compress_level: Optional[int] = None,
+                 colors: Optional[int] = None) -> bytes:
+    """Encode RGB pixels with Pillow; settings default to CHART_IMAGE_FORMAT, CHART_PNG_COMPRESSION and CHART_PNG_COLORS."""
+    image_format = image_format or CHART_IMAGE_FORMAT
+    compress_level = CHART_PNG_COMPRESSION if compress_level is None else compress_level
+    colors = CHART_PNG_COLORS if colors is None else colors
+
+    image = Image.fromarray(pixels)
+    buffer = io.BytesIO()
+    if image_format == 'webp':
+        image.save(buffer, format='WEBP', lossless=True)
+    else:
+        if colors:
+            # Charts use few distinct colours, a palette image is much smaller than RGB
+            image = image.quantize(colors=colors, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        image.save(buffer, format='PNG', compress_level=compress_level)
+    return buffer.getvalue()
+
+def chart_image(spec: Dict) -> bytes:
+    """Render spec with a single draw and return the encoded image (CHART_IMAGE_FORMAT)."""
+    fig = draw_chart(spec)
+    try:
+        with matplotlib.rc_context(STYLE_CONTEXTS.get(spec['type'], {})):
+            pixels = _figure_pixels(fig)
+    finally:
+        # Drop the artists (and the data they reference) but keep the figure for the next render
+        if spec['type'] not in PERSISTENT_CHART_TYPES:
+            fig.clear()
+    return encode_image(pixels)
+
+def chart_fingerprint(spec: Dict) -> str:
+    """
+    Content hash of a chart: its spec, the values and labels of its data and the
+    encoding settings. Specs with the same fingerprint render to the same image.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((CHART_IMAGE_FORMAT, CHART_PNG_COMPRESSION, CHART_PNG_COLORS)).encode())
+    for key in sorted(spec):
+        value = spec[key]
+        digest.update(key.encode())
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            if isinstance(value, pd.DataFrame):
+                labels, dtypes = list(value.columns), list(value.dtypes)
+            else:
+                labels, dtypes = [value.name], [value.dtype]
+            digest.update(repr((type(value).__name__, labels, [str(dtype) for dtype in dtypes])).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+def render_chart(spec: Dict, sink: Optional[OutputSink] = None) -> Optional[str]:
+    """Render spec to an image stored in sink (the session by default) and return the filename."""
+    return render_charts([spec], sink)[0]
+
+def chart_src(name: Optional[str]) -> str:
+    """
+    Image source for a chart in a template: a base64 data URI for charts held in
+    memory (so the dashboard needs no further requests), else its download URL.
+    """
+    if not name:
+        return ''
+    if INLINE_CHARTS:
+        image = get_memory_artifact(name)
+        if image is not None and len(image) <= INLINE_CHART_MAX_BYTES:
+            mimetype = IMAGE_MIMETYPES.get(os.path.splitext(name)[1].lstrip('.').lower(), 'image/png')
+            return f"data:{mimetype};base64,{base64.b64encode(image).decode('ascii')}"
+    return url_for('routes.download_image', filename=name)
+
+# --- Render pool ---
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+def _render_pool_size() -> int:
+    return min(CHART_RENDER_WORKERS, os.cpu_count() or 1)
+
+def _warm_render_worker() -> None:
+    # Runs once in every new worker: load fonts and fill Matplotlib's caches
+    chart_image({'type': 'heatmap', 'data': pd.DataFrame([[1, 2]], index=['Count'], columns=['a', 'b']), 'size': (2, 1)})
+
+def _ping() -> None:
+    pass
+
+def _get_render_pool() -> Optional[ProcessPoolExecutor]:
+    """This process's chart render pool, created on first use, or None if charts render inline."""
+    global _render_pool
+    # Workers never start pools of their own (e.g. when a spawned child re-imports run.py)
+    if _render_pool_size() < 2 or multiprocessing.parent_process() is not None:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn: workers start from a fresh interpreter instead of forking a threaded web worker
+            _render_pool = ProcessPoolExecutor(max_workers=_render_pool_size(),
+                                               mp_context=multiprocessing.get_context('spawn'),
+                                               initializer=_warm_render_worker)
+        return _render_pool
+
+def start_render_pool() -> None:
+    """Start and warm up all render workers now rather than on the first upload."""
+    pool = _get_render_pool()
+    if pool is not None:
+        for _ in range(_render_pool_size()):
+            pool.submit(_ping)
+
+def _discard_render_pool(pool: ProcessPoolExecutor) -> None:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def render_charts(specs: List[Dict], sink: Optional[OutputSink] = None) -> List[Optional[str]]:
+    """
+    Render several specs to images stored in sink (the session by default), concurrently
+    in the render pool when there is one, and return the filenames in order. Nothing is
+    rendered for a sink that doesn't want charts; the filenames are then None.
+
+    Charts already rendered from the same aggregates are taken from the session's
+    chart cache instead. Workers only return the encoded images; they are stored
+    here, in the request. If the pool is unavailable or breaks, the charts
+    are rendered inline.
+    """
+    if sink is None:
+        sink = SessionSink()
+    if not sink.wants_charts:
+        return [None] * len(specs)
+
+    fingerprints = [chart_fingerprint(spec) for spec in specs]
+    images = get_session_charts(fingerprints)
+    missing = [i for i, image in enumerate(images) if image is None]
+    logger.debug(f"Chart cache: {len(specs) - len(missing)} of {len(specs)} charts cached")
+
+    pool = _get_render_pool() if len(missing) > 1 else None
+    rendered = None
+    if pool is not None:
+        try:
+            rendered = list(pool.map(chart_image, [specs[i] for i in missing]))
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Chart render pool failed, rendering inline: {e}")
+            _discard_render_pool(pool)
+
+    if rendered is None:
+        rendered = [chart_image(specs[i]) for i in missing]
+    for i, image in zip(missing, rendered):
+        images[i] = image
+        cache_session_chart(fingerprints[i], image)
+
+    names = []
+    for image in images:
+        name = f"{uuid.uuid4()}.{CHART_IMAGE_FORMAT}"
+        sink.save_chart(name, image)
+        names.append(name)
+    return names
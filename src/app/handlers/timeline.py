@@ -0,0 +1,237 @@
+import io
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from werkzeug.datastructures import FileStorage
+
+from app.utils.output_sink import OutputSink, ProcessingResult, SessionSink
+from app.utils.analytics import distinct_count_insights
+from app.charts import render_charts, DAY_NAMES, MONTH_NAMES, TIME_RANGES
+
+logger = logging.getLogger(__name__)
+
+# Platforms that can be combined, in the order they are shown
+TIMELINE_PLATFORMS = ('youtube', 'tiktok', 'instagram')
+PLATFORM_LABELS = {'youtube': 'YouTube', 'tiktok': 'TikTok', 'instagram': 'Instagram'}
+PLATFORM_COLORS = {'youtube': '#c4302b', 'tiktok': '#25f4ee', 'instagram': '#833ab4'}
+
+# Columns of the normalised timeline
+TIMELINE_COLUMNS = ['timestamp', 'platform', 'item', 'creator', 'url']
+
+# Worker processes used to parse the platforms' uploads in parallel (1 = parse inline)
+TIMELINE_INGEST_WORKERS = int(os.getenv('TIMELINE_INGEST_WORKERS', '3'))
+
+# Below this many uploaded bytes the cost of starting workers outweighs parallel parsing
+TIMELINE_PARALLEL_MIN_BYTES = int(os.getenv('TIMELINE_PARALLEL_MIN_BYTES', str(4 * 1024 * 1024)))
+
+# --- Ingestion ---
+
+def _known_or_none(values: pd.Series, placeholders=('Unknown', 'N/A', '')) -> pd.Series:
+    return values.where(~values.isin(placeholders), None)
+
+def normalise_records(df: pd.DataFrame, platform: str) -> pd.DataFrame:
+    """Maps one platform's parsed records onto the timeline columns."""
+    if df.empty:
+        return pd.DataFrame(columns=TIMELINE_COLUMNS)
+
+    if platform == 'youtube':
+        item, creator, url = df['video_title'], _known_or_none(df['channel']), df['video_url']
+    elif platform == 'tiktok':
+        # TikTok exports carry no creator for watched or liked videos
+        item, creator, url = df['video_title'], pd.Series(None, index=df.index, dtype=object), df['video_url']
+    elif platform == 'instagram':
+        item, creator, url = df['title'], _known_or_none(df['author']), df['href']
+    else:
+        raise ValueError(f"Unsupported platform: {platform}")
+
+    url = url.where(url.astype(str).str.startswith(('http://', 'https://')), None)
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(df['timestamp'], utc=True),
+        'platform': platform,
+        'item': item,
+        'creator': creator,
+        'url': url,
+    }, columns=TIMELINE_COLUMNS)
+
+def _ingest_platform(platform: str, uploads: List[Tuple[str, bytes]]) -> pd.DataFrame:
+    """Parses one platform's uploads into timeline rows. Runs in a worker process."""
+    from app.handlers.youtube import load_youtube_records
+    from app.handlers.tiktok import load_tiktok_records
+    from app.handlers.instagram import load_instagram_records
+
+    loaders = {
+        'youtube': load_youtube_records,
+        'tiktok': load_tiktok_records,
+        'instagram': load_instagram_records,
+    }
+    files = [FileStorage(stream=io.BytesIO(content), filename=name, content_type='application/json')
+             for name, content in uploads]
+    return normalise_records(loaders[platform](files), platform)
+
+def _pool_context():
+    # forkserver children are forked from a clean, preloaded server process rather
+    # than from a (threaded) web worker
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['app.handlers.timeline'])
+        return context
+    return None
+
+def ingest_uploads(uploads_by_platform: Dict[str, List[Tuple[str, bytes]]]) -> pd.DataFrame:
+    """
+    Parses every platform's uploads and concatenates them into one timeline.
+
+    Platforms are parsed in parallel worker processes when there is more than one
+    of them and enough data to make it worthwhile; otherwise they run inline.
+    """
+    jobs = [(platform, uploads_by_platform[platform]) for platform in TIMELINE_PLATFORMS
+            if uploads_by_platform.get(platform)]
+    total_bytes = sum(len(content) for _, uploads in jobs for _, content in uploads)
+
+    frames = None
+    workers = min(len(jobs), TIMELINE_INGEST_WORKERS, os.cpu_count() or 1)
+    if workers > 1 and total_bytes >= TIMELINE_PARALLEL_MIN_BYTES:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+                futures = [pool.submit(_ingest_platform, platform, uploads) for platform, uploads in jobs]
+                frames = [future.result() for future in futures]
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Parallel timeline ingestion failed, parsing inline: {e}")
+            frames = None
+
+    if frames is None:
+        frames = [_ingest_platform(platform, uploads) for platform, uploads in jobs]
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=TIMELINE_COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values('timestamp', kind='stable', ignore_index=True)
+
+# --- Aggregation ---
+
+def build_timeline_cube(timeline: pd.DataFrame) -> Dict:
+    """
+    Counts events in one pass into a platform x year x month x weekday x hour cube.
+
+    Every chart is a marginal sum over this cube, so the rows are only visited once.
+    """
+    timestamps = timeline['timestamp']
+    years = timestamps.dt.year.to_numpy()
+    first_year = int(years.min())
+    n_years = int(years.max()) - first_year + 1
+    platform_codes = pd.Categorical(timeline['platform'], categories=TIMELINE_PLATFORMS).codes.astype(np.int64)
+
+    flat = platform_codes
+    flat = flat * n_years + (years - first_year)
+    flat = flat * 12 + (timestamps.dt.month.to_numpy() - 1)
+    flat = flat * 7 + timestamps.dt.dayofweek.to_numpy()
+    flat = flat * 24 + timestamps.dt.hour.to_numpy()
+
+    shape = (len(TIMELINE_PLATFORMS), n_years, 12, 7, 24)
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+    return {'counts': counts, 'years': list(range(first_year, first_year + n_years))}
+
+def top_creators(timeline: pd.DataFrame, k: int = 10) -> pd.DataFrame:
+    """Returns the k most frequent creators with their counts per platform."""
+    codes, creators = pd.factorize(timeline['creator'])
+    known = codes >= 0
+    if not known.any():
+        return pd.DataFrame(columns=list(TIMELINE_PLATFORMS))
+
+    platform_codes = pd.Categorical(timeline['platform'], categories=TIMELINE_PLATFORMS).codes
+    n_platforms = len(TIMELINE_PLATFORMS)
+    per_platform = np.bincount(
+        codes[known] * n_platforms + platform_codes[known], minlength=len(creators) * n_platforms
+    ).reshape(len(creators), n_platforms)
+
+    totals = per_platform.sum(axis=1)
+    k = min(k, len(creators))
+    top = np.argpartition(-totals, k - 1)[:k]
+    top = top[np.argsort(-totals[top], kind='stable')]
+    return pd.DataFrame(per_platform[top], index=creators[top], columns=list(TIMELINE_PLATFORMS))
+
+# --- Main Processing Function ---
+
+def process_timeline_files(files_by_platform: Dict[str, List[FileStorage]],
+                           sink: Optional[OutputSink] = None) -> ProcessingResult:
+    """Combines uploads from several platforms into one timeline; charts and exports are stored in sink."""
+    if sink is None:
+        sink = SessionSink()
+    try:
+        uploads = {
+            platform: [(getattr(file, 'filename', 'upload.json'), file.read()) for file in files]
+            for platform, files in files_by_platform.items() if platform in TIMELINE_PLATFORMS
+        }
+        timeline = ingest_uploads(uploads)
+
+        if timeline.empty:
+            logger.warning("No valid data found in uploaded timeline files")
+            raise ValueError("No valid data found in the uploaded files.")
+
+        cube = build_timeline_cube(timeline)
+        counts = cube['counts']
+        platforms = [p for p in TIMELINE_PLATFORMS if counts[TIMELINE_PLATFORMS.index(p)].any()]
+        rows = [PLATFORM_LABELS[p] for p in platforms]
+        present = [TIMELINE_PLATFORMS.index(p) for p in platforms]
+
+        # Marginals of the cube
+        day_counts = pd.DataFrame(counts.sum(axis=(1, 2, 4))[present], index=rows, columns=DAY_NAMES)
+        hour_counts = counts.sum(axis=(1, 2, 3))[present]
+        time_counts = pd.DataFrame(hour_counts.reshape(len(present), 6, 4).sum(axis=2), index=rows, columns=TIME_RANGES)
+        month_counts = pd.DataFrame(counts.sum(axis=(0, 3, 4)), index=cube['years'], columns=MONTH_NAMES)
+        month_counts = month_counts[month_counts.sum(axis=1) > 0]
+
+        insights = {
+            'total_events': len(timeline),
+            'platform_counts': {PLATFORM_LABELS[p]: int(counts[TIMELINE_PLATFORMS.index(p)].sum()) for p in platforms},
+            'time_frame_start': timeline['timestamp'].min().date(),
+            'time_frame_end': timeline['timestamp'].max().date(),
+        }
+        insights.update(distinct_count_insights('unique_creators', timeline['creator'], timeline['timestamp'].dt.year))
+
+        platform_heatmap_size = (8, max(1.5, 0.6 * len(present) + 0.6))
+        specs = [
+            {'type': 'heatmap', 'data': day_counts, 'size': platform_heatmap_size},
+            {'type': 'heatmap', 'data': time_counts, 'size': platform_heatmap_size},
+            {
+                'type': 'heatmap', 'data': month_counts, 'size': (10, max(2, len(month_counts) * 0.6)),
+                'annot_size': 10, 'pad': 0.5,
+            },
+        ]
+
+        creators = top_creators(timeline)
+        if not creators.empty:
+            specs.append({
+                'type': 'stacked_bar', 'data': creators, 'size': (8, max(2, 0.45 * len(creators) + 0.8)),
+                'colors': PLATFORM_COLORS, 'labels': PLATFORM_LABELS,
+            })
+
+        # All charts are rendered together, concurrently where possible
+        chart_names = render_charts(specs, sink)
+        charts = dict(zip(('day_heatmap', 'time_heatmap', 'month_heatmap', 'top_creators'), chart_names))
+
+        # Exports are built by the sink; in the session on first download, from a columnar snapshot
+        exports = sink.export_names(
+            timeline, {'platform': 'timeline', 'exports': ['csv', 'xlsx'], 'csv_quote_all': True}
+        )
+
+        preview_data = {
+            'columns': timeline.columns.tolist(),
+            'rows': timeline.head(5).values.tolist()
+        }
+
+        return ProcessingResult('timeline', timeline, insights, charts, exports, preview_data)
+
+    except ValueError as e:
+        logger.warning(f"ValueError in timeline processing: {str(e)}")
+        raise ValueError(str(e))
+    except Exception as e:
+        logger.exception(f"Error processing timeline data: {e}")
+        raise ValueError("An internal error occurred. Please try again.")
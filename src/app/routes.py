@@ -1,14 +1,23 @@
 from flask import Blueprint, render_template, request, send_file, current_app, session, redirect, url_for, abort, g, jsonify
 from app.utils.security import requires_authentication, enforce_https, apply_security_headers
-from app.utils.file_manager import TemporaryFileManager, get_user_temp_dir
+from app.utils.file_manager import TemporaryFileManager, deletion_queue, get_user_temp_dir
 from app.utils.extensions import limiter
 from app.utils.logging_config import log_request_data_safely, log_file_operation_safely, log_security_event_safely, log_error_safely, log_stack_trace_safely
 from app.handlers.youtube import process_youtube_file
 from app.handlers.instagram import process_instagram_file
 from app.handlers.tiktok import process_tiktok_file
+from app.handlers.timeline import process_timeline_files, TIMELINE_PLATFORMS
+from app.charts import IMAGE_MIMETYPES
 
 from app.utils.file_validation import validate_file
+from app.utils.export import materialize_export
+from app.utils.preview import get_dataset_preview
+from app.utils.result_cache import cache_session_result, discard_session_result, get_session_result
+from app.utils.artifact_store import get_memory_artifact, session_artifact_exists
+from app.utils.dataset import SNAPSHOT_EXTENSION
+import io
 import os
+import hashlib
 from werkzeug.utils import secure_filename
 import re
 from flask import flash
@@ -58,6 +67,52 @@ def generate_synthetic_data():
     current_app.logger.info("Generating synthetic data page accessed.")
     return render_template('generate_synthetic_data.html')
 
+def _snapshot_name(export_filename):
+    """Name of the dataset snapshot an export file is generated from."""
+    return f"{export_filename.rsplit('.', 1)[0]}.{SNAPSHOT_EXTENSION}" if export_filename else None
+
+def _upload_key(platform, digests):
+    """Cache key for a set of uploads: identical files give the same key in any order."""
+    return ('upload', platform, tuple(sorted(digests)))
+
+def _cached_dashboard_result(key):
+    """Return a cached dashboard result while all of its artifacts (charts, export snapshots) still exist."""
+    cached = get_session_result(key)
+    if cached is None:
+        return None
+    if all(session_artifact_exists(name) for name in cached['artifacts']):
+        return cached
+    discard_session_result(key)
+    return None
+
+def _render_dashboard(platform, template, artifacts, upload_key=None, **context):
+    """Render a processed dashboard and cache its context so a refresh doesn't need a re-upload."""
+    result = {
+        'artifacts': [name for name in artifacts if name],
+        'context': context,
+    }
+    cache_session_result(('dashboard', platform), result)
+    if upload_key:
+        cache_session_result(upload_key, result)
+    return render_template(template, **context)
+
+def _render_cached_dashboard(platform, template):
+    """Re-render the session's last result for platform."""
+    cached = _cached_dashboard_result(('dashboard', platform))
+    if cached:
+        current_app.logger.info("Rendering %s dashboard from cached result.", platform)
+        return render_template(template, **cached['context'])
+    return render_template(template)
+
+def _render_memoised_upload(platform, template, upload_key):
+    """Answer a resubmission of files already processed in this session, or return None."""
+    cached = _cached_dashboard_result(upload_key)
+    if cached is None:
+        return None
+    current_app.logger.info("Identical %s upload, rendering the memoised result.", platform)
+    cache_session_result(('dashboard', platform), cached)
+    return render_template(template, **cached['context'])
+
 @routes_bp.route('/dashboard/youtube', methods=['GET', 'POST'])
 @requires_authentication
 @limiter.limit("10 per minute")
@@ -66,7 +121,7 @@ def dashboard_youtube():
 
     if request.method == 'GET':
         current_app.logger.info("Rendering YouTube dashboard GET request.")
-        return render_template('dashboard_youtube.html')
+        return _render_cached_dashboard('youtube', 'dashboard_youtube.html')
 
     current_app.logger.info("Handling POST request for YouTube dashboard.")
 
@@ -80,13 +135,16 @@ def dashboard_youtube():
     
     # Validate files before processing
     valid_files = []
+    digests = []
     for i, file in enumerate(files):
         current_app.logger.info("File %d: %s", i + 1, file.filename)
         
+        digest = hashlib.sha256()
         is_valid, sanitized_name, error = validate_file(
             file,
             allowed_extensions=['json'],  # YouTube only accepts JSON
-            max_size_mb=16  # 16MB max file size
+            max_size_mb=16,  # 16MB max file size
+            digest=digest
         )
         
         if not is_valid:
@@ -97,25 +155,34 @@ def dashboard_youtube():
         # Reset file pointer and add to valid files
         file.seek(0)
         valid_files.append(file)
+        digests.append(digest.hexdigest())
+
+    upload_key = _upload_key('youtube', digests)
+    memoised = _render_memoised_upload('youtube', 'dashboard_youtube.html', upload_key)
+    if memoised is not None:
+        return memoised
 
     try:
         current_app.logger.info("Starting file processing...")
 
-        df, excel_filename, csv_file_name, insights, plot_data, day_heatmap_data, month_heatmap_data, time_heatmap_data, has_valid_data, preview_data = process_youtube_file(valid_files)
+        result = process_youtube_file(valid_files)
 
         current_app.logger.info("File processing completed successfully.")
 
-        return render_template(
+        return _render_dashboard(
+            'youtube',
             'dashboard_youtube.html',
-            insights=insights,
-            excel_filename=excel_filename,
-            csv_file_name=csv_file_name,
-            plot_data=plot_data,
-            day_heatmap_data=day_heatmap_data,
-            month_heatmap_data=month_heatmap_data,
-            time_heatmap_data=time_heatmap_data,
-            has_valid_data=has_valid_data,
-            preview_data=preview_data
+            [_snapshot_name(result.export('csv'))] + list(result.charts.values()),
+            upload_key=upload_key,
+            insights=result.insights,
+            excel_filename=result.export('xlsx'),
+            csv_file_name=result.export('csv'),
+            plot_data=result.chart('top_channels'),
+            day_heatmap_data=result.chart('day_heatmap'),
+            month_heatmap_data=result.chart('month_heatmap'),
+            time_heatmap_data=result.chart('time_heatmap'),
+            has_valid_data=result.has_valid_data,
+            preview_data=result.preview
         )
 
     except ValueError as e:
@@ -136,7 +203,7 @@ def dashboard_instagram():
     current_app.logger.info("Dashboard accessed for Instagram, Method: %s", request.method)
 
     if request.method == 'GET':
-        return render_template('dashboard_instagram.html')
+        return _render_cached_dashboard('instagram', 'dashboard_instagram.html')
 
     files = request.files.getlist('file')
     if not files or files[0].filename == '':
@@ -146,11 +213,14 @@ def dashboard_instagram():
     current_app.logger.info("Processing %d file(s) for Instagram", len(files))
     
     valid_files = []
+    digests = []
     for file in files:
+        digest = hashlib.sha256()
         is_valid, sanitized_name, error = validate_file(
             file,
             allowed_extensions=['json'],  # Instagram only accepts JSON
-            max_size_mb=16  # 16MB max file size
+            max_size_mb=16,  # 16MB max file size
+            digest=digest
         )
         
         if not is_valid:
@@ -161,20 +231,29 @@ def dashboard_instagram():
         # Reset file pointer and add to valid files
         file.seek(0)
         valid_files.append(file)
+        digests.append(digest.hexdigest())
+
+    upload_key = _upload_key('instagram', digests)
+    memoised = _render_memoised_upload('instagram', 'dashboard_instagram.html', upload_key)
+    if memoised is not None:
+        return memoised
 
     try:
-        df, csv_file_name, insights, bump_chart_name, day_heatmap_name, month_heatmap_name, time_heatmap_name, preview_data, has_valid_data = process_instagram_file(valid_files)
+        result = process_instagram_file(valid_files)
 
-        return render_template(
+        return _render_dashboard(
+            'instagram',
             'dashboard_instagram.html',
-            insights=insights,
-            csv_file_name=csv_file_name,
-            plot_data=bump_chart_name,
-            day_heatmap_data=day_heatmap_name,
-            month_heatmap_data=month_heatmap_name,
-            time_heatmap_data=time_heatmap_name,
-            has_valid_data=has_valid_data,
-            preview_data=preview_data
+            [_snapshot_name(result.export('csv'))] + list(result.charts.values()),
+            upload_key=upload_key,
+            insights=result.insights,
+            csv_file_name=result.export('csv'),
+            plot_data=result.chart('top_authors'),
+            day_heatmap_data=result.chart('day_heatmap'),
+            month_heatmap_data=result.chart('month_heatmap'),
+            time_heatmap_data=result.chart('time_heatmap'),
+            has_valid_data=result.has_valid_data,
+            preview_data=result.preview
         )
     except ValueError as e:
         flash(str(e), "danger")
@@ -187,7 +266,7 @@ def dashboard_tiktok():
     current_app.logger.info("Dashboard accessed for TikTok, Method: %s", request.method)
     
     if request.method == 'GET':
-        return render_template('dashboard_tiktok.html')
+        return _render_cached_dashboard('tiktok', 'dashboard_tiktok.html')
     
     files = request.files.getlist('file')
     if not files or files[0].filename == '':
@@ -200,11 +279,14 @@ def dashboard_tiktok():
     from app.utils.file_validation import validate_file
     
     valid_files = []
+    digests = []
     for file in files:
+        digest = hashlib.sha256()
         is_valid, sanitized_name, error = validate_file(
             file,
             allowed_extensions=['json'],  # TikTok only accepts JSON
-            max_size_mb=16  # 16MB max file size
+            max_size_mb=16,  # 16MB max file size
+            digest=digest
         )
         
         if not is_valid:
@@ -215,21 +297,30 @@ def dashboard_tiktok():
         # Reset file pointer and add to valid files
         file.seek(0)
         valid_files.append(file)
+        digests.append(digest.hexdigest())
     
+    upload_key = _upload_key('tiktok', digests)
+    memoised = _render_memoised_upload('tiktok', 'dashboard_tiktok.html', upload_key)
+    if memoised is not None:
+        return memoised
+
     try:
-        df, csv_file_name, excel_file_name, url_file_name, insights, day_heatmap_name, time_heatmap_name, month_heatmap_name, has_valid_data, preview_data = process_tiktok_file(valid_files)
+        result = process_tiktok_file(valid_files)
 
-        return render_template(
+        return _render_dashboard(
+            'tiktok',
             'dashboard_tiktok.html',
-            insights=insights,
-            csv_file_name=csv_file_name,
-            excel_file_name=excel_file_name,
-            url_file_name=url_file_name,
-            day_heatmap_name=day_heatmap_name,
-            time_heatmap_name=time_heatmap_name,
-            month_heatmap_name=month_heatmap_name,
-            has_valid_data=has_valid_data,
-            preview_data=preview_data
+            [_snapshot_name(result.export('csv'))] + list(result.charts.values()),
+            upload_key=upload_key,
+            insights=result.insights,
+            csv_file_name=result.export('csv'),
+            excel_file_name=result.export('xlsx'),
+            url_file_name=result.export('txt'),
+            day_heatmap_name=result.chart('day_heatmap'),
+            time_heatmap_name=result.chart('time_heatmap'),
+            month_heatmap_name=result.chart('month_heatmap'),
+            has_valid_data=result.has_valid_data,
+            preview_data=result.preview
         )
         
     except ValueError as e:
@@ -237,6 +328,74 @@ def dashboard_tiktok():
         flash(str(e), "danger")
         return redirect(url_for('routes.dashboard_tiktok'))
     
+@routes_bp.route('/dashboard/timeline', methods=['GET', 'POST'])
+@requires_authentication
+@limiter.limit("10 per minute")
+def dashboard_timeline():
+    current_app.logger.info("Dashboard accessed for combined timeline, Method: %s", request.method)
+
+    if request.method == 'GET':
+        return _render_cached_dashboard('timeline', 'dashboard_timeline.html')
+
+    files_by_platform = {}
+    digests = []
+    for platform in TIMELINE_PLATFORMS:
+        for file in request.files.getlist(f"{platform}_file"):
+            if not file or file.filename == '':
+                continue
+            digest = hashlib.sha256()
+            is_valid, sanitized_name, error = validate_file(
+                file,
+                allowed_extensions=['json'],  # All platforms are uploaded as JSON
+                max_size_mb=16,  # 16MB max file size
+                digest=digest
+            )
+
+            if not is_valid:
+                current_app.logger.warning(f"Invalid file: {error}")
+                flash(f"Invalid file '{file.filename}': {error}", "danger")
+                return redirect(url_for('routes.dashboard_timeline'))
+
+            # Reset file pointer and add to valid files
+            file.seek(0)
+            files_by_platform.setdefault(platform, []).append(file)
+            digests.append(f"{platform}:{digest.hexdigest()}")
+
+    if not files_by_platform:
+        flash("No file selected", "danger")
+        return redirect(url_for('routes.dashboard_timeline'))
+
+    current_app.logger.info("Processing timeline for %d platform(s)", len(files_by_platform))
+
+    upload_key = _upload_key('timeline', digests)
+    memoised = _render_memoised_upload('timeline', 'dashboard_timeline.html', upload_key)
+    if memoised is not None:
+        return memoised
+
+    try:
+        result = process_timeline_files(files_by_platform)
+
+        return _render_dashboard(
+            'timeline',
+            'dashboard_timeline.html',
+            [_snapshot_name(result.export('csv'))] + list(result.charts.values()),
+            upload_key=upload_key,
+            insights=result.insights,
+            csv_file_name=result.export('csv'),
+            excel_file_name=result.export('xlsx'),
+            day_heatmap_name=result.chart('day_heatmap'),
+            time_heatmap_name=result.chart('time_heatmap'),
+            month_heatmap_name=result.chart('month_heatmap'),
+            top_creators_name=result.charts.get('top_creators'),
+            has_valid_data=result.has_valid_data,
+            preview_data=result.preview
+        )
+
+    except ValueError as e:
+        log_error_safely(e, "Timeline file processing", current_app.logger)
+        flash(str(e), "danger")
+        return redirect(url_for('routes.dashboard_timeline'))
+
 @routes_bp.route('/dashboard/netflix')
 @requires_authentication
 def dashboard_netflix():
@@ -247,10 +406,16 @@ def dashboard_netflix():
 @requires_authentication
 @limiter.limit("60 per minute")
 def download_image(filename):
-    """Serve the requested image file for download and delete it after sending."""
+    """Serve the requested chart from memory, or from the user's temp dir and mark it for cleanup after sending."""
     
     # Sanitize filename to prevent directory traversal attacks
     safe_filename = secure_filename(filename)
+    extension = os.path.splitext(safe_filename)[1].lstrip('.').lower()
+
+    # Charts are normally held in memory; dropping the session's buffers is their cleanup
+    image = get_memory_artifact(safe_filename)
+    if image is not None:
+        return send_file(io.BytesIO(image), mimetype=IMAGE_MIMETYPES.get(extension, "image/png"))
 
     # Define temp directory
     temp_dir = get_user_temp_dir()
@@ -267,35 +432,28 @@ def download_image(filename):
 
     if os.path.exists(temp_file_path):
         try:
-            # Add file to the list of files to clean up at the end of the request
-            if not hasattr(g, 'files_to_cleanup'):
-                g.files_to_cleanup = []
-            if temp_file_path not in g.files_to_cleanup:
-                g.files_to_cleanup.append(temp_file_path)
-                
-            response = send_file(temp_file_path, mimetype="image/png")
+            # Protect the file from immediate deletion
+            TemporaryFileManager.protect_file_for_download(temp_file_path)
+
+            response = send_file(temp_file_path, mimetype=IMAGE_MIMETYPES.get(extension, "image/png"))
 
             # Still try to delete after the response is sent (primary cleanup)
             @response.call_on_close
             def remove_temp_file():
                 try:
                     if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
-                        # If successfully deleted, remove from the cleanup list
-                        if hasattr(g, 'files_to_cleanup') and temp_file_path in g.files_to_cleanup:
-                            g.files_to_cleanup.remove(temp_file_path)
-                        log_file_operation_safely("file_deleted", temp_file_path, current_app.logger)
+                        # Keep the chart so a refreshed dashboard can still show it
+                        TemporaryFileManager.mark_file_for_cleanup(temp_file_path)
+                        log_file_operation_safely("file_marked_for_deletion", temp_file_path, current_app.logger)
                 except Exception as e:
-                    current_app.logger.error(f"Failed to delete file {temp_file_path}: {e}")
+                    current_app.logger.error(f"Failed to mark file {temp_file_path} for deletion: {e}")
 
             return response
         except Exception as e:
             # Try to clean up on error too
             try:
                 if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                    if hasattr(g, 'files_to_cleanup') and temp_file_path in g.files_to_cleanup:
-                        g.files_to_cleanup.remove(temp_file_path)
+                    TemporaryFileManager.mark_file_for_cleanup(temp_file_path)
             except:
                 pass  # Already logging in teardown_request
                 
@@ -309,7 +467,7 @@ def download_image(filename):
 @requires_authentication
 @limiter.limit("60 per minute")
 def download_csv(filename):
-    """Serve the requested CSV file for download and delete it immediately after."""
+    """Serve the requested CSV file for download, generating it on first request."""
 
     # Sanitize filename to prevent directory traversal attacks
     safe_filename = secure_filename(filename)
@@ -327,6 +485,10 @@ def download_csv(filename):
         log_security_event_safely("blocked_file_access", f"filename: {filename}", current_app.logger)
         abort(400, "Invalid file request")
 
+    # Exports are generated from the dataset snapshot on first download
+    if not os.path.exists(temp_file_path):
+        temp_file_path = materialize_export(temp_dir, safe_filename) or temp_file_path
+
     if os.path.exists(temp_file_path):
         try:
             # Protect the file from immediate deletion
@@ -465,7 +627,7 @@ def cleanup_session():
 @requires_authentication
 @limiter.limit("60 per minute")
 def download_excel(filename):
-    """Serve the requested Excel file for download and delete it immediately after."""
+    """Serve the requested Excel file for download, generating it on first request."""
 
     # Sanitize filename to prevent directory traversal attacks
     safe_filename = secure_filename(filename)
@@ -483,14 +645,15 @@ def download_excel(filename):
         log_security_event_safely("blocked_file_access", f"filename: {filename}", current_app.logger)
         abort(400, "Invalid file request")
 
+    # Exports are generated from the dataset snapshot on first download
+    if not os.path.exists(temp_file_path):
+        temp_file_path = materialize_export(temp_dir, safe_filename) or temp_file_path
+
     if os.path.exists(temp_file_path):
         try:
-            # Add file to the list of files to clean up at the end of the request
-            if not hasattr(g, 'files_to_cleanup'):
-                g.files_to_cleanup = []
-            if temp_file_path not in g.files_to_cleanup:
-                g.files_to_cleanup.append(temp_file_path)
-                
+            # Protect the file from immediate deletion
+            TemporaryFileManager.protect_file_for_download(temp_file_path)
+
             response = send_file(temp_file_path, as_attachment=True, download_name=safe_filename, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
             # Still try to delete after the response is sent (primary cleanup)
@@ -498,22 +661,18 @@ def download_excel(filename):
             def remove_temp_file():
                 try:
                     if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
-                        # If successfully deleted, remove from the cleanup list
-                        if hasattr(g, 'files_to_cleanup') and temp_file_path in g.files_to_cleanup:
-                            g.files_to_cleanup.remove(temp_file_path)
-                        log_file_operation_safely("file_deleted", temp_file_path, current_app.logger)
+                        # Keep the export for the rest of the download window
+                        TemporaryFileManager.mark_file_for_cleanup(temp_file_path)
+                        log_file_operation_safely("file_marked_for_deletion", temp_file_path, current_app.logger)
                 except Exception as e:
-                    current_app.logger.error(f"Failed to delete file {temp_file_path}: {e}")
+                    current_app.logger.error(f"Failed to mark file {temp_file_path} for deletion: {e}")
 
             return response
         except Exception as e:
             # Try to cleanup on error too
             try:
                 if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                    if hasattr(g, 'files_to_cleanup') and temp_file_path in g.files_to_cleanup:
-                        g.files_to_cleanup.remove(temp_file_path)
+                    TemporaryFileManager.mark_file_for_cleanup(temp_file_path)
             except:
                 pass  # Already logging in teardown_request
                 
@@ -527,7 +686,7 @@ def download_excel(filename):
 @requires_authentication
 @limiter.limit("60 per minute")
 def download_txt(filename):
-    """Serve the requested text file for download and delete it immediately after."""
+    """Serve the requested text file for download, generating it on first request."""
 
     # Sanitize filename to prevent directory traversal attacks
     safe_filename = secure_filename(filename)
@@ -545,14 +704,15 @@ def download_txt(filename):
         log_security_event_safely("blocked_file_access", f"filename: {filename}", current_app.logger)
         abort(400, "Invalid file request")
 
+    # Exports are generated from the dataset snapshot on first download
+    if not os.path.exists(temp_file_path):
+        temp_file_path = materialize_export(temp_dir, safe_filename) or temp_file_path
+
     if os.path.exists(temp_file_path):
         try:
-            # Add file to the list of files to clean up at the end of the request
-            if not hasattr(g, 'files_to_cleanup'):
-                g.files_to_cleanup = []
-            if temp_file_path not in g.files_to_cleanup:
-                g.files_to_cleanup.append(temp_file_path)
-                
+            # Protect the file from immediate deletion
+            TemporaryFileManager.protect_file_for_download(temp_file_path)
+
             response = send_file(temp_file_path, as_attachment=True, download_name="tiktok_urls.txt", mimetype="text/plain")
 
             # Still try to delete after the response is sent (primary cleanup)
@@ -560,22 +720,18 @@ def download_txt(filename):
             def remove_temp_file():
                 try:
                     if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
-                        # If successfully deleted, remove from the cleanup list
-                        if hasattr(g, 'files_to_cleanup') and temp_file_path in g.files_to_cleanup:
-                            g.files_to_cleanup.remove(temp_file_path)
-                        log_file_operation_safely("file_deleted", temp_file_path, current_app.logger)
+                        # Keep the export for the rest of the download window
+                        TemporaryFileManager.mark_file_for_cleanup(temp_file_path)
+                        log_file_operation_safely("file_marked_for_deletion", temp_file_path, current_app.logger)
                 except Exception as e:
-                    current_app.logger.error(f"Failed to delete file {temp_file_path}: {e}")
+                    current_app.logger.error(f"Failed to mark file {temp_file_path} for deletion: {e}")
 
             return response
         except Exception as e:
             # Try to cleanup on error too
             try:
                 if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                    if hasattr(g, 'files_to_cleanup') and temp_file_path in g.files_to_cleanup:
-                        g.files_to_cleanup.remove(temp_file_path)
+                    TemporaryFileManager.mark_file_for_cleanup(temp_file_path)
             except:
                 pass  # Already logging in teardown_request
                 
@@ -585,6 +741,68 @@ def download_txt(filename):
         current_app.logger.warning(f"File not found: {temp_file_path}")
         abort(404, "File not found")
         
+def _session_preview(export_id, action):
+    """Preview of one of the current user's datasets, aborting on invalid or expired ids."""
+
+    # Sanitize the id to prevent directory traversal attacks
+    safe_export_id = secure_filename(export_id)
+    temp_dir = os.path.realpath(get_user_temp_dir())
+
+    if not safe_export_id or '.' in safe_export_id:
+        log_security_event_safely("blocked_file_access", f"{action}: {export_id}", current_app.logger)
+        abort(400, f"Invalid {action} request")
+
+    preview = get_dataset_preview(temp_dir, safe_export_id)
+    if preview is None:
+        abort(404, "Dataset not found")
+    return preview
+
+@routes_bp.route('/preview/<export_id>', methods=['GET'])
+@requires_authentication
+@limiter.limit("120 per minute")
+def preview_dataset(export_id):
+    """Return one page of the processed dataset as JSON (offset/limit, sort, order, q, column)."""
+    preview = _session_preview(export_id, 'preview')
+
+    try:
+        page = preview.page(
+            offset=request.args.get('offset', 0, type=int),
+            limit=request.args.get('limit', 50, type=int),
+            sort=request.args.get('sort') or None,
+            descending=request.args.get('order', 'asc') == 'desc',
+            query=request.args.get('q', '').strip() or None,
+            column_name=request.args.get('column') or None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(page)
+
+@routes_bp.route('/search/<export_id>', methods=['GET'])
+@requires_authentication
+@limiter.limit("120 per minute")
+def search_dataset(export_id):
+    """Return the rows whose titles/channels contain every word of q as JSON (offset/limit, sort, order, column)."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Missing search query"}), 400
+
+    preview = _session_preview(export_id, 'search')
+
+    try:
+        page = preview.page(
+            offset=request.args.get('offset', 0, type=int),
+            limit=request.args.get('limit', 50, type=int),
+            sort=request.args.get('sort') or None,
+            descending=request.args.get('order', 'asc') == 'desc',
+            column_name=request.args.get('column') or None,
+            search=query,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(page)
+
 @routes_bp.route('/generate_synthetic_data_api', methods=['POST'])
 @requires_authentication
 @limiter.limit("10 per minute")
@@ -681,16 +899,16 @@ def download_generated_file(filename):
                                 download_name=safe_filename, 
                                 mimetype=content_type)
 
-            # Try to delete after the response is sent
+            # Securely delete after the response is sent, in the background deletion queue
             @response.call_on_close
             def remove_temp_file():
                 try:
                     if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
-                        # If successfully deleted, remove from the cleanup list
+                        deletion_queue.submit(temp_file_path)
+                        # Once queued, remove from the cleanup list
                         if hasattr(g, 'files_to_cleanup') and temp_file_path in g.files_to_cleanup:
                             g.files_to_cleanup.remove(temp_file_path)
-                        log_file_operation_safely("file_deleted", temp_file_path, current_app.logger)
+                        log_file_operation_safely("file_queued_for_deletion", temp_file_path, current_app.logger)
                 except Exception as e:
                     current_app.logger.error(f"Failed to delete file {temp_file_path}: {e}")
 
@@ -699,7 +917,7 @@ def download_generated_file(filename):
             # Try to cleanup on error too
             try:
                 if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
+                    deletion_queue.submit(temp_file_path)
                     if hasattr(g, 'files_to_cleanup') and temp_file_path in g.files_to_cleanup:
                         g.files_to_cleanup.remove(temp_file_path)
             except:
@@ -0,0 +1,190 @@
+import os
+import logging
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# A pause longer than this between two videos starts a new viewing session
+SESSION_GAP_MINUTES = int(os.getenv('SESSION_GAP_MINUTES', '30'))
+
+# Session length buckets (number of videos) shown in the insights: 1, 2-5, 6-10, 11-25, 26+
+SESSION_LENGTH_BINS = (1, 2, 6, 11, 26)
+
+_NS_PER_MINUTE = 60 * 1_000_000_000
+
+# Distinct counts switch from exact (hash table) to HyperLogLog sketches above this many rows
+DISTINCT_SKETCH_MIN_ROWS = int(os.getenv('DISTINCT_SKETCH_MIN_ROWS', '1000000'))
+
+# Sketch precision p: 2**p one-byte registers per sketch, relative standard error 1.04 / sqrt(2**p)
+HLL_PRECISION = int(os.getenv('HLL_PRECISION', '14'))
+
+def _timestamp_ns(timestamps: pd.Series) -> np.ndarray:
+    """Sorted int64 nanoseconds (UTC) of the valid timestamps in the series."""
+    values = pd.to_datetime(timestamps, utc=True, errors='coerce')
+    values = values[values.notna()].to_numpy(dtype='datetime64[ns]').view('int64')
+    return np.sort(values, kind='stable')
+
+def _length_label(low: int, high: Optional[int]) -> str:
+    if high is None:
+        return f"{low}+"
+    return str(low) if high == low else f"{low}-{high}"
+
+def binge_sessions(timestamps: pd.Series, gap_minutes: int = SESSION_GAP_MINUTES) -> Optional[Dict]:
+    """
+    Splits viewing activity into sessions wherever consecutive timestamps are more than
+    gap_minutes apart and summarises them. Returns None if there are no valid timestamps.
+
+    Apart from the sort (timsort, so close to linear for exports that are already in
+    time order) every step is a single vectorised pass, without a per-row Python loop.
+    """
+    values = _timestamp_ns(timestamps)
+    if len(values) == 0:
+        return None
+
+    # Index of the first row of every session
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(values) > gap_minutes * _NS_PER_MINUTE) + 1))
+    lengths = np.add.reduceat(np.ones(len(values), dtype=np.int64), starts)
+    # Rows are sorted, so a session's last timestamp is its maximum
+    durations = np.maximum.reduceat(values, starts) - values[starts]
+
+    longest = int(np.argmax(lengths))
+    edges = np.append(SESSION_LENGTH_BINS, np.iinfo(np.int64).max)
+    histogram, _ = np.histogram(lengths, bins=edges)
+    distribution = [
+        (_length_label(low, None if i == len(SESSION_LENGTH_BINS) - 1 else int(edges[i + 1]) - 1), int(count))
+        for i, (low, count) in enumerate(zip(SESSION_LENGTH_BINS, histogram))
+    ]
+
+    return {
+        'gap_minutes': gap_minutes,
+        'session_count': len(starts),
+        'avg_session_videos': round(float(lengths.mean()), 1),
+        'median_session_videos': float(np.median(lengths)),
+        'longest_session_videos': int(lengths[longest]),
+        'longest_session_minutes': int(durations[longest] // _NS_PER_MINUTE),
+        'longest_session_start': pd.Timestamp(values[starts[longest]], tz='UTC').date(),
+        'session_length_distribution': distribution,
+    }
+
+# --- Distinct counts ---
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorised int.bit_length() for uint64 values (binary search over the shift)."""
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        values[high] >>= np.uint64(shift)
+        lengths[high] += shift
+    lengths += (values > 0).astype(np.uint8)
+    return lengths
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch over 64-bit hashes.
+
+    With precision p the sketch uses 2**p one-byte registers regardless of how many
+    values are added, and estimates have a relative standard error of 1.04 / sqrt(2**p).
+    One sketch per group is kept as a row of a 2-D register array, so per-year counts
+    are built in the same vectorised pass as the overall count.
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION, groups: int = 1):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros((groups, 1 << precision), dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(self.registers.shape[1])
+
+    def add_hashes(self, hashes: np.ndarray, groups: Optional[np.ndarray] = None) -> None:
+        """Add uint64 hashes, optionally assigning each one to a group (row) by index."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        suffix_bits = 64 - self.precision
+        # Top p bits pick the register, the rank is the position of the first set bit in the rest
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << suffix_bits) - 1)
+        ranks = (suffix_bits + 1 - _bit_length(rest)).astype(np.uint8)
+        rows = np.zeros(len(hashes), dtype=np.intp) if groups is None else groups
+        np.maximum.at(self.registers, (rows, index), ranks)
+
+    def counts(self) -> np.ndarray:
+        """Estimated number of distinct values per group."""
+        m = self.registers.shape[1]
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)), axis=1)
+        zeros = np.count_nonzero(self.registers == 0, axis=1)
+        # Small cardinalities are estimated more accurately by linear counting
+        with np.errstate(divide='ignore'):
+            linear = m * np.log(m / np.maximum(zeros, 1))
+        estimate = np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+        return np.rint(estimate).astype(np.int64)
+
+    def count(self) -> int:
+        """Estimate for the first (or only) group."""
+        return int(self.counts()[0])
+
+def distinct_counts(values: pd.Series, by: Optional[pd.Series] = None,
+                    sketch_min_rows: Optional[int] = None) -> Dict:
+    """
+    Number of distinct non-missing values overall and, if by is given, per group.
+
+    Exact below sketch_min_rows (DISTINCT_SKETCH_MIN_ROWS by default); above it the
+    values are hashed once and counted with HyperLogLog sketches, and the result
+    carries the relative standard error so the UI can report it.
+
+    Returns {'total': int, 'by': {group: int}, 'relative_error': float or None}.
+    """
+    threshold = DISTINCT_SKETCH_MIN_ROWS if sketch_min_rows is None else sketch_min_rows
+    if len(values) < threshold:
+        present = values.notna() if by is None else values.notna() & by.notna()
+        return {
+            'total': int(values.nunique()),
+            'by': {} if by is None else {_plain(k): int(v) for k, v in values[present].groupby(by[present]).nunique().items()},
+            'relative_error': None,
+        }
+
+    # categorize=False hashes every value directly instead of factorizing first, which would
+    # build the very hash table of distinct values the sketch is meant to avoid
+    valid = values.notna()
+    hashes = pd.util.hash_array(values[valid].to_numpy(), categorize=False)
+    if by is None:
+        sketch = HyperLogLog()
+        sketch.add_hashes(hashes)
+        total, per_group = sketch.count(), {}
+    else:
+        # One register row per group plus a last row for values without a group (code -1
+        # indexes it); the overall sketch is the register-wise maximum of all rows
+        codes, groups = pd.factorize(by[valid], sort=True)
+        sketch = HyperLogLog(groups=len(groups) + 1)
+        sketch.add_hashes(hashes, codes.astype(np.intp))
+        per_group = {_plain(group): int(count) for group, count in zip(groups, sketch.counts()[:-1])}
+        overall = HyperLogLog()
+        overall.registers = sketch.registers.max(axis=0, keepdims=True)
+        total = overall.count()
+
+    result = {'total': total, 'by': per_group, 'relative_error': round(float(sketch.relative_error), 4)}
+    logger.debug(f"Estimated {result['total']} distinct values over {len(values)} rows with HyperLogLog")
+    return result
+
+def _plain(value: Hashable):
+    """NumPy scalars as plain Python values, so insights stay JSON and template friendly."""
+    return value.item() if isinstance(value, np.generic) else value
+
+def distinct_count_insights(name: str, values: pd.Series, years: pd.Series) -> Dict:
+    """
+    Insight entries for the number of distinct values overall and per year:
+    {name: total, f'{name}_per_year': [(year, count), ...], f'{name}_error_pct': None or ±% when estimated}
+    """
+    counts = distinct_counts(values, by=years)
+    error = counts['relative_error']
+    return {
+        name: counts['total'],
+        f'{name}_per_year': sorted((int(year), count) for year, count in counts['by'].items()),
+        f'{name}_error_pct': None if error is None else round(error * 100, 1),
+    }
@@ -0,0 +1,119 @@
+import io
+import os
+import time
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from werkzeug.datastructures import FileStorage
+
+from app.utils.file_manager import TemporaryFileManager, get_user_temp_dir, mark_file_for_cleanup
+from app.utils.file_validation import safe_save_file
+from app.utils.memory_cache import TTLCache, session_user_id
+
+logger = logging.getLogger(__name__)
+
+class ArtifactStore(ABC):
+    """
+    Storage for the artifacts generated for a session (chart images, exports),
+    addressed by the user id and a file name. Backends are registered in
+    ARTIFACT_STORES; put() returns False if the artifact was not stored.
+    """
+
+    @abstractmethod
+    def put(self, user_id: str, name: str, data: bytes) -> bool:
+        """Store data as name for user_id."""
+
+    @abstractmethod
+    def get(self, user_id: str, name: str) -> Optional[bytes]:
+        """The artifact name of user_id, None if the store does not hold it."""
+
+    @abstractmethod
+    def purge_user(self, user_id: str) -> int:
+        """Drop every artifact of user_id and return how many were removed."""
+
+class MemoryArtifactStore(ArtifactStore):
+    """
+    Artifacts held in process memory, within a byte budget shared by all users of
+    the worker. Nothing is evicted to make room: an artifact that does not fit is
+    refused (and goes to disk instead), so stored charts stay available until they
+    expire ttl_seconds after being stored or their session is cleaned up.
+    Deleting an artifact drops the only reference to its buffer.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock=time.monotonic):
+        self._cache = TTLCache(max_bytes, ttl_seconds, clock, evict=False)  # (user_id, name) -> data
+
+    @property
+    def total_bytes(self) -> int:
+        return self._cache.total_bytes
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def put(self, user_id: str, name: str, data: bytes) -> bool:
+        if not self._cache.put((user_id, name), data, len(data)):
+            logger.debug(f"Artifact of {len(data)} bytes does not fit in memory")
+            return False
+        return True
+
+    def get(self, user_id: str, name: str) -> Optional[bytes]:
+        return self._cache.get((user_id, name))
+
+    def purge_user(self, user_id: str) -> int:
+        return self._cache.purge(lambda key, _: key[0] == user_id)
+
+    def purge_expired(self) -> int:
+        """Remove every expired artifact, read or not; return how many were removed."""
+        return self._cache.purge_expired()
+
+class DiskArtifactStore(ArtifactStore):
+    """Artifacts written to the user's temporary directory, cleaned up by TemporaryFileManager."""
+
+    def put(self, user_id: str, name: str, data: bytes) -> bool:
+        # Saved like the other session files: owner-only permissions, deleted after the download window
+        file_storage = FileStorage(stream=io.BytesIO(data), filename=name, content_type='application/octet-stream')
+        mark_file_for_cleanup(safe_save_file(file_storage, name, get_user_temp_dir()))
+        return True
+
+    def get(self, user_id: str, name: str) -> Optional[bytes]:
+        path = os.path.join(get_user_temp_dir(), name)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def purge_user(self, user_id: str) -> int:
+        # The directory is removed by TemporaryFileManager.cleanup_user_files_immediately
+        return 0
+
+ARTIFACT_STORES: Dict[str, ArtifactStore] = {
+    'memory': MemoryArtifactStore(
+        max_bytes=int(os.getenv('ARTIFACT_MEMORY_MAX_MB', '64')) * 1024 * 1024,
+        ttl_seconds=TemporaryFileManager.MAX_FILE_AGE_SECONDS,
+    ),
+    'disk': DiskArtifactStore(),
+}
+
+# Artifacts up to this size are kept in memory when they fit; larger ones go to disk
+MEMORY_ARTIFACT_MAX_BYTES = int(os.getenv('MEMORY_ARTIFACT_MAX_KB', '1024')) * 1024
+
+def save_session_artifact(name: str, data: bytes) -> str:
+    """Store an artifact for the current session and return the name of the store that holds it."""
+    user_id = session_user_id()
+    if user_id and len(data) <= MEMORY_ARTIFACT_MAX_BYTES and ARTIFACT_STORES['memory'].put(user_id, name, data):
+        return 'memory'
+    ARTIFACT_STORES['disk'].put(user_id, name, data)
+    return 'disk'
+
+def session_artifact_exists(name: str) -> bool:
+    """Whether the current session still has an artifact called name, in memory or on disk."""
+    return get_memory_artifact(name) is not None or os.path.isfile(os.path.join(get_user_temp_dir(), name))
+
+def get_memory_artifact(name: str) -> Optional[bytes]:
+    """The current session's in-memory artifact called name, if there is one."""
+    user_id = session_user_id()
+    return ARTIFACT_STORES['memory'].get(user_id, name) if user_id else None
+
+def purge_user_artifacts(user_id: str) -> int:
+    return sum(store.purge_user(user_id) for store in ARTIFACT_STORES.values())
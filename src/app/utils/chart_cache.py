@@ -0,0 +1,80 @@
+import os
+import time
+import logging
+from typing import Iterable, List, Optional
+
+from app.utils.file_manager import TemporaryFileManager
+from app.utils.memory_cache import TTLCache, session_user_id
+
+logger = logging.getLogger(__name__)
+
+class ChartCache:
+    """
+    In-memory cache of rendered chart images, keyed by a fingerprint of the chart
+    spec and its aggregate data (see app.charts.chart_fingerprint).
+
+    Identical aggregates (synthetic demos, repeated uploads) render to identical
+    images, so one entry can serve several sessions. Every entry records the users
+    it was rendered or served for; purging a user removes them from all entries
+    and drops the entries nobody else holds. Entries only ever contain aggregate
+    images, never rows of an upload. The least recently used entries are evicted
+    once the images exceed max_bytes, and entries expire ttl_seconds after their
+    last use. The cache is per worker process.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock=time.monotonic):
+        self._cache = TTLCache(max_bytes, ttl_seconds, clock, refresh_on_get=True)  # fingerprint -> (image, owners)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._cache.total_bytes
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, user_id: str, fingerprint: str) -> Optional[bytes]:
+        """The cached image for fingerprint, which user_id then holds as well."""
+        entry = self._cache.get(fingerprint)
+        if entry is None:
+            return None
+        entry[1].add(user_id)
+        return entry[0]
+
+    def put(self, user_id: str, fingerprint: str, image: bytes) -> bool:
+        """Store image for user_id; returns False if it is too large to be cached at all."""
+        entry = self._cache.get(fingerprint)
+        owners = entry[1] if entry is not None else set()
+        owners.add(user_id)
+        if not self._cache.put(fingerprint, (image, owners), len(image)):
+            logger.debug(f"Chart of {len(image)} bytes exceeds the cache size, not cached")
+            return False
+        return True
+
+    def purge_user(self, user_id: str) -> int:
+        """Release every entry held by user_id and return how many entries were dropped."""
+        def released(_, entry):
+            entry[1].discard(user_id)
+            return not entry[1]
+        return self._cache.purge(released)
+
+    def purge_expired(self) -> int:
+        """Remove every expired entry, whoever holds it; return how many were removed."""
+        return self._cache.purge_expired()
+
+# Charts are kept no longer than the files they were shown with
+chart_cache = ChartCache(
+    max_bytes=int(os.getenv('CHART_CACHE_MAX_MB', '32')) * 1024 * 1024,
+    ttl_seconds=TemporaryFileManager.MAX_FILE_AGE_SECONDS,
+)
+
+def get_session_charts(fingerprints: Iterable[str]) -> List[Optional[bytes]]:
+    """Cached images for the fingerprints (None for misses) for the current session's user."""
+    user_id = session_user_id()
+    return [chart_cache.get(user_id, fingerprint) if user_id else None for fingerprint in fingerprints]
+
+def cache_session_chart(fingerprint: str, image: bytes) -> bool:
+    """Cache a rendered chart for the current session's user (no-op outside a request)."""
+    user_id = session_user_id()
+    if not user_id:
+        return False
+    return chart_cache.put(user_id, fingerprint, image)
@@ -0,0 +1,232 @@
+import json
+import decimal
+import logging
+import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# File extension used for dataset snapshots stored in the user's temp directory
+SNAPSHOT_EXTENSION = 'npz'
+
+def _encode_category(value) -> list:
+    """Tag a category value so that it is restored with its type (no pickling)."""
+    if isinstance(value, str):
+        return ['str', value]
+    if isinstance(value, (bool, np.bool_)):
+        return ['bool', bool(value)]
+    if isinstance(value, (int, np.integer)):
+        return ['int', int(value)]
+    if isinstance(value, (float, np.floating)):
+        return ['float', float(value)]
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        return ['timestamp', pd.Timestamp(value).isoformat()]
+    if isinstance(value, datetime.date):
+        return ['date', value.isoformat()]
+    if isinstance(value, (pd.Timedelta, datetime.timedelta, np.timedelta64)):
+        return ['timedelta', int(pd.Timedelta(value).value)]
+    if isinstance(value, decimal.Decimal):
+        return ['decimal', str(value)]
+    if isinstance(value, (list, dict)):
+        try:
+            return ['json', json.loads(json.dumps(value))]
+        except (TypeError, ValueError):
+            pass
+    raise ValueError(f"Value of type {type(value).__name__} cannot be stored without pickling")
+
+_CATEGORY_DECODERS = {
+    'str': str,
+    'bool': bool,
+    'int': int,
+    'float': float,
+    'timestamp': pd.Timestamp,
+    'date': datetime.date.fromisoformat,
+    'timedelta': pd.Timedelta,
+    'decimal': decimal.Decimal,
+    'json': lambda value: value,
+}
+
+def _factorize_key(value):
+    if isinstance(value, (list, dict)):
+        return ('json', json.dumps(value, sort_keys=True, default=str))
+    return (type(value), value)
+
+def _factorize(series: pd.Series):
+    """
+    pd.factorize, keeping values of different types apart (True is not 1) and
+    accepting the unhashable lists and dicts parsed from JSON exports.
+    """
+    if series.dtype != object or not pd.api.types.infer_dtype(series, skipna=True).startswith('mixed'):
+        return pd.factorize(series, use_na_sentinel=True)
+    # Factorize a typed, hashable key of each value and keep the first value seen for every code
+    codes, _ = pd.factorize(series.map(_factorize_key, na_action='ignore'), use_na_sentinel=True)
+    valid = np.flatnonzero(codes >= 0)
+    _, first = np.unique(codes[valid], return_index=True)
+    return codes, series.to_numpy(dtype=object)[valid[first]]
+
+class Column:
+    """
+    A single column of a ColumnarDataset.
+
+    kind is one of:
+        'str'      - dictionary encoded: int32 codes into an object array of unique values (-1 = missing)
+        'datetime' - int64 nanoseconds since the epoch (NaT as int64 min) plus an optional timezone
+        'values'   - any other NumPy array (numbers, booleans), with a boolean mask of
+                     missing values for nullable dtypes such as Int64
+
+    dtype names the pandas dtype the column is restored as when it is not the
+    default for its kind (e.g. 'category', 'string', 'Int64').
+    """
+
+    __slots__ = ('kind', 'data', 'categories', 'tz', 'mask', 'dtype')
+
+    def __init__(self, kind: str, data: np.ndarray, categories: Optional[np.ndarray] = None, tz: Optional[str] = None,
+                 mask: Optional[np.ndarray] = None, dtype: Optional[str] = None):
+        self.kind = kind
+        self.data = data
+        self.categories = categories
+        self.tz = tz
+        self.mask = mask
+        self.dtype = dtype
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> 'Column':
+        dtype = series.dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            tz = str(dtype.tz) if isinstance(dtype, pd.DatetimeTZDtype) else None
+            values = series.dt.tz_convert('UTC').dt.tz_localize(None) if tz else series
+            return cls('datetime', values.to_numpy(dtype='datetime64[ns]').view('int64'), tz=tz)
+        if dtype == object or isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype):
+            codes, uniques = _factorize(series)
+            return cls('str', codes.astype(np.int32, copy=False), categories=np.asarray(uniques, dtype=object),
+                       dtype=None if dtype == object else str(dtype))
+        if pd.api.types.is_extension_array_dtype(dtype) and hasattr(dtype, 'numpy_dtype'):
+            # Nullable numbers and booleans: the values with a placeholder where missing, plus the mask
+            mask = series.isna().to_numpy()
+            data = series.to_numpy(dtype=dtype.numpy_dtype, na_value=dtype.numpy_dtype.type(0))
+            return cls('values', data, mask=mask, dtype=str(dtype))
+        return cls('values', series.to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        size = self.data.nbytes
+        if self.mask is not None:
+            size += self.mask.nbytes
+        if self.categories is not None:
+            # Rough estimate of the Python string objects held by the categories
+            size += sum(len(c) for c in self.categories if isinstance(c, str)) + 56 * len(self.categories)
+        return size
+
+    def to_series(self, name: str, index: Optional[np.ndarray] = None) -> pd.Series:
+        """Materialise the column (optionally only the rows in index) as a pandas Series."""
+        data = self.data if index is None else self.data[index]
+        if self.kind == 'str':
+            lookup = np.append(self.categories, None)  # code -1 maps to the trailing None
+            values = pd.Series(lookup[data], name=name, dtype=object)
+            return values.astype(self.dtype) if self.dtype else values
+        if self.kind == 'datetime':
+            values = pd.Series(data.view('datetime64[ns]'), name=name)
+            return values.dt.tz_localize('UTC').dt.tz_convert(self.tz) if self.tz else values
+        values = pd.Series(data, name=name)
+        if self.dtype:
+            values = values.astype(self.dtype)
+        if self.mask is not None:
+            values = values.mask(self.mask if index is None else self.mask[index])
+        return values
+
+class ColumnarDataset:
+    """
+    Read-only, column-oriented snapshot of a processed DataFrame.
+
+    Handlers create one after processing an upload; exports are generated from it
+    on demand. meta carries small JSON-serialisable details such as the platform
+    and the export options that apply to it.
+    """
+
+    def __init__(self, columns: Dict[str, Column], meta: Optional[dict] = None):
+        self.columns = columns
+        self.meta = meta or {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, meta: Optional[dict] = None) -> 'ColumnarDataset':
+        return cls({str(name): Column.from_series(df[name]) for name in df.columns}, meta)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def to_frame(self, columns: Optional[Iterable[str]] = None, index: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Materialise the dataset (or a subset of its columns/rows) as a DataFrame."""
+        names = list(columns) if columns is not None else self.column_names
+        return pd.DataFrame({name: self.columns[name].to_series(name, index) for name in names}, copy=False)
+
+    # --- Persistence ---
+
+    def save(self, fileobj) -> None:
+        """
+        Write the dataset as an uncompressed .npz archive; no pickled objects are stored.
+
+        Categories that are all strings are stored as one UTF-8 blob with offsets;
+        any others are stored as JSON, each value tagged with its type.
+        """
+        arrays = {}
+        schema = []
+        for i, (name, column) in enumerate(self.columns.items()):
+            spec = {'name': name, 'kind': column.kind, 'tz': column.tz, 'dtype': column.dtype}
+            arrays[f"c{i}_data"] = column.data
+            if column.mask is not None:
+                arrays[f"c{i}_mask"] = column.mask
+            if column.kind == 'str':
+                if all(isinstance(value, str) for value in column.categories):
+                    encoded = [value.encode('utf-8') for value in column.categories]
+                    arrays[f"c{i}_offsets"] = np.cumsum([0] + [len(e) for e in encoded], dtype=np.int64)
+                    arrays[f"c{i}_blob"] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+                else:
+                    try:
+                        tagged = [_encode_category(value) for value in column.categories]
+                    except ValueError as e:
+                        raise ValueError(f"Column '{name}': {e}") from None
+                    spec['categories'] = 'json'
+                    arrays[f"c{i}_blob"] = np.frombuffer(json.dumps(tagged).encode('utf-8'), dtype=np.uint8)
+            elif column.data.dtype == object:
+                raise ValueError(f"Column '{name}' cannot be stored without pickling")
+            schema.append(spec)
+
+        header = json.dumps({'schema': schema, 'meta': self.meta}).encode('utf-8')
+        arrays['header'] = np.frombuffer(header, dtype=np.uint8)
+        np.savez(fileobj, **arrays)
+
+    @classmethod
+    def load(cls, fileobj) -> 'ColumnarDataset':
+        with np.load(fileobj, allow_pickle=False) as archive:
+            header = json.loads(archive['header'].tobytes().decode('utf-8'))
+            columns = {}
+            for i, spec in enumerate(header['schema']):
+                data = archive[f"c{i}_data"]
+                mask = archive[f"c{i}_mask"] if f"c{i}_mask" in archive.files else None
+                categories = None
+                if spec['kind'] == 'str':
+                    blob = archive[f"c{i}_blob"].tobytes()
+                    if spec.get('categories') == 'json':
+                        values = [_CATEGORY_DECODERS[tag](value) for tag, value in json.loads(blob.decode('utf-8'))]
+                    else:
+                        offsets = archive[f"c{i}_offsets"]
+                        values = [blob[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+                    categories = np.empty(len(values), dtype=object)
+                    categories[:] = values
+                columns[spec['name']] = Column(spec['kind'], data, categories=categories, tz=spec['tz'],
+                                               mask=mask, dtype=spec.get('dtype'))
+        return cls(columns, header['meta'])
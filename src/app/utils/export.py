@@ -0,0 +1,247 @@
+import csv
+import io
+import os
+import uuid
+import logging
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from werkzeug.datastructures import FileStorage
+
+from app.utils.dataset import ColumnarDataset, SNAPSHOT_EXTENSION
+from app.utils.file_manager import mark_file_for_cleanup
+from app.utils.file_validation import safe_save_file, sanitize_series_for_spreadsheet
+from app.utils.preview import DatasetPreview, get_dataset_preview
+from app.utils.result_cache import cache_session_result
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'txt': 'text/plain',
+}
+
+# Frames with fewer rows than this are written through pandas' openpyxl engine;
+# anything larger is streamed with a write-only workbook.
+STREAMING_EXCEL_MIN_ROWS = 1000
+
+# Number of rows materialised as Python objects at a time while streaming
+EXCEL_CHUNK_ROWS = 5000
+
+_THIN = Side(style='thin')
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+def _excel_header_row(ws, columns) -> List[WriteOnlyCell]:
+    """Build a header row styled like the one pandas writes."""
+    cells = []
+    for name in columns:
+        cell = WriteOnlyCell(ws, value=str(name))
+        cell.font = _HEADER_FONT
+        cell.border = _HEADER_BORDER
+        cell.alignment = _HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+def _excel_column_values(series: pd.Series) -> list:
+    """Convert a column slice to Excel-compatible Python values (missing values become empty cells)."""
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_localize(None)
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def iter_excel_rows(chunks: Iterable[pd.DataFrame]) -> Iterator[tuple]:
+    """Yield the rows of a sequence of frames as tuples, converting one chunk of column arrays at a time."""
+    for chunk in chunks:
+        columns = [_excel_column_values(chunk[col]) for col in chunk.columns]
+        yield from zip(*columns)
+
+def _iter_frame_chunks(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def _stream_excel(columns, chunks: Iterable[pd.DataFrame], path: str, sheet_name: str) -> int:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    ws.append(_excel_header_row(ws, columns))
+    rows = 0
+    for row in iter_excel_rows(chunks):
+        ws.append(row)
+        rows += 1
+    wb.save(path)
+    return rows
+
+def write_excel(df: pd.DataFrame, path: str, sheet_name: str = 'Sheet1') -> None:
+    """
+    Write df to an .xlsx file without the index.
+
+    Large frames are streamed through openpyxl's write-only mode, which serialises
+    rows as they are appended instead of building the whole workbook object model
+    in memory. Tiny frames keep using pandas' openpyxl engine.
+    """
+    if len(df) < STREAMING_EXCEL_MIN_ROWS:
+        df.to_excel(path, index=False, engine='openpyxl', sheet_name=sheet_name)
+        return
+
+    rows = _stream_excel(df.columns, _iter_frame_chunks(df, EXCEL_CHUNK_ROWS), path, sheet_name)
+    logger.debug(f"Streamed {rows} rows to Excel export")
+
+# --- Deferred exports ---
+#
+# Handlers only store a columnar snapshot of the processed data; the CSV, Excel and
+# URL-list files are built from it the first time they are downloaded.
+
+# Number of rows formatted at a time while writing a CSV export
+CSV_CHUNK_ROWS = 50000
+
+def strip_newlines(values: pd.Series) -> pd.Series:
+    """Replace line breaks in text values with spaces (Excel shows them as broken rows)."""
+    try:
+        mask = values.str.contains('\n', regex=False, na=False).astype(bool)
+    except AttributeError:
+        return values
+    if not mask.any():
+        return values
+    stripped = values.copy()
+    stripped[mask] = values[mask].str.replace('\n', ' ', regex=False)
+    return stripped
+
+class ExportView:
+    """
+    Read-only view over a ColumnarDataset used to write an export.
+
+    Nothing is copied up front. Text transforms run once over each column's
+    distinct values, and rows are decoded chunk by chunk as they are written,
+    so memory stays bounded by the chunk size rather than the dataset.
+    """
+
+    def __init__(self, dataset: ColumnarDataset, text_transforms: Sequence[Callable] = (), strip_tz: bool = False):
+        self.dataset = dataset
+        self.strip_tz = strip_tz
+        self._lookups = {}
+        for name, column in dataset.columns.items():
+            if column.kind != 'str':
+                continue
+            categories = pd.Series(column.categories, dtype=object)
+            for transform in text_transforms:
+                categories = transform(categories)
+            # Trailing None is what missing values (code -1) resolve to
+            self._lookups[name] = np.append(categories.to_numpy(dtype=object), None)
+
+    def __len__(self) -> int:
+        return len(self.dataset)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.dataset.column_names
+
+    def chunk(self, start: int, stop: int) -> pd.DataFrame:
+        """Return rows [start, stop) with the transforms applied."""
+        rows = slice(start, stop)
+        data = {}
+        for name, column in self.dataset.columns.items():
+            if name in self._lookups:
+                data[name] = pd.Series(self._lookups[name][column.data[rows]], dtype=object)
+                continue
+            values = column.to_series(name, rows)
+            if self.strip_tz and column.tz:
+                values = values.dt.tz_localize(None)
+            data[name] = values
+        return pd.DataFrame(data, columns=self.columns, copy=False)
+
+    def iter_chunks(self, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """Yield consecutive chunks; an empty dataset still yields one (empty) chunk."""
+        for start in range(0, max(len(self), 1), chunk_rows):
+            yield self.chunk(start, start + chunk_rows)
+
+def _build_csv(dataset: ColumnarDataset, path: str) -> None:
+    view = ExportView(dataset, text_transforms=[sanitize_series_for_spreadsheet])
+    quoting = csv.QUOTE_ALL if dataset.meta.get('csv_quote_all') else csv.QUOTE_MINIMAL
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for i, chunk in enumerate(view.iter_chunks(CSV_CHUNK_ROWS)):
+            chunk.to_csv(f, index=False, header=(i == 0), quoting=quoting)
+
+def _build_excel(dataset: ColumnarDataset, path: str) -> None:
+    view = ExportView(dataset, text_transforms=[sanitize_series_for_spreadsheet, strip_newlines], strip_tz=True)
+    if len(view) < STREAMING_EXCEL_MIN_ROWS:
+        write_excel(view.chunk(0, len(view)), path)
+        return
+    rows = _stream_excel(view.columns, view.iter_chunks(EXCEL_CHUNK_ROWS), path, 'Sheet1')
+    logger.debug(f"Streamed {rows} rows to Excel export")
+
+def _build_url_list(dataset: ColumnarDataset, path: str) -> None:
+    url_column = dataset.meta.get('url_column')
+    urls = dataset.to_frame([url_column])[url_column].dropna().tolist() if url_column else []
+    url_content = '\n'.join([url for url in urls if url and url.strip()])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(url_content)
+
+EXPORT_BUILDERS = {
+    'csv': _build_csv,
+    'xlsx': _build_excel,
+    'txt': _build_url_list,
+}
+
+def save_dataset_snapshot(df: pd.DataFrame, meta: Dict, directory: str) -> str:
+    """
+    Store a columnar snapshot of df in directory and return its export id.
+
+    The exports listed in meta['exports'] are then available as '<export id>.<ext>'
+    through materialize_export. The snapshot is marked for cleanup so it only lives
+    for the download window.
+    """
+    snapshot_name = f"{uuid.uuid4()}.{SNAPSHOT_EXTENSION}"
+    dataset = ColumnarDataset.from_frame(df, meta)
+    buffer = io.BytesIO()
+    dataset.save(buffer)
+    buffer.seek(0)
+
+    file_storage = FileStorage(stream=buffer, filename=snapshot_name, content_type='application/octet-stream')
+    snapshot_path = safe_save_file(file_storage, snapshot_name, directory)
+    mark_file_for_cleanup(snapshot_path)
+    export_id = os.path.basename(snapshot_path).split('.')[0]
+
+    # Keep the dataset in memory so previews and downloads don't have to read it back
+    preview = DatasetPreview(dataset)
+    cache_session_result(('dataset', export_id), preview, preview.nbytes)
+    return export_id
+
+def materialize_export(directory: str, filename: str) -> Optional[str]:
+    """
+    Build the export '<export id>.<ext>' in directory from its dataset snapshot.
+
+    Returns the path of the generated file, or None when there is no snapshot
+    offering that export.
+    """
+    export_id, _, ext = filename.rpartition('.')
+    if not export_id or ext not in EXPORT_BUILDERS:
+        return None
+
+    preview = get_dataset_preview(directory, export_id)
+    if preview is None:
+        return None
+
+    dataset = preview.dataset
+    if ext not in dataset.meta.get('exports', []):
+        return None
+
+    # Build into a private temp file first so a concurrent request never sees a partial export
+    fd, temp_path = tempfile.mkstemp(suffix=f".{ext}", dir=directory)
+    os.close(fd)
+    try:
+        EXPORT_BUILDERS[ext](dataset, temp_path)
+        export_path = os.path.join(directory, filename)
+        os.replace(temp_path, export_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    logger.debug(f"Generated {ext} export from dataset snapshot")
+    return export_path
@@ -1,11 +1,121 @@
 import os
 import time
+import heapq
+import queue
+import atexit
 import tempfile
 import shutil
-import json
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from flask import session, current_app
 import secrets
 
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # No advisory file locks (Windows): every worker reaps on its own
+    fcntl = None
+
+# Directory holding the per-session user_* directories (default: data-mirroring in the system temp dir)
+USER_TEMP_BASE_DIR = os.getenv('USER_TEMP_BASE_DIR')
+
+# Secure deletion overwrites files in chunks of at most this size, so its memory use doesn't grow with the file
+SECURE_DELETE_CHUNK_BYTES = int(os.getenv('SECURE_DELETE_CHUNK_KB', '1024')) * 1024
+# Draw fresh random bytes for every chunk ('true'), or repeat one random chunk per deletion run ('false')
+SECURE_DELETE_FRESH_RANDOM = os.getenv('SECURE_DELETE_FRESH_RANDOM', 'true').lower() == 'true'
+# Flush the overwrite to disk before unlinking, so it doesn't just replace pages in the cache
+SECURE_DELETE_FSYNC = os.getenv('SECURE_DELETE_FSYNC', 'true').lower() == 'true'
+# Paths waiting for the background deleter; when the queue is full, the caller deletes synchronously
+DELETION_QUEUE_SIZE = int(os.getenv('DELETION_QUEUE_SIZE', '1024'))
+
+# Set by batch processing (app.batch) to run the handlers without a Flask request:
+# everything they write goes to this directory instead of a session's temp dir
+_output_directory: ContextVar = ContextVar('output_directory', default=None)
+
+@contextmanager
+def output_directory(path):
+    """Within this block, get_user_temp_dir() returns path and nothing is marked for cleanup."""
+    os.makedirs(path, exist_ok=True)
+    token = _output_directory.set(path)
+    try:
+        yield path
+    finally:
+        _output_directory.reset(token)
+
+class RandomFill:
+    """
+    Random bytes for overwriting files, handed out as views of one buffer of at
+    most chunk_size bytes from os.urandom (the kernel CSPRNG). The buffer starts
+    small and doubles as needed, so a deletion costs memory in proportion to the
+    chunk size, never to the file. Sharing one fill between deletions lets many
+    small files use up a single random buffer instead of drawing one each.
+    With fresh=False a full buffer is reused instead of being redrawn.
+    """
+
+    def __init__(self, chunk_size=None, fresh=None):
+        self.chunk_size = chunk_size or SECURE_DELETE_CHUNK_BYTES
+        self.fresh = SECURE_DELETE_FRESH_RANDOM if fresh is None else fresh
+        self._buffer = b''
+        self._pos = 0
+
+    def take(self, size):
+        """The next size (at most chunk_size) random bytes, as a memoryview."""
+        if self._pos + size > len(self._buffer):
+            if self.fresh or len(self._buffer) < size:
+                next_size = min(self.chunk_size, max(size, 2 * len(self._buffer)))
+                self._buffer = b''  # Release the old buffer before drawing the next one
+                self._buffer = os.urandom(next_size)
+            self._pos = 0
+        view = memoryview(self._buffer)[self._pos:self._pos + size]
+        self._pos += size
+        return view
+
+class ExpiryIndex:
+    """
+    Files marked for cleanup by this worker, in a min-heap ordered by the time
+    they are to be deleted. Marking a file is O(log n); pop_due() only looks at
+    the top of the heap, so a request that has nothing to clean up costs a
+    comparison instead of a scan of the user's directory. A file that is marked
+    again or protected leaves its old heap entry behind; stale entries are
+    skipped when they come up.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._heap = []  # (delete_after, path)
+        self._deadlines = {}  # path -> delete_after of its current mark
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def mark(self, path, delay):
+        """Schedule path for deletion delay seconds from now (replacing an earlier mark)."""
+        delete_after = self._clock() + delay
+        with self._lock:
+            self._deadlines[path] = delete_after
+            heapq.heappush(self._heap, (delete_after, path))
+
+    def unmark(self, path):
+        """Cancel the scheduled deletion of path; returns whether it was marked."""
+        with self._lock:
+            return self._deadlines.pop(path, None) is not None
+
+    def pop_due(self):
+        """Remove and return the paths whose deletion time has passed."""
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                delete_after, path = heapq.heappop(self._heap)
+                if self._deadlines.get(path) == delete_after:
+                    del self._deadlines[path]
+                    due.append(path)
+        return due
+
 class TemporaryFileManager:
     """
     A centralized manager for handling temporary file operations,
@@ -18,6 +128,14 @@ class TemporaryFileManager:
     MAX_TEMP_STORAGE_MB = 500  # Maximum total temporary storage per user
     MAX_FILE_AGE_SECONDS = 1800  # Maximum file age (30 minutes)
 
+    # Files marked for cleanup in this worker process
+    expiry_index = ExpiryIndex()
+
+    # Name of the base directory of the user directories inside the system temp dir
+    BASE_DIR_NAME = 'data-mirroring'
+    # User directories are renamed to this prefix when their session ends, until they are purged
+    DELETING_PREFIX = 'deleting_'
+
     @staticmethod
     def generate_secure_session_id():
         """
@@ -28,6 +146,34 @@ class TemporaryFileManager:
         """
         return secrets.token_urlsafe(32)
 
+    @classmethod
+    def get_base_temp_dir(cls, create=True):
+        """
+        The directory all user directories live in. Keeping them out of the shared
+        system temp dir means the reaper only ever looks at this app's directories.
+        
+        Args:
+            create (bool): Whether to create the directory if it doesn't exist
+            
+        Returns:
+            str: Path to the base directory
+        """
+        base_dir = USER_TEMP_BASE_DIR or os.path.join(tempfile.gettempdir(), cls.BASE_DIR_NAME)
+        if create:
+            os.makedirs(base_dir, mode=0o700, exist_ok=True)
+        return base_dir
+
+    @classmethod
+    def _iter_user_dirs(cls, base_dir, prefixes=('user_',)):
+        """os.DirEntry of every user directory (by name prefix) in base_dir; their stat results are cached."""
+        try:
+            with os.scandir(base_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith(prefixes) and entry.is_dir(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            return
+
     @classmethod
     def get_user_temp_dir(cls, create=True):
         """
@@ -39,6 +185,10 @@ class TemporaryFileManager:
         Returns:
             str: Path to the user's temporary directory
         """
+        override = _output_directory.get()
+        if override is not None:
+            return override
+
         # Use a more secure session ID generation
         user_session_id = session.get('user_id') or cls.generate_secure_session_id()
         
@@ -47,7 +197,7 @@ class TemporaryFileManager:
         
         # Create a unique, secure temporary directory
         user_temp_dir = os.path.join(
-            tempfile.gettempdir(), 
+            cls.get_base_temp_dir(create=create), 
             f"user_{user_session_id}"
         )
         
@@ -82,147 +232,102 @@ class TemporaryFileManager:
             file_path (str): Full path to the file to be protected
         """
         try:
-            # Remove any existing metadata that might trigger deletion
-            metadata_path = f"{file_path}.metadata"
-            if os.path.exists(metadata_path):
-                os.remove(metadata_path)
+            # Cancel any scheduled deletion while the file is being served
+            cls.expiry_index.unmark(file_path)
         except Exception as e:
             current_app.logger.error(f"Error protecting file: {e}")
 
     @classmethod
     def mark_file_for_cleanup(cls, file_path):
         """
-        Enhanced file cleanup marking with additional metadata.
+        Schedule a file for secure deletion once the download window has passed.
         
         Args:
             file_path (str): Full path to the file to be marked for cleanup
         """
+        # Batch outputs are kept
+        if _output_directory.get() is not None:
+            return
+
         try:
             # Validate file exists
             if not os.path.exists(file_path):
                 return
 
-            # Create enhanced metadata
-            metadata_path = f"{file_path}.metadata"
-            metadata = {
-                'original_path': file_path,
-                'mark_time': time.time(),
-                'delete_after': time.time() + cls.DOWNLOAD_WINDOW,
-                'file_hash': cls._generate_file_hash(file_path)
-            }
-            
-            # Write metadata securely
-            with open(metadata_path, 'w', opener=lambda path, flags: os.open(path, flags, 0o600)) as f:
-                json.dump(metadata, f)
+            cls.expiry_index.mark(file_path, cls.DOWNLOAD_WINDOW)
             
             current_app.logger.info(f"Enhanced file cleanup mark: {os.path.basename(file_path)}")
         
         except Exception as e:
             current_app.logger.error(f"Enhanced file cleanup marking failed: {e}")
 
-    @staticmethod
-    def _generate_file_hash(file_path, algorithm='sha256'):
-        """
-        Generate a cryptographic hash of a file.
-        
-        Args:
-            file_path (str): Path to the file
-            algorithm (str): Hash algorithm to use
-        
-        Returns:
-            str: Hexadecimal hash of the file
-        """
-        import hashlib
-        
-        try:
-            # Security Check: Ensure file is inside the temp directory
-            temp_dir = os.path.realpath(tempfile.gettempdir())
-            real_file_path = os.path.realpath(file_path)
-            
-            if not real_file_path.startswith(temp_dir):
-                current_app.logger.warning(f"Blocked attempt to read file outside temp dir: {file_path}")
-                return None
-
-            hash_obj = hashlib.new(algorithm)
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b''):
-                    hash_obj.update(chunk)
-            return hash_obj.hexdigest()
-        except Exception as e:
-            current_app.logger.error(f"File hash generation failed: {e}")
-            return None
-
     @classmethod
     def cleanup_temp_files(cls, _exception=None):
         """
-        Enhanced cleanup with additional security checks.
+        Securely delete the marked files whose download window has passed.
+
+        Only the due entries of the expiry index are looked at; directories are
+        not scanned.
         
         Args:
             _exception (Exception, optional): Exception from request processing (unused; required by teardown signature)
         """
-        temp_dir = cls.get_user_temp_dir(create=False)
-        current_time = time.time()
-        
-        try:
-            # Race condition check: Ensure directory exists before listing
-            if not os.path.exists(temp_dir):
-                return
-
-            for item in os.listdir(temp_dir):
-                item_path = os.path.join(temp_dir, item)
-                metadata_path = f"{item_path}.metadata"
-                
-                # Check if metadata exists
-                if os.path.exists(metadata_path):
-                    try:
-                        # Read enhanced metadata
-                        with open(metadata_path, 'r') as f:
-                            metadata = json.load(f)
-                        
-                        deletion_time = metadata.get('delete_after', current_time)
-                        
-                        # Delete if deletion time has passed
-                        if deletion_time <= current_time:
-                            if os.path.exists(item_path):
-                                # Overwrite file contents before deletion
-                                cls._secure_file_delete(item_path)
-                            
-                            # Remove metadata
-                            if os.path.exists(metadata_path):
-                                os.remove(metadata_path)
-                            
-                            current_app.logger.info(f"Securely cleaned up expired file: {os.path.basename(item_path)}")
-                    
-                    except Exception as e:
-                        current_app.logger.warning(f"Error processing cleanup for {item_path}: {e}")
-        
-        except FileNotFoundError:
-            # Directory might have been removed by a concurrent request, which is fine
-            pass
-        except Exception as e:
-            current_app.logger.error(f"Secure temporary file cleanup failed: {e}")
+        # Files that are gone already went with their session's directory
+        expired = [file_path for file_path in cls.expiry_index.pop_due() if os.path.exists(file_path)]
+        for file_path in expired:
+            deletion_queue.submit(file_path)
+        if expired:
+            current_app.logger.info(f"Queued {len(expired)} expired file(s) for secure deletion")
 
     @staticmethod
-    def _secure_file_delete(file_path):
+    def _secure_file_delete(file_path, fill=None):
         """
-        Securely delete a file by overwriting its contents.
+        Securely delete a file by overwriting its contents in place, chunk by chunk.
         
         Args:
             file_path (str): Path to the file to be securely deleted
+            fill (RandomFill, optional): Source of the random bytes, shared when deleting a batch of files
+        
+        Raises:
+            OSError: If the file can't be overwritten or removed
         """
-        try:
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
-            # Overwrite with random data
-            with open(file_path, 'wb') as f:
-                f.write(os.urandom(file_size))
-            
-            # Remove the file
-            os.remove(file_path)
+        # Overwrite the existing blocks ('wb' would truncate and let the filesystem allocate new ones)
+        with open(file_path, 'r+b') as f:
+            remaining = os.fstat(f.fileno()).st_size
+            fill = fill or RandomFill(min(remaining, SECURE_DELETE_CHUNK_BYTES))
+            while remaining > 0:
+                size = min(remaining, fill.chunk_size)
+                f.write(fill.take(size))
+                remaining -= size
+            if SECURE_DELETE_FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
         
-        except Exception as e:
-            current_app.logger.error(f"Secure file deletion failed: {e}")
+        # Remove the file
+        os.remove(file_path)
+
+    @classmethod
+    def _secure_delete_files(cls, file_paths, on_error=None):
+        """
+        Securely delete a batch of files, drawing their overwrite bytes from one shared RandomFill.
+        
+        Args:
+            file_paths (Iterable[str]): Files to delete
+            on_error (Callable[[str], None] | None): Optional callback for per-file error reporting
+            
+        Returns:
+            int: Number of files deleted
+        """
+        fill = RandomFill()
+        deleted = 0
+        for file_path in file_paths:
+            try:
+                cls._secure_file_delete(file_path, fill)
+                deleted += 1
+            except Exception as e:
+                if on_error:
+                    on_error(f"Error deleting {file_path}: {e}")
+        return deleted
 
     @classmethod
     def _secure_purge_directory(cls, dir_path: str, *, on_error=None, remove_self: bool = True) -> None:
@@ -239,16 +344,14 @@ class TemporaryFileManager:
             if not os.path.isdir(dir_path):
                 return
 
-            for entry in os.listdir(dir_path):
-                file_path = os.path.join(dir_path, entry)
-                try:
-                    if os.path.isfile(file_path):
-                        cls._secure_file_delete(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path, ignore_errors=True)
-                except Exception as e:
-                    if on_error:
-                        on_error(f"Error deleting {file_path}: {e}")
+            files = []
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        files.append(entry.path)
+                    elif entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path, ignore_errors=True)
+            cls._secure_delete_files(files, on_error=on_error)
 
             if remove_self:
                 shutil.rmtree(dir_path, ignore_errors=True)
@@ -257,8 +360,7 @@ class TemporaryFileManager:
             if on_error:
                 on_error(f"Error purging directory {dir_path}: {e}")
             else:
-                # Avoid relying on Flask logger here; this helper is used outside app context too
-                print(f"Error purging directory {dir_path}: {e}")
+                logger.error(f"Error purging directory {dir_path}: {e}")
 
     @classmethod
     def cleanup_all_temp_files(cls):
@@ -267,34 +369,30 @@ class TemporaryFileManager:
         This ensures no user data persists through server restarts.
         """
         try:
-            temp_base_dir = tempfile.gettempdir()
-            print("Starting server startup cleanup of all temporary files")
+            logger.info("Starting server startup cleanup of all temporary files")
             
-            # Find all user_* directories in temp directory
+            # User directories of earlier versions were kept directly in the system temp dir
             cleaned_count = 0
-            for item in os.listdir(temp_base_dir):
-                if item.startswith('user_'):
-                    user_temp_dir = os.path.join(temp_base_dir, item)
-                    
+            for base_dir in (cls.get_base_temp_dir(create=False), tempfile.gettempdir()):
+                for entry in list(cls._iter_user_dirs(base_dir, ('user_', cls.DELETING_PREFIX))):
                     try:
-                        if os.path.isdir(user_temp_dir):
-                            # Securely purge the directory and remove it
-                            cls._secure_purge_directory(
-                                user_temp_dir,
-                                on_error=lambda msg: print(msg),
-                                remove_self=True,
-                            )
-                            cleaned_count += 1
-                            print(f"Cleaned up orphaned user directory: {item}")
+                        # Securely purge the directory and remove it
+                        cls._secure_purge_directory(
+                            entry.path,
+                            on_error=logger.error,
+                            remove_self=True,
+                        )
+                        cleaned_count += 1
+                        logger.info(f"Cleaned up orphaned user directory: {entry.name}")
                     
                     except Exception as e:
-                        print(f"Error cleaning up {user_temp_dir}: {e}")
+                        logger.error(f"Error cleaning up {entry.path}: {e}")
             
-            print(f"Server startup cleanup completed. Cleaned {cleaned_count} user directories")
+            logger.info(f"Server startup cleanup completed. Cleaned {cleaned_count} user directories")
             return cleaned_count
             
         except Exception as e:
-            print(f"Server startup cleanup failed: {e}")
+            logger.error(f"Server startup cleanup failed: {e}")
             return 0
 
     @classmethod
@@ -309,9 +407,10 @@ class TemporaryFileManager:
         def initialize_request_cleanup():
             """Prepare for new session with security checks."""
             try:
-                temp_dir = cls.get_user_temp_dir()
+                # Assigns the session its user id; the directory is created when a file is written
+                cls.get_user_temp_dir(create=False)
                 
-                # Perform cleanup
+                # Delete the files that are due
                 cls.cleanup_temp_files()
             
             except Exception as e:
@@ -329,12 +428,7 @@ class TemporaryFileManager:
                 # Perform final cleanup
                 cls.cleanup_temp_files(exception)
                 
-                # Check for empty directory without aggressive removal to avoid race conditions
-                # Directory will be cleaned up by periodic cleanup or session expiration
-                temp_dir = cls.get_user_temp_dir(create=False)
-                if os.path.exists(temp_dir) and not os.listdir(temp_dir):
-                     # Optional: could log empty state, but avoid rmtree here
-                     pass
+                # Empty directories are left to the periodic cleanup or session expiration
             
             except Exception as cleanup_error:
                 current_app.logger.error(f"Final cleanup error: {cleanup_error}")
@@ -372,24 +466,8 @@ class TemporaryFileManager:
             except Exception as e:
                 current_app.logger.error(f"Session cleanup check error: {e}")
 
-        # Reduced periodic cleanup - only for server startup and edge cases
-        import threading
-        import time
-        
-        def periodic_cleanup():
-            """Run periodic cleanup every 2 minutes for edge cases only."""
-            while True:
-                try:
-                    time.sleep(120)  # 2 minutes (reduced from 5)
-                    with app.app_context():
-                        cls.cleanup_orphaned_files()
-                except Exception as e:
-                    with app.app_context():
-                        app.logger.error(f"Periodic cleanup error: {e}")
-        
-        # Start periodic cleanup in a background thread
-        cleanup_thread = threading.Thread(target=periodic_cleanup, daemon=True)
-        cleanup_thread.start()
+        # Periodic cleanup of orphaned directories, by one elected worker per host
+        orphan_reaper.start(app)
         app.logger.info("Enhanced session-based cleanup registered")
 
     @classmethod
@@ -402,65 +480,252 @@ class TemporaryFileManager:
             user_id (str): The user's session ID
         """
         try:
-            temp_base_dir = tempfile.gettempdir()
-            user_temp_dir = os.path.join(temp_base_dir, f"user_{user_id}")
+            user_temp_dir = os.path.join(cls.get_base_temp_dir(create=False), f"user_{user_id}")
             
             if os.path.exists(user_temp_dir) and os.path.isdir(user_temp_dir):
-                # Securely delete all files in the directory
-                for file_item in os.listdir(user_temp_dir):
-                    file_path = os.path.join(user_temp_dir, file_item)
-                    try:
-                        if os.path.isfile(file_path):
-                            cls._secure_file_delete(file_path)
-                        elif os.path.isdir(file_path):
-                            shutil.rmtree(file_path, ignore_errors=True)
-                    except Exception as e:
-                        current_app.logger.error(f"Error deleting {file_path}: {e}")
-                
-                # Remove the user directory itself
-                shutil.rmtree(user_temp_dir, ignore_errors=True)
+                # Take the directory out of reach at once; its files are overwritten in the background
+                deleting_dir = os.path.join(os.path.dirname(user_temp_dir), f"{cls.DELETING_PREFIX}{secrets.token_hex(8)}")
+                os.rename(user_temp_dir, deleting_dir)
+                deletion_queue.submit(deleting_dir)
                 current_app.logger.info(f"Immediate cleanup completed for user: {user_id}")
+
+            # Drop processed results held in memory for this session as well
+            from app.utils.result_cache import result_cache
+            result_cache.purge_user(user_id)
+            from app.utils.chart_cache import chart_cache
+            chart_cache.purge_user(user_id)
+            from app.utils.artifact_store import purge_user_artifacts
+            purge_user_artifacts(user_id)
                 
         except Exception as e:
             current_app.logger.error(f"Immediate user cleanup failed for {user_id}: {e}")
 
+    @classmethod
+    def purge_expired_memory(cls):
+        """
+        Drop this process's expired in-memory results, including those of sessions
+        that never come back to read or clean them up.
+
+        Returns:
+            int: Number of entries removed
+        """
+        from app.utils.result_cache import result_cache
+        from app.utils.chart_cache import chart_cache
+        from app.utils.artifact_store import ARTIFACT_STORES
+        return (result_cache.purge_expired() + chart_cache.purge_expired()
+                + ARTIFACT_STORES['memory'].purge_expired())
+
     @classmethod
     def cleanup_orphaned_files(cls):
         """
         Clean up orphaned files that may have been left behind.
-        This runs periodically to catch any files that weren't cleaned up properly.
+        Run periodically by the OrphanReaper to catch any files that weren't cleaned up properly.
+        
+        Returns:
+            int: Number of user directories removed
         """
         try:
-            temp_base_dir = tempfile.gettempdir()
             current_time = time.time()
             cleaned_count = 0
             
-            for item in os.listdir(temp_base_dir):
-                if item.startswith('user_'):
-                    user_temp_dir = os.path.join(temp_base_dir, item)
-                    
-                    try:
-                        if os.path.isdir(user_temp_dir):
-                            # Check if directory is older than 30 minutes (orphaned)
-                            dir_age = current_time - os.path.getctime(user_temp_dir)
-                            if dir_age > 1800:  # 30 minutes
-                                # Securely purge the directory and remove it
-                                cls._secure_purge_directory(
-                                    user_temp_dir,
-                                    on_error=lambda msg: print(msg),
-                                    remove_self=True,
-                                )
-                                cleaned_count += 1
-                                print(f"Cleaned up orphaned directory: {item}")
-                    
-                    except Exception as e:
-                        print(f"Error cleaning up {user_temp_dir}: {e}")
+            base_dir = cls.get_base_temp_dir(create=False)
+            for entry in list(cls._iter_user_dirs(base_dir, ('user_', cls.DELETING_PREFIX))):
+                try:
+                    # Check if directory is older than 30 minutes (orphaned)
+                    dir_age = current_time - entry.stat(follow_symlinks=False).st_ctime
+                    if dir_age > cls.MAX_FILE_AGE_SECONDS:
+                        # Securely purge the directory and remove it
+                        cls._secure_purge_directory(
+                            entry.path,
+                            on_error=logger.error,
+                            remove_self=True,
+                        )
+                        cleaned_count += 1
+                        logger.info(f"Cleaned up orphaned directory: {entry.name}")
+                
+                except Exception as e:
+                    logger.error(f"Error cleaning up {entry.path}: {e}")
             
             if cleaned_count > 0:
-                print(f"Periodic cleanup completed. Cleaned {cleaned_count} orphaned directories")
+                logger.info(f"Periodic cleanup completed. Cleaned {cleaned_count} orphaned directories")
+            return cleaned_count
             
         except Exception as e:
-            print(f"Periodic cleanup failed: {e}")
+            logger.error(f"Periodic cleanup failed: {e}")
+            return 0
+
+class OrphanReaper:
+    """
+    Periodic removal of orphaned user directories, coordinated across workers.
+
+    Every worker process runs a reaper thread, but only the process holding an
+    exclusive fcntl lock on LOCK_NAME in the base directory scans it. The others
+    retry the lock (a single non-blocking system call) every interval and take
+    over once the holder exits and the OS releases its lock.
+    """
+
+    LOCK_NAME = '.reaper.lock'
+
+    def __init__(self, interval=120):
+        self.interval = interval
+        self._lock_fd = None
+        self._lock_pid = None
+        self._thread = None
+
+    def is_elected(self):
+        """Whether this process is the host's reaper, taking the lock if it is free."""
+        if fcntl is None:
+            return True
+        # A forked child shares its parent's lock instead of holding its own
+        if self._lock_fd is not None and self._lock_pid == os.getpid():
+            return True
+
+        lock_path = os.path.join(TemporaryFileManager.get_base_temp_dir(), self.LOCK_NAME)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd, self._lock_pid = fd, os.getpid()
+        return True
+
+    def release(self):
+        """Give up the reaper role (the lock is also released when the process exits)."""
+        if self._lock_fd is not None and self._lock_pid == os.getpid():
+            os.close(self._lock_fd)
+        self._lock_fd = self._lock_pid = None
+
+    def run_once(self):
+        """Reap orphaned directories if this process is the elected reaper; returns how many were removed."""
+        if not self.is_elected():
+            return 0
+        return TemporaryFileManager.cleanup_orphaned_files()
+
+    def sweep(self):
+        """
+        One pass of the periodic thread. Every worker frees its own expired memory
+        and the files its expiry index has due, so they go even if the worker gets
+        no more requests; only the elected reaper then scans the disk.
+        """
+        TemporaryFileManager.purge_expired_memory()
+        TemporaryFileManager.cleanup_temp_files()
+        return self.run_once()
+
+    def start(self, app):
+        """Start this process's reaper thread (once, however many apps are created)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def periodic_cleanup():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    with app.app_context():
+                        self.sweep()
+                except Exception as e:
+                    with app.app_context():
+                        app.logger.error(f"Periodic cleanup error: {e}")
+
+        self._thread = threading.Thread(target=periodic_cleanup, daemon=True, name='orphan-reaper')
+        self._thread.start()
+
+orphan_reaper = OrphanReaper()
+
+class DeletionQueue:
+    """
+    Secure deletion of files and directories in a background thread, so request
+    threads only enqueue paths. The worker deletes whatever has queued up as one
+    batch (see TemporaryFileManager._secure_delete_files). The queue is bounded:
+    when it is full, submit() deletes the path in the calling thread rather than
+    blocking. drain() runs at interpreter exit and finishes the queued work, so a
+    graceful restart leaves no file behind.
+    """
+
+    def __init__(self, maxsize):
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def submit(self, path):
+        """Queue path for secure deletion; returns False if it was deleted synchronously instead."""
+        if not self._closed and self._ensure_worker():
+            try:
+                self._queue.put_nowait(path)
+                return True
+            except queue.Full:
+                logger.warning("Deletion queue full, deleting synchronously")
+        self._delete([path])
+        return False
+
+    def join(self):
+        """Wait until everything queued so far has been deleted."""
+        self._queue.join()
+
+    def drain(self, timeout=None):
+        """Stop accepting paths and delete everything still queued."""
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+        # Without a worker (e.g. in a forked child) the remaining paths are deleted here
+        pending = []
+        while True:
+            try:
+                path = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if path is not None:
+                pending.append(path)
+            self._queue.task_done()
+        self._delete(pending)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._closed:
+                    return False
+                self._thread = threading.Thread(target=self._run, daemon=True, name='secure-deleter')
+                self._thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Take everything else that is waiting, so small files share one random buffer
+            while len(batch) < 256:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._delete([path for path in batch if path is not None])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if None in batch:
+                return
+
+    @staticmethod
+    def _delete(paths):
+        files = []
+        for path in paths:
+            try:
+                if os.path.isdir(path):
+                    TemporaryFileManager._secure_purge_directory(path, on_error=logger.error, remove_self=True)
+                elif os.path.exists(path):
+                    files.append(path)
+            except Exception as e:
+                logger.error(f"Error deleting {path}: {e}")
+        TemporaryFileManager._secure_delete_files(files, on_error=logger.error)
+
+deletion_queue = DeletionQueue(DELETION_QUEUE_SIZE)
+atexit.register(deletion_queue.drain)
 
 # Convenience imports and functions
 get_user_temp_dir = TemporaryFileManager.get_user_temp_dir
@@ -2,8 +2,9 @@ import os
 import json
 import logging
 from werkzeug.utils import secure_filename
-from flask import g
+from flask import g, has_app_context
 import magic  # python-magic package for MIME type detection
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -19,18 +20,65 @@ def sanitize_filename(filename):
         
     return sanitized
     
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
 def sanitize_for_spreadsheet(value):
-    if isinstance(value, str) and value.startswith(('=', '+', '-', '@')):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
         return f"'{value}"
     return value
 
-def validate_file_size(file, max_size_mb=16):
+def sanitize_series_for_spreadsheet(series):
+    """Vectorised sanitize_for_spreadsheet: prefix only the cells that look like formulas."""
+    try:
+        mask = series.str.startswith(FORMULA_PREFIXES, na=False)
+    except AttributeError:
+        # Object column without any strings (e.g. dates), nothing to sanitise
+        return series
+
+    mask = mask.astype(bool)
+    if not mask.any():
+        return series
+
+    sanitized = series.copy()
+    sanitized[mask] = "'" + series[mask]
+    return sanitized
+
+def sanitize_dataframe_for_spreadsheet(df):
+    """
+    Return a frame whose object columns are sanitised against spreadsheet injection.
+
+    Columns that need no change are shared with the input instead of being copied,
+    so the result can be reused for every export format.
+    """
+    columns = {col: df[col] for col in df.columns}
+    changed = False
+    for col in df.select_dtypes(include=['object']).columns:
+        sanitized = sanitize_series_for_spreadsheet(columns[col])
+        if sanitized is not columns[col]:
+            columns[col] = sanitized
+            changed = True
+
+    if not changed:
+        return df
+    return pd.DataFrame(columns, copy=False)
+
+def validate_file_size(file, max_size_mb=16, digest=None, chunk_size=1024 * 1024):
 
     max_size_bytes = max_size_mb * 1024 * 1024
     
     # Get file size
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
+    if digest is None:
+        file.seek(0, os.SEEK_END)
+        file_size = file.tell()
+    else:
+        # Read the upload once, feeding its bytes to the digest (stops as soon as the limit is passed)
+        file.seek(0)
+        file_size = 0
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            file_size += len(chunk)
+            if file_size > max_size_bytes:
+                break
+            digest.update(chunk)
     file.seek(0)  # Reset file pointer to beginning
     
     if file_size > max_size_bytes:
@@ -108,7 +156,12 @@ def get_mime_types_for_extension(ext):
     
     return mime_map.get(ext.lower(), [])
 
-def validate_file(file, allowed_extensions=None, max_size_mb=16, validate_mime=True):
+def validate_file(file, allowed_extensions=None, max_size_mb=16, validate_mime=True, digest=None):
+    """
+    Validate an upload's name, size, extension and content type. If digest (a
+    hashlib object) is given, the upload's bytes are fed to it while its size
+    is checked, so hashing needs no separate pass.
+    """
 
     if not file or not hasattr(file, 'filename') or file.filename == '':
         return False, None, "No file provided"
@@ -121,7 +174,7 @@ def validate_file(file, allowed_extensions=None, max_size_mb=16, validate_mime=T
         return False, None, "Invalid filename"
     
     # Validate file size
-    if not validate_file_size(file, max_size_mb):
+    if not validate_file_size(file, max_size_mb, digest):
         return False, sanitized_filename, f"File exceeds maximum size of {max_size_mb}MB"
     
     # Check file extension
@@ -169,7 +222,7 @@ def safe_save_file(file, filename=None, directory=None):
     logger.info(f"File saved securely at: {real_file_path}")
     
     # Register the file for automatic cleanup
-    if hasattr(g, 'files_to_cleanup') and real_file_path not in g.files_to_cleanup:
+    if has_app_context() and hasattr(g, 'files_to_cleanup') and real_file_path not in g.files_to_cleanup:
         g.files_to_cleanup.append(real_file_path)
     
     # Set secure permissions
@@ -0,0 +1,101 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from flask import has_request_context, session
+
+class TTLCache:
+    """
+    Thread-safe in-memory mapping with a byte budget, the building block of the
+    per-process caches of session data (results, chart images, artifacts).
+
+    Every entry records its size and expires ttl_seconds after it was stored, or
+    after it was last read with refresh_on_get. A put that takes the total over
+    max_bytes evicts the least recently used entries; with evict=False the put is
+    refused instead, once expired entries have been dropped, so stored entries
+    stay available until they expire.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock=time.monotonic,
+                 evict: bool = True, refresh_on_get: bool = False):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.evict = evict
+        self.refresh_on_get = refresh_on_get
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()  # key -> (value, nbytes, expires_at)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, key: Hashable, value: Any, nbytes: int) -> bool:
+        """Store value under key; returns False if it was not stored."""
+        if nbytes > self.max_bytes:
+            return False
+
+        with self._lock:
+            self._remove(key)
+            if not self.evict and self._total_bytes + nbytes > self.max_bytes:
+                self._purge_expired()
+                if self._total_bytes + nbytes > self.max_bytes:
+                    return False
+            self._entries[key] = (value, nbytes, self._clock() + self.ttl_seconds)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            now = self._clock()
+            if entry[2] <= now:
+                self._remove(key)
+                return None
+            if self.refresh_on_get:
+                self._entries[key] = (entry[0], entry[1], now + self.ttl_seconds)
+            if self.evict:
+                self._entries.move_to_end(key)
+            return entry[0]
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def purge(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Remove the entries for which predicate(key, value) is true; return how many were removed."""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if predicate(key, entry[0])]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def purge_expired(self) -> int:
+        """Remove every expired entry, read or not; return how many were removed."""
+        with self._lock:
+            return self._purge_expired()
+
+    def _purge_expired(self) -> int:
+        now = self._clock()
+        keys = [key for key, entry in self._entries.items() if entry[2] <= now]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+def session_user_id() -> Optional[str]:
+    """The current session's user id, None outside a request or before the session has one."""
+    return session.get('user_id') if has_request_context() else None
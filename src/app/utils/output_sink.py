@@ -0,0 +1,133 @@
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import pandas as pd
+
+from app.utils.artifact_store import save_session_artifact
+from app.utils.dataset import ColumnarDataset
+from app.utils.export import EXPORT_BUILDERS, save_dataset_snapshot
+from app.utils.file_manager import get_user_temp_dir
+
+logger = logging.getLogger(__name__)
+
+class ProcessingResult:
+    """
+    Outcome of processing an upload: the processed DataFrame, its insights and
+    preview, and the names under which the sink stored the charts (by chart name,
+    e.g. 'day_heatmap') and the exports (by extension). Charts or exports the
+    sink did not want are missing or None.
+    """
+
+    __slots__ = ('platform', 'df', 'insights', 'charts', 'exports', 'preview', 'has_valid_data')
+
+    def __init__(self, platform: str, df: pd.DataFrame, insights: Dict, charts: Dict[str, Optional[str]],
+                 exports: Dict[str, str], preview: Dict, has_valid_data: bool = True):
+        self.platform = platform
+        self.df = df
+        self.insights = insights
+        self.charts = charts
+        self.exports = exports
+        self.preview = preview
+        self.has_valid_data = has_valid_data
+
+    @classmethod
+    def empty(cls, platform: str) -> 'ProcessingResult':
+        return cls(platform, pd.DataFrame(), {}, {}, {}, {}, has_valid_data=False)
+
+    def chart(self, name: str) -> str:
+        """Stored name of chart name, '' if it was not produced."""
+        return self.charts.get(name) or ''
+
+    def export(self, ext: str) -> str:
+        """Stored name of the export with extension ext, '' if there is none."""
+        return self.exports.get(ext, '')
+
+class OutputSink(ABC):
+    """
+    Where a handler puts what it produces. Handlers only compute; the sink decides
+    whether and where charts and exports are stored, so the same code serves the
+    dashboards, the batch CLI and benchmarks. Sinks that don't want charts or
+    exports let the handler skip rendering or building them.
+    """
+
+    wants_charts = True
+    wants_exports = True
+
+    @abstractmethod
+    def save_chart(self, name: str, image: bytes) -> None:
+        """Store the rendered chart image under name."""
+
+    @abstractmethod
+    def save_dataset(self, df: pd.DataFrame, meta: Dict) -> Optional[str]:
+        """
+        Store df, offering the exports listed in meta['exports'] as '<export id>.<ext>',
+        and return the export id (None if nothing was stored).
+        """
+
+    def export_names(self, df: pd.DataFrame, meta: Dict) -> Dict[str, str]:
+        """save_dataset, returning the export file names by extension."""
+        if not self.wants_exports:
+            return {}
+        export_id = self.save_dataset(df, meta)
+        return {ext: f"{export_id}.{ext}" for ext in meta.get('exports', [])} if export_id else {}
+
+class SessionSink(OutputSink):
+    """The web session: charts go to the artifact stores, exports are built on download from a snapshot."""
+
+    def save_chart(self, name: str, image: bytes) -> None:
+        # Charts are small: held in memory for the session, on disk only if the memory budget is used up
+        store = save_session_artifact(name, image)
+        logger.debug(f"Image {name} saved to the {store} artifact store")
+
+    def save_dataset(self, df: pd.DataFrame, meta: Dict) -> Optional[str]:
+        return save_dataset_snapshot(df, meta, get_user_temp_dir())
+
+class MemorySink(OutputSink):
+    """Keeps the chart images and datasets in dicts, for callers that use them directly."""
+
+    def __init__(self):
+        self.charts: Dict[str, bytes] = {}
+        self.datasets: Dict[str, ColumnarDataset] = {}
+
+    def save_chart(self, name: str, image: bytes) -> None:
+        self.charts[name] = image
+
+    def save_dataset(self, df: pd.DataFrame, meta: Dict) -> Optional[str]:
+        export_id = f"{meta.get('platform', 'dataset')}-{len(self.datasets)}"
+        self.datasets[export_id] = ColumnarDataset.from_frame(df, meta)
+        return export_id
+
+class DirectorySink(OutputSink):
+    """
+    Writes charts and fully built exports into directory, outside any session and
+    without cleanup. Exports are named after the platform ('<platform>.<ext>').
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def save_chart(self, name: str, image: bytes) -> None:
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(image)
+
+    def save_dataset(self, df: pd.DataFrame, meta: Dict) -> Optional[str]:
+        export_id = meta.get('platform', 'dataset')
+        dataset = ColumnarDataset.from_frame(df, meta)
+        for ext in meta.get('exports', []):
+            EXPORT_BUILDERS[ext](dataset, os.path.join(self.directory, f"{export_id}.{ext}"))
+        return export_id
+
+class NullSink(OutputSink):
+    """Discards all output: charts are not rendered and exports not built (benchmarks, insights only)."""
+
+    wants_charts = False
+    wants_exports = False
+
+    def save_chart(self, name: str, image: bytes) -> None:
+        pass
+
+    def save_dataset(self, df: pd.DataFrame, meta: Dict) -> Optional[str]:
+        return None
@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.utils.dataset import Column, ColumnarDataset, SNAPSHOT_EXTENSION
+from app.utils.result_cache import cache_session_result, discard_session_result, get_session_result
+from app.utils.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Columns that can be searched with the preview filter and the token search, whichever of them a platform has
+PREVIEW_FILTER_COLUMNS = ('video_title', 'title', 'item', 'channel', 'author', 'creator')
+
+# Upper bound for a single page of preview rows
+MAX_PREVIEW_LIMIT = 500
+
+# Filter results kept per dataset (query -> matching rows)
+MAX_CACHED_FILTERS = 16
+
+class DatasetPreview:
+    """
+    Paginated, sortable and filterable access to a ColumnarDataset.
+
+    The sort order of every column is computed when the preview is created,
+    together with the dataset snapshot, so no request pays for it. Filters match
+    the query against each column's distinct values and expand the result through
+    the column codes, so a page is answered without touching every string.
+    Whole-word searches go through an inverted index built with the preview.
+    """
+
+    def __init__(self, dataset: ColumnarDataset):
+        self.dataset = dataset
+        self.search_index = SearchIndex.build(dataset, self.filter_columns)
+        self._sort_orders: Dict[str, np.ndarray] = {
+            name: _ascending_order(column) for name, column in dataset.columns.items()
+        }
+        self._filters: 'OrderedDict[Tuple[Optional[str], str], np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Dataset and search index size plus room for a sort order per column and the cached filter masks."""
+        rows = len(self.dataset)
+        return (self.dataset.nbytes + self.search_index.nbytes
+                + rows * 8 * len(self.dataset.columns) + rows * MAX_CACHED_FILTERS)
+
+    @property
+    def filter_columns(self) -> List[str]:
+        return [name for name in PREVIEW_FILTER_COLUMNS if name in self.dataset.columns]
+
+    def sort_order(self, column_name: str) -> np.ndarray:
+        """Row order for ascending sort on column_name; missing values come last."""
+        return self._sort_orders[column_name]
+
+    def filter_mask(self, query: str, column_name: Optional[str] = None) -> np.ndarray:
+        """Boolean row mask for a case-insensitive substring match on the filter columns."""
+        key = (column_name, query.lower())
+        with self._lock:
+            mask = self._filters.get(key)
+            if mask is not None:
+                self._filters.move_to_end(key)
+                return mask
+
+        names = [column_name] if column_name else self.filter_columns
+        mask = np.zeros(len(self.dataset), dtype=bool)
+        for name in names:
+            column = self.dataset.columns[name]
+            if column.kind != 'str':
+                continue
+            matches = pd.Series(column.categories, dtype=object).str.contains(
+                query, case=False, regex=False, na=False
+            ).to_numpy(dtype=bool)
+            # Trailing False is what missing values (code -1) resolve to
+            mask |= np.append(matches, False)[column.data]
+
+        with self._lock:
+            self._filters[key] = mask
+            while len(self._filters) > MAX_CACHED_FILTERS:
+                self._filters.popitem(last=False)
+        return mask
+
+    def page(self, offset: int = 0, limit: int = 50, sort: Optional[str] = None, descending: bool = False,
+             query: Optional[str] = None, column_name: Optional[str] = None, search: Optional[str] = None) -> Dict:
+        """
+        Return one page of rows as JSON-serialisable data.
+
+        query is a substring filter, search a whole-word search that must match every
+        word; both are restricted to column_name if it is given.
+        """
+        if sort is not None and sort not in self.dataset.columns:
+            raise ValueError(f"Unknown sort column: {sort}")
+        if column_name is not None and column_name not in self.filter_columns:
+            raise ValueError(f"Column cannot be filtered: {column_name}")
+
+        offset = max(offset, 0)
+        limit = min(max(limit, 0), MAX_PREVIEW_LIMIT)
+
+        if sort:
+            rows = self.sort_order(sort)
+            if descending:
+                rows = rows[::-1]
+        else:
+            rows = None
+
+        if query:
+            mask = self.filter_mask(query, column_name)
+            rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+
+        if search:
+            matches = self.search_index.search(search, column_name)
+            if rows is None:
+                rows = matches
+            else:
+                mask = np.zeros(len(self.dataset), dtype=bool)
+                mask[matches] = True
+                rows = rows[mask[rows]]
+
+        total = len(self.dataset) if rows is None else len(rows)
+        if rows is None:
+            index = np.arange(offset, min(offset + limit, total))
+        else:
+            index = rows[offset:offset + limit]
+
+        frame = self.dataset.to_frame(index=index)
+        return {
+            'columns': self.dataset.column_names,
+            'rows': _json_rows(frame),
+            'total': int(total),
+            'offset': offset,
+            'limit': limit,
+        }
+
+def _ascending_order(column: Column) -> np.ndarray:
+    if column.kind == 'str':
+        # Rank the distinct values once, then sort the rows by the rank of their code
+        category_order = np.argsort(column.categories.astype(str), kind='stable')
+        ranks = np.empty(len(column.categories) + 1, dtype=np.int64)
+        ranks[category_order] = np.arange(len(column.categories))
+        ranks[-1] = len(column.categories)  # missing values (code -1)
+        keys = ranks[column.data]
+    elif column.kind == 'datetime':
+        nat = np.iinfo(np.int64).min
+        keys = np.where(column.data == nat, np.iinfo(np.int64).max, column.data)
+    elif column.mask is not None:
+        # Missing values of nullable columns sort last, as for the other kinds
+        return np.lexsort((column.data, column.mask))
+    else:
+        keys = column.data
+    return np.argsort(keys, kind='stable')
+
+def _json_rows(frame: pd.DataFrame) -> list:
+    columns = []
+    for name in frame.columns:
+        series = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            values = [ts.isoformat() if not pd.isna(ts) else None for ts in series]
+        else:
+            values = series.astype(object).where(series.notna(), None).tolist()
+        columns.append(values)
+    return [list(row) for row in zip(*columns)]
+
+# --- Session previews ---
+
+def get_dataset_preview(directory: str, export_id: str) -> Optional[DatasetPreview]:
+    """
+    Return the preview for the snapshot export_id in directory, or None if it no longer exists.
+
+    Previews are kept in the session's result cache, together with their sort and
+    filter indexes, so consecutive pages and downloads do not re-read the snapshot.
+    """
+    key = ('dataset', export_id)
+    snapshot_path = os.path.join(directory, f"{export_id}.{SNAPSHOT_EXTENSION}")
+    if not os.path.exists(snapshot_path):
+        # Snapshot cleaned up; never serve rows from memory after the files are gone
+        discard_session_result(key)
+        return None
+
+    preview = get_session_result(key)
+    if preview is None:
+        preview = DatasetPreview(ColumnarDataset.load(snapshot_path))
+        cache_session_result(key, preview, preview.nbytes)
+        logger.debug(f"Loaded dataset preview with {len(preview.dataset)} rows")
+    return preview
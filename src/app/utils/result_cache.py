@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import logging
+from typing import Any, Hashable, Optional
+
+from app.utils.file_manager import TemporaryFileManager
+from app.utils.memory_cache import TTLCache, session_user_id
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """
+    In-memory cache of processed results, scoped by session user id.
+
+    Entries expire ttl_seconds after they were stored and the least recently
+    used ones are evicted once the estimated size of all entries exceeds
+    max_bytes. The cache is per worker process; a miss only means the data
+    has to be read back from the user's temp directory or reprocessed.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock=time.monotonic):
+        self._cache = TTLCache(max_bytes, ttl_seconds, clock)  # (user_id, key) -> value
+
+    @property
+    def total_bytes(self) -> int:
+        return self._cache.total_bytes
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def put(self, user_id: str, key: Hashable, value: Any, nbytes: int) -> bool:
+        """Store value for the user; returns False if it is too large to be cached at all."""
+        if not self._cache.put((user_id, key), value, nbytes):
+            logger.debug(f"Result of {nbytes} bytes exceeds the cache size, not cached")
+            return False
+        return True
+
+    def get(self, user_id: str, key: Hashable) -> Optional[Any]:
+        return self._cache.get((user_id, key))
+
+    def discard(self, user_id: str, key: Hashable) -> None:
+        self._cache.discard((user_id, key))
+
+    def purge_user(self, user_id: str) -> int:
+        """Drop every entry belonging to user_id and return how many were removed."""
+        return self._cache.purge(lambda entry_key, _: entry_key[0] == user_id)
+
+    def purge_expired(self) -> int:
+        """Remove every expired entry, read or not; return how many were removed."""
+        return self._cache.purge_expired()
+
+# Cached results live exactly as long as the files they were produced with
+result_cache = ResultCache(
+    max_bytes=int(os.getenv('RESULT_CACHE_MAX_MB', '256')) * 1024 * 1024,
+    ttl_seconds=TemporaryFileManager.MAX_FILE_AGE_SECONDS,
+)
+
+def estimate_nbytes(value: Any) -> int:
+    """Rough size of a render context: the container plus its direct members."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + estimate_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+def cache_session_result(key: Hashable, value: Any, nbytes: Optional[int] = None) -> bool:
+    """Cache value for the current session's user (no-op outside a request)."""
+    user_id = session_user_id()
+    if not user_id:
+        return False
+    return result_cache.put(user_id, key, value, estimate_nbytes(value) if nbytes is None else nbytes)
+
+def get_session_result(key: Hashable) -> Optional[Any]:
+    user_id = session_user_id()
+    return result_cache.get(user_id, key) if user_id else None
+
+def discard_session_result(key: Hashable) -> None:
+    user_id = session_user_id()
+    if user_id:
+        result_cache.discard(user_id, key)
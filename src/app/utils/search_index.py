@@ -0,0 +1,133 @@
+import os
+import re
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.utils.dataset import Column, ColumnarDataset
+
+logger = logging.getLogger(__name__)
+
+# Words are runs of letters and digits, matched case-insensitively
+TOKEN_PATTERN = r'\w+'
+
+# Only the first tokens of each distinct value are indexed; together with one row id per
+# row this bounds the index at O(rows + distinct values * MAX_TOKENS_PER_VALUE)
+MAX_TOKENS_PER_VALUE = int(os.getenv('SEARCH_MAX_TOKENS_PER_VALUE', '64'))
+
+# Search terms beyond this are ignored
+MAX_QUERY_TOKENS = 10
+
+def tokenize(text: str) -> List[str]:
+    """Distinct lower-case search tokens of a query, in order of appearance."""
+    return list(dict.fromkeys(re.findall(TOKEN_PATTERN, text.lower())))[:MAX_QUERY_TOKENS]
+
+class ColumnIndex:
+    """
+    Inverted index over one dictionary-encoded column, stored as two CSR arrays:
+
+        token -> sorted ids of the distinct values containing it  (token_offsets, token_values)
+        value -> sorted ids of the rows holding that value        (value_offsets, value_rows)
+
+    Rows are only listed once per value instead of once per token, and a token's
+    posting list of row ids is expanded from the second level when it is queried.
+    """
+
+    __slots__ = ('tokens', 'token_offsets', 'token_values', 'value_offsets', 'value_rows')
+
+    def __init__(self, tokens: np.ndarray, token_offsets: np.ndarray, token_values: np.ndarray,
+                 value_offsets: np.ndarray, value_rows: np.ndarray):
+        self.tokens = tokens
+        self.token_offsets = token_offsets
+        self.token_values = token_values
+        self.value_offsets = value_offsets
+        self.value_rows = value_rows
+
+    @classmethod
+    def build(cls, column: Column) -> 'ColumnIndex':
+        categories = column.categories
+        # Tokenise every distinct value once, not every row
+        value_tokens = pd.Series(categories, dtype=object).str.lower().str.findall(TOKEN_PATTERN).str[:MAX_TOKENS_PER_VALUE]
+        pairs = value_tokens.explode().dropna()
+        pairs = pd.DataFrame({'value': pairs.index.to_numpy(dtype=np.int64), 'token': pairs.to_numpy(dtype=object)})
+        pairs = pairs.drop_duplicates()
+
+        token_codes, tokens = pd.factorize(pairs['token'], sort=True)
+        values = pairs['value'].to_numpy()
+        order = np.lexsort((values, token_codes))
+        token_offsets = np.concatenate(([0], np.cumsum(np.bincount(token_codes, minlength=len(tokens)))))
+
+        codes = column.data
+        missing = int(np.count_nonzero(codes < 0))
+        # A stable sort keeps the rows of each value in ascending order; missing values (-1) sort first
+        value_rows = np.argsort(codes, kind='stable')[missing:].astype(np.int32)
+        value_offsets = np.concatenate(([0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(categories)))))
+
+        return cls(np.asarray(tokens, dtype=object), token_offsets, values[order].astype(np.int32),
+                   value_offsets, value_rows)
+
+    @property
+    def nbytes(self) -> int:
+        # Object array of tokens: pointer plus a short str object each
+        return (len(self.tokens) * 64 + self.token_offsets.nbytes + self.token_values.nbytes
+                + self.value_offsets.nbytes + self.value_rows.nbytes)
+
+    def rows(self, token: str) -> np.ndarray:
+        """Sorted ids of the rows whose value contains token."""
+        position = int(np.searchsorted(self.tokens, token))
+        if position == len(self.tokens) or self.tokens[position] != token:
+            return np.empty(0, dtype=np.int32)
+
+        values = self.token_values[self.token_offsets[position]:self.token_offsets[position + 1]]
+        starts = self.value_offsets[values]
+        lengths = self.value_offsets[values + 1] - starts
+        # Gather the row ranges of all matching values without a Python loop
+        shifts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return np.sort(self.value_rows[np.arange(lengths.sum()) + shifts])
+
+class SearchIndex:
+    """Token search over the text columns of a ColumnarDataset; all query tokens must match."""
+
+    def __init__(self, columns: Dict[str, ColumnIndex]):
+        self.columns = columns
+
+    @classmethod
+    def build(cls, dataset: ColumnarDataset, column_names: Iterable[str]) -> 'SearchIndex':
+        columns = {
+            name: ColumnIndex.build(dataset.columns[name])
+            for name in column_names
+            if name in dataset.columns and dataset.columns[name].kind == 'str'
+        }
+        index = cls(columns)
+        logger.debug(f"Built search index over {list(columns)} ({index.nbytes} bytes)")
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def search(self, query: str, column_name: Optional[str] = None) -> np.ndarray:
+        """Sorted ids of the rows that contain every token of query (in column_name, or any indexed column)."""
+        if column_name is not None and column_name not in self.columns:
+            raise ValueError(f"Column is not searchable: {column_name}")
+
+        tokens = tokenize(query)
+        if not tokens:
+            return np.empty(0, dtype=np.int32)
+
+        names = [column_name] if column_name else list(self.columns)
+        postings = []
+        for token in tokens:
+            rows = [self.columns[name].rows(token) for name in names]
+            postings.append(rows[0] if len(rows) == 1 else np.unique(np.concatenate(rows)))
+
+        # Intersect the shortest lists first so the intermediate results stay small
+        postings.sort(key=len)
+        result = postings[0]
+        for rows in postings[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
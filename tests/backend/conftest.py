@@ -22,6 +22,23 @@ def client():
 @pytest.fixture
 def temp_test_dir():
     """Fixture to provide a temporary directory for file operations."""
+    from app.utils.file_manager import deletion_queue
     temp_dir = tempfile.mkdtemp()
     yield temp_dir
+    # Session cleanups of the test may still be purging directories in the background
+    deletion_queue.join()
     shutil.rmtree(temp_dir)
+
+class FakeClock:
+    """A clock for the caches and the expiry index that only moves when a test sets now."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def fake_clock():
+    """Fixture to provide a controllable monotonic clock."""
+    return FakeClock()
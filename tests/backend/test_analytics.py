@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from app.utils import analytics
+from app.utils.analytics import binge_sessions, distinct_counts, distinct_count_insights
+
+def _reference_sessions(timestamps, gap_minutes):
+    """Straightforward loop over the sorted timestamps, used to check the vectorised version."""
+    sessions = []
+    for ts in sorted(timestamps):
+        if sessions and (ts - sessions[-1][-1]) <= pd.Timedelta(minutes=gap_minutes):
+            sessions[-1].append(ts)
+        else:
+            sessions.append([ts])
+    return sessions
+
+def test_binge_sessions_split_on_gap():
+    ts = pd.Series(pd.to_datetime([
+        '2024-01-01 12:00', '2024-01-01 10:10', '2024-01-01 10:00', '2024-01-01 10:20',
+        '2024-01-02 09:05', None, '2024-01-02 09:00',
+    ]))
+
+    sessions = binge_sessions(ts, gap_minutes=30)
+
+    assert sessions['session_count'] == 3
+    assert sessions['longest_session_videos'] == 3
+    assert sessions['longest_session_minutes'] == 20
+    assert str(sessions['longest_session_start']) == '2024-01-01'
+    assert dict(sessions['session_length_distribution']) == {'1': 1, '2-5': 2, '6-10': 0, '11-25': 0, '26+': 0}
+
+def test_binge_sessions_match_reference():
+    rng = np.random.default_rng(0)
+    gaps = rng.exponential(scale=20, size=2000)
+    ts = pd.Series(pd.Timestamp('2024-01-01', tz='UTC') + pd.to_timedelta(np.cumsum(gaps), unit='min'))
+    ts = ts.sample(frac=1, random_state=0)
+
+    sessions = binge_sessions(ts, gap_minutes=30)
+    reference = _reference_sessions(list(ts), 30)
+    lengths = [len(s) for s in reference]
+
+    assert sessions['session_count'] == len(reference)
+    assert sessions['longest_session_videos'] == max(lengths)
+    assert sessions['median_session_videos'] == float(np.median(lengths))
+    assert sum(count for _, count in sessions['session_length_distribution']) == len(reference)
+
+def test_binge_sessions_empty():
+    assert binge_sessions(pd.Series([], dtype='datetime64[ns]')) is None
+
+def test_distinct_counts_sketch_within_error_bound():
+    rng = np.random.default_rng(1)
+    values = pd.Series(np.char.add('creator_', rng.integers(0, 200000, size=600000).astype(str)).astype(object))
+    years = pd.Series(rng.integers(2019, 2024, size=len(values)))
+
+    exact = distinct_counts(values, by=years, sketch_min_rows=len(values) + 1)
+    approx = distinct_counts(values, by=years, sketch_min_rows=0)
+
+    assert exact['relative_error'] is None
+    bound = 4 * approx['relative_error']
+    assert abs(approx['total'] / exact['total'] - 1) < bound
+    assert approx['by'].keys() == exact['by'].keys()
+    for year, count in exact['by'].items():
+        assert abs(approx['by'][year] / count - 1) < bound
+
+def test_distinct_count_insights_report_error_when_estimated(monkeypatch):
+    authors = pd.Series(['a', 'b', 'b', None, 'c'])
+    years = pd.Series([2020, 2020, 2021, 2021, 2021])
+
+    exact = distinct_count_insights('unique_authors', authors, years)
+    assert exact == {'unique_authors': 3, 'unique_authors_per_year': [(2020, 2), (2021, 2)], 'unique_authors_error_pct': None}
+
+    monkeypatch.setattr(analytics, 'DISTINCT_SKETCH_MIN_ROWS', 1)
+    estimated = distinct_count_insights('unique_authors', authors, years)
+    assert estimated['unique_authors'] == 3
+    assert estimated['unique_authors_error_pct'] == 0.8
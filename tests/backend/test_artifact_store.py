@@ -0,0 +1,89 @@
+import io
+import os
+import re
+import json
+from unittest.mock import patch
+from app import charts
+from app.utils.artifact_store import MemoryArtifactStore
+
+def test_memory_store_refuses_artifacts_over_budget(fake_clock):
+    store = MemoryArtifactStore(max_bytes=100, ttl_seconds=30, clock=fake_clock)
+    assert store.put('user_a', 'one.png', b'1' * 60)
+    assert store.put('user_b', 'two.png', b'2' * 60) is False
+    assert store.get('user_a', 'one.png') == b'1' * 60
+
+    # Expired artifacts make room; live ones are never evicted
+    fake_clock.now = 30
+    assert store.put('user_b', 'two.png', b'2' * 60)
+    assert store.get('user_a', 'one.png') is None
+    assert store.total_bytes == 60
+
+def test_expired_artifacts_are_swept_without_a_get(fake_clock):
+    store = MemoryArtifactStore(max_bytes=100, ttl_seconds=30, clock=fake_clock)
+    store.put('user_a', 'one.png', b'1' * 20)
+    fake_clock.now = 20
+    store.put('user_b', 'two.png', b'2' * 20)
+
+    fake_clock.now = 30
+    assert store.purge_expired() == 1
+    assert store.total_bytes == 20
+    assert store.get('user_b', 'two.png') == b'2' * 20
+
+def test_purge_user_drops_only_that_session():
+    store = MemoryArtifactStore(max_bytes=100, ttl_seconds=30)
+    store.put('user_a', 'one.png', b'1')
+    store.put('user_a', 'two.png', b'2')
+    store.put('user_b', 'one.png', b'3')
+
+    assert store.purge_user('user_a') == 2
+    assert store.get('user_b', 'one.png') == b'3'
+    assert store.total_bytes == 1
+
+def test_disk_artifacts_are_private_and_expire(client, temp_test_dir, fake_clock):
+    from flask import session
+    from app.utils.artifact_store import DiskArtifactStore
+    from app.utils.file_manager import ExpiryIndex, TemporaryFileManager
+
+    with patch('tempfile.gettempdir', return_value=temp_test_dir), \
+         patch.object(TemporaryFileManager, 'expiry_index', ExpiryIndex(clock=fake_clock)):
+        with client.application.test_request_context():
+            session['user_id'] = 'test_disk_artifact_user'
+            DiskArtifactStore().put('test_disk_artifact_user', 'chart.png', b'png')
+            path = os.path.join(TemporaryFileManager.get_user_temp_dir(), 'chart.png')
+
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        fake_clock.now = TemporaryFileManager.DOWNLOAD_WINDOW + 1
+        assert TemporaryFileManager.expiry_index.pop_due() == [path]
+
+def test_charts_are_inlined_or_served_from_memory(client, temp_test_dir, monkeypatch):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'test_artifact_user'
+        sess['authenticated'] = True
+
+    youtube_data = [{
+        "header": "YouTube",
+        "title": "Watched Test Video",
+        "titleUrl": "https://www.youtube.com/watch?v=123",
+        "time": "2023-01-01T12:00:00.000Z",
+        "products": ["YouTube"]
+    }]
+
+    with patch('tempfile.gettempdir', return_value=temp_test_dir):
+        upload = (io.BytesIO(json.dumps(youtube_data).encode('utf-8')), 'watch-history.json')
+        dashboard = client.post('/dashboard/youtube', data={'file': upload})
+
+        monkeypatch.setattr(charts, 'INLINE_CHARTS', False)
+        refreshed = client.get('/dashboard/youtube')
+        chart = re.search(rb'/download_image/([\w-]+\.png)', refreshed.data).group(1).decode()
+        served = client.get(f'/download_image/{chart}')
+        client.post('/cleanup-session')
+        after_cleanup = client.get(f'/download_image/{chart}')
+
+    # The dashboard is a single response with every chart embedded
+    assert dashboard.data.count(b'src="data:image/png;base64,') == 3
+    assert b'/download_image/' not in dashboard.data
+
+    assert served.status_code == 200
+    assert served.mimetype == 'image/png' and served.data.startswith(b'\x89PNG')
+    assert not any(name.endswith('.png') for _, _, files in os.walk(temp_test_dir) for name in files)
+    assert after_cleanup.status_code == 404
@@ -0,0 +1,34 @@
+import os
+import json
+from app.batch import find_jobs, run
+from app.utils.file_manager import output_directory
+from app.handlers.generate_synthetic_data import generate_synthetic_data
+
+def _donations(root):
+    """Two donations, one with YouTube and TikTok exports and one with an unrelated file."""
+    with output_directory(os.path.join(root, 'donor_a')):
+        generate_synthetic_data('techie', 'low', 'watch-history.json', platform='youtube')
+        generate_synthetic_data('fitness', 'low', 'user_data.json', platform='tiktok')
+    os.makedirs(os.path.join(root, 'donor_b'))
+    with open(os.path.join(root, 'donor_b', 'notes.json'), 'w') as f:
+        json.dump({'unrelated': True}, f)
+
+def test_find_jobs_groups_files_by_donation_and_platform(tmp_path):
+    _donations(str(tmp_path))
+
+    jobs = find_jobs(str(tmp_path))
+
+    assert [(relative, platform) for relative, platform, _ in jobs] == [('donor_a', 'tiktok'), ('donor_a', 'youtube')]
+
+def test_run_writes_results_without_a_flask_app(tmp_path):
+    _donations(str(tmp_path / 'in'))
+
+    summaries = run(str(tmp_path / 'in'), str(tmp_path / 'out'))
+
+    assert not any('error' in summary for summary in summaries)
+    youtube = tmp_path / 'out' / 'donor_a' / 'youtube'
+    assert sorted(os.listdir(youtube)) == ['day_heatmap.png', 'insights.json', 'month_heatmap.png',
+                                           'time_heatmap.png', 'top_channels.png', 'youtube.csv', 'youtube.xlsx']
+    insights = json.loads((youtube / 'insights.json').read_text())
+    assert insights['insights']['total_videos'] == sum(1 for _ in open(youtube / 'youtube.csv')) - 1
+    assert 'tiktok.txt' in os.listdir(tmp_path / 'out' / 'donor_a' / 'tiktok')
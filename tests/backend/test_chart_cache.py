@@ -0,0 +1,66 @@
+import os
+from unittest.mock import patch
+import pandas as pd
+from flask import session
+from app import charts
+from app.charts import chart_fingerprint, render_charts
+from app.utils.chart_cache import ChartCache, chart_cache
+from app.utils.output_sink import DirectorySink
+
+def test_entries_are_shared_and_released_per_user():
+    cache = ChartCache(max_bytes=100, ttl_seconds=60)
+    cache.put('user_a', 'chart', b'x' * 40)
+    assert cache.get('user_b', 'chart') == b'x' * 40  # user_b now holds it too
+
+    assert cache.purge_user('user_a') == 0
+    assert cache.get('user_c', 'chart') is not None
+    cache.purge_user('user_b')
+    assert cache.purge_user('user_c') == 1
+    assert len(cache) == 0 and cache.total_bytes == 0
+
+def test_lru_eviction_is_bounded_by_image_bytes():
+    cache = ChartCache(max_bytes=100, ttl_seconds=60)
+    cache.put('user_a', 'one', b'1' * 40)
+    cache.put('user_a', 'two', b'2' * 40)
+    cache.get('user_a', 'one')
+    cache.put('user_a', 'three', b'3' * 40)
+
+    assert cache.get('user_a', 'two') is None
+    assert cache.total_bytes == 80
+    assert cache.put('user_a', 'huge', b'x' * 101) is False
+
+def test_expired_entries_are_swept_by_last_use(fake_clock):
+    cache = ChartCache(max_bytes=100, ttl_seconds=30, clock=fake_clock)
+    cache.put('user_a', 'one', b'1' * 20)
+    cache.put('user_a', 'two', b'2' * 20)
+    fake_clock.now = 20
+    cache.get('user_b', 'one')
+
+    fake_clock.now = 30
+    assert cache.purge_expired() == 1
+    assert cache.total_bytes == 20
+    assert cache.get('user_b', 'one') == b'1' * 20
+
+def test_fingerprint_follows_data_and_spec():
+    data = pd.DataFrame([[1, 2]], index=['Count'], columns=['Mon', 'Tue'])
+    spec = {'type': 'heatmap', 'data': data, 'size': (8, 2)}
+
+    assert chart_fingerprint(spec) == chart_fingerprint({**spec, 'data': data.copy()})
+    assert chart_fingerprint(spec) != chart_fingerprint({**spec, 'data': data + 1})
+    assert chart_fingerprint(spec) != chart_fingerprint({**spec, 'data': data.set_axis(['Wed', 'Thu'], axis=1)})
+    assert chart_fingerprint(spec) != chart_fingerprint({**spec, 'size': (8, 3)})
+
+def test_repeated_charts_are_served_from_cache(client, tmp_path):
+    spec = {'type': 'heatmap', 'data': pd.DataFrame([[3, 1]], index=['Count'], columns=['a', 'b']), 'size': (4, 2)}
+
+    with client.application.test_request_context():
+        session['user_id'] = 'chart_cache_user'
+        first, = render_charts([spec], DirectorySink(str(tmp_path)))
+        with patch.object(charts, 'chart_image') as chart_image:
+            second, = render_charts([{**spec, 'data': spec['data'].copy()}], DirectorySink(str(tmp_path)))
+        chart_image.assert_not_called()
+
+    assert first != second
+    with open(os.path.join(tmp_path, first), 'rb') as a, open(os.path.join(tmp_path, second), 'rb') as b:
+        assert a.read() == b.read()
+    assert chart_cache.purge_user('chart_cache_user') == 1
@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pandas as pd
+from app import charts
+from app.utils.output_sink import DirectorySink
+from app.charts import render_chart, render_charts, draw_chart, as_row, day_of_week_counts, time_range_counts, year_month_counts
+
+def _timestamps():
+    return pd.Series(pd.to_datetime(['2023-01-02 01:00', '2023-01-02 13:00', '2023-03-05 22:00', '2024-01-01 09:30']))
+
+def test_chart_data_helpers():
+    ts = _timestamps()
+
+    assert day_of_week_counts(ts)['Monday'] == 3
+    assert np.isnan(day_of_week_counts(ts)['Tuesday'])
+    assert time_range_counts(ts).fillna(0).tolist() == [1, 0, 1, 1, 0, 1]
+    months = year_month_counts(ts)
+    assert list(months.columns) == ['Jan', 'Mar']
+    assert months.loc[2023, 'Jan'] == 2 and months.loc[2024, 'Mar'] == 0
+
+def test_figures_are_reused_per_chart_type(tmp_path):
+    spec = {'type': 'heatmap', 'data': as_row(day_of_week_counts(_timestamps())), 'size': (8, 2), 'fmt': '.0f'}
+
+    first = draw_chart(spec)
+    second = draw_chart({**spec, 'size': (6, 3)})
+
+    assert first is second
+    assert len(second.axes) == 1
+    assert tuple(second.get_size_inches()) == (6, 3)
+    assert all(not spine.get_visible() for spine in second.axes[0].spines.values())
+
+def test_heatmap_artists_follow_the_grid():
+    months = year_month_counts(_timestamps())
+    day_spec = {'type': 'heatmap', 'data': as_row(day_of_week_counts(_timestamps())), 'size': (8, 2), 'fmt': '.0f'}
+
+    draw_chart(day_spec)
+    ax = draw_chart({'type': 'heatmap', 'data': months, 'size': (8, 2)}).axes[0]
+    assert len(ax.collections) == 1
+    assert sorted(text.get_text() for text in ax.texts) == ['0', '1', '1', '2']
+
+    ax = draw_chart(day_spec).axes[0]
+    # Only Monday and Sunday have events; the other days are left blank
+    assert [text.get_text() for text in ax.texts] == ['3', '1']
+    assert [label.get_text() for label in ax.get_xticklabels()][0] == 'Monday'
+
+def test_bump_chart_batches_nodes_and_flows():
+    bump_data = pd.DataFrame({
+        'year': [2021, 2021, 2022, 2022, 2023], 'channel': ['A', 'B', 'B', 'A', 'A'],
+        'rank': [1, 2, 1, 2, 1], 'view_counts': [9, 4, 8, 3, 5],
+    })
+
+    ax = draw_chart({'type': 'bump', 'data': bump_data, 'label_column': 'channel', 'value_column': 'view_counts'}).axes[0]
+
+    nodes, = ax.collections
+    assert len(nodes.get_paths()) == 5
+    # A has flows 2021 -> 2022 -> 2023 and B one flow, each colour as a single compound path
+    assert len(ax.patches) == 2
+    assert sorted(len(patch.get_path().vertices) for patch in ax.patches) == [9, 18]
+
+def test_render_chart_writes_png(tmp_path):
+    bump_data = pd.DataFrame({
+        'year': [2022, 2022, 2023], 'channel': ['A', 'B', 'A'], 'rank': [1, 2, 1], 'view_counts': [5, 3, 7],
+    })
+    specs = [
+        {'type': 'heatmap', 'data': year_month_counts(_timestamps()), 'size': (8, 2), 'xlabel': 'Month'},
+        {'type': 'bump', 'data': bump_data, 'label_column': 'channel', 'value_column': 'view_counts'},
+        {'type': 'treemap', 'data': pd.Series({'a': 3, 'b': 1}), 'size': (8, 6)},
+        {'type': 'stacked_bar', 'data': pd.DataFrame({'x': [2, 1], 'y': [0, 4]}, index=['c1', 'c2']),
+         'size': (8, 2), 'colors': {'x': 'red', 'y': 'blue'}, 'labels': {}},
+    ]
+
+    for spec in specs:
+        filename = render_chart(spec, DirectorySink(str(tmp_path)))
+        with open(os.path.join(tmp_path, filename), 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+
+def test_chart_image_encodings(monkeypatch):
+    spec = {'type': 'heatmap', 'data': as_row(day_of_week_counts(_timestamps())), 'size': (8, 2), 'fmt': '.0f'}
+    fig = draw_chart(spec)
+    pixels = charts._figure_pixels(fig)
+
+    # Cropped to the content with PAD_INCHES of white on every side
+    pad = int(charts.PAD_INCHES * fig.dpi)
+    assert pixels.shape[1] < 8 * fig.dpi
+    assert (pixels[:pad] == 255).all() and (pixels[:, -pad:] == 255).all()
+    assert not (pixels[pad] == 255).all()
+
+    assert charts.encode_image(pixels, 'png').startswith(b'\x89PNG')
+    palette = charts.encode_image(pixels, 'png', colors=64)
+    assert len(palette) < len(charts.encode_image(pixels, 'png', colors=0))
+    assert charts.encode_image(pixels, 'webp')[8:12] == b'WEBP'
+
+    monkeypatch.setattr(charts, 'CHART_IMAGE_FORMAT', 'webp')
+    assert charts.chart_image(spec)[8:12] == b'WEBP'
+
+def test_render_charts_in_worker_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(charts, 'CHART_RENDER_WORKERS', 2)
+    monkeypatch.setattr(charts.os, 'cpu_count', lambda: 2)
+    specs = [
+        {'type': 'heatmap', 'data': as_row(day_of_week_counts(_timestamps())), 'size': (8, 2), 'fmt': '.0f'},
+        {'type': 'treemap', 'data': pd.Series({'a': 3, 'b': 1}), 'size': (8, 6)},
+    ]
+
+    pool = charts._get_render_pool()
+    try:
+        filenames = render_charts(specs, DirectorySink(str(tmp_path)))
+    finally:
+        charts._discard_render_pool(pool)
+
+    assert pool is not None
+    assert len(set(filenames)) == 2
+    for filename, spec in zip(filenames, specs):
+        with open(os.path.join(tmp_path, filename), 'rb') as f:
+            assert f.read() == charts.chart_image(spec)
@@ -0,0 +1,115 @@
+import csv
+import pandas as pd
+import numpy as np
+from openpyxl import load_workbook
+from app.utils import export
+from app.utils.dataset import ColumnarDataset
+from app.utils.file_validation import sanitize_dataframe_for_spreadsheet
+from app.utils.export import write_excel, materialize_export
+
+def _sample_frame(rows=25):
+    return pd.DataFrame({
+        'video_title': [f"Video {i}" for i in range(rows)],
+        'timestamp': pd.date_range('2023-01-01', periods=rows, freq='h'),
+        'channel': ['Channel A', None] * (rows // 2) + ['Channel B'] * (rows % 2),
+        'year': np.full(rows, 2023),
+    })
+
+def test_streamed_excel_matches_pandas_output(tmp_path, monkeypatch):
+    """The write-only path must produce the same sheet contents as DataFrame.to_excel."""
+    monkeypatch.setattr(export, 'STREAMING_EXCEL_MIN_ROWS', 10)
+    monkeypatch.setattr(export, 'EXCEL_CHUNK_ROWS', 7)
+    df = _sample_frame()
+    chunk_lengths = []
+    column_values = export._excel_column_values
+    monkeypatch.setattr(export, '_excel_column_values',
+                        lambda series: chunk_lengths.append(len(series)) or column_values(series))
+
+    streamed_path = tmp_path / 'streamed.xlsx'
+    reference_path = tmp_path / 'reference.xlsx'
+    write_excel(df, str(streamed_path))
+    # 25 rows in chunks of 7, each converted column by column
+    assert chunk_lengths == [7] * 4 * 3 + [4] * 4
+    df.to_excel(str(reference_path), index=False, engine='openpyxl')
+
+    pd.testing.assert_frame_equal(pd.read_excel(streamed_path), pd.read_excel(reference_path))
+
+    header = next(load_workbook(streamed_path).active.iter_rows(max_row=1))
+    assert all(cell.font.bold for cell in header)
+
+def test_tiny_frames_use_pandas_engine(tmp_path, monkeypatch):
+    df = _sample_frame(rows=3)
+    calls = []
+    monkeypatch.setattr(pd.DataFrame, 'to_excel', lambda self, *args, **kwargs: calls.append(args))
+
+    write_excel(df, str(tmp_path / 'tiny.xlsx'))
+
+    assert len(calls) == 1
+
+def test_dataset_snapshot_round_trip(tmp_path):
+    df = _sample_frame()
+    df['timestamp'] = df['timestamp'].dt.tz_localize('UTC')
+    path = tmp_path / 'snapshot.npz'
+    ColumnarDataset.from_frame(df, {'platform': 'youtube'}).save(str(path))
+
+    dataset = ColumnarDataset.load(str(path))
+
+    assert dataset.meta == {'platform': 'youtube'}
+    pd.testing.assert_frame_equal(dataset.to_frame(), df, check_dtype=False)
+
+def test_dataset_snapshot_round_trip_keeps_value_types(tmp_path):
+    from decimal import Decimal
+    df = pd.DataFrame({
+        'mixed': [1, 'two', 3.5, True, None],
+        'when': [pd.Timestamp('2023-01-01 12:00'), None, pd.Timestamp('2023-01-02'), None, None],
+        'amount': [Decimal('1.10'), None, Decimal('2.5'), None, Decimal('1.10')],
+        'tags': [['a', 'b'], {'k': [1]}, None, ['a', 'b'], []],
+        'count': pd.array([1, None, 3, 4, None], dtype='Int64'),
+        'flag': pd.array([True, None, False, True, None], dtype='boolean'),
+        'label': pd.array(['x', None, 'y', 'x', None], dtype='string'),
+        'kind': pd.Categorical(['a', 'b', None, 'a', 'b']),
+    })
+    path = tmp_path / 'snapshot.npz'
+    ColumnarDataset.from_frame(df).save(str(path))
+
+    restored = ColumnarDataset.load(str(path)).to_frame()
+
+    pd.testing.assert_frame_equal(restored, df)
+    assert [type(value) for value in restored['mixed'][:4]] == [int, str, float, bool]
+    assert isinstance(restored['when'][0], pd.Timestamp)
+    assert restored['amount'][0] == Decimal('1.10')
+
+def test_materialize_export_builds_requested_formats_only(tmp_path):
+    df = _sample_frame()
+    df.loc[0, 'video_title'] = '=HYPERLINK("x")'
+    meta = {'exports': ['csv'], 'csv_quote_all': True}
+    ColumnarDataset.from_frame(df, meta).save(str(tmp_path / 'abc.npz'))
+
+    csv_path = materialize_export(str(tmp_path), 'abc.csv')
+
+    exported = pd.read_csv(csv_path)
+    assert exported['video_title'].iloc[0] == '\'=HYPERLINK("x")'
+    assert len(exported) == len(df)
+    assert materialize_export(str(tmp_path), 'abc.xlsx') is None
+    assert materialize_export(str(tmp_path), 'missing.csv') is None
+
+def test_export_views_match_whole_frame_exports(tmp_path, monkeypatch):
+    """Chunked exports built from the snapshot must equal the old copy-based pipeline."""
+    monkeypatch.setattr(export, 'STREAMING_EXCEL_MIN_ROWS', 10)
+    monkeypatch.setattr(export, 'EXCEL_CHUNK_ROWS', 7)
+    monkeypatch.setattr(export, 'CSV_CHUNK_ROWS', 6)
+    df = _sample_frame()
+    df['timestamp'] = df['timestamp'].dt.tz_localize('UTC').dt.tz_convert('Europe/Amsterdam')
+    df.loc[1, 'video_title'] = '-1 line one\nline two'
+    meta = {'exports': ['csv', 'xlsx'], 'csv_quote_all': True}
+    ColumnarDataset.from_frame(df, meta).save(str(tmp_path / 'abc.npz'))
+
+    reference = sanitize_dataframe_for_spreadsheet(df)
+    reference_csv = reference.to_csv(index=False, quoting=csv.QUOTE_ALL)
+    reference = reference.assign(timestamp=reference['timestamp'].dt.tz_localize(None))
+    reference = reference.replace(r'\n', ' ', regex=True)
+
+    with open(materialize_export(str(tmp_path), 'abc.csv'), encoding='utf-8', newline='') as f:
+        assert f.read() == reference_csv
+    excel = pd.read_excel(materialize_export(str(tmp_path), 'abc.xlsx'))
+    pd.testing.assert_frame_equal(excel.fillna(''), reference.fillna(''), check_dtype=False)
@@ -5,7 +5,7 @@ import io
 import json
 import tempfile
 from unittest.mock import patch
-from app.utils.file_manager import TemporaryFileManager
+from app.utils.file_manager import TemporaryFileManager, deletion_queue
 
 def test_file_lifecycle_youtube(client, temp_test_dir):
     """
@@ -32,7 +32,7 @@ def test_file_lifecycle_youtube(client, temp_test_dir):
          patch('app.utils.file_manager.TemporaryFileManager.mark_file_for_cleanup', side_effect=TemporaryFileManager.mark_file_for_cleanup) as mock_mark:
         
         # The app will create this subdirectory inside our mocked temp dir
-        user_temp_path = os.path.join(temp_test_dir, f"user_{user_id}")
+        user_temp_path = os.path.join(TemporaryFileManager.get_base_temp_dir(), f"user_{user_id}")
         
         # 1. Upload Phase
         youtube_data = [
@@ -65,10 +65,10 @@ def test_file_lifecycle_youtube(client, temp_test_dir):
         assert os.path.exists(user_temp_path), "User temp directory should be created"
         files_in_temp = os.listdir(user_temp_path)
         
-        # We expect generated files like YouTube_Data.csv or similar
-        csv_files = [f for f in files_in_temp if f.endswith('.csv')]
-        assert len(csv_files) > 0, "No CSV file generated after processing"
-        target_csv_file = csv_files[0]
+        # Processing stores a dataset snapshot; the CSV is generated from it on download
+        snapshots = [f for f in files_in_temp if f.endswith('.npz')]
+        assert len(snapshots) > 0, "No dataset snapshot stored after processing"
+        target_csv_file = snapshots[0].replace('.npz', '.csv')
         
         # 3. Access Phase (Download)
         download_url = f"/download_csv/{target_csv_file}"
@@ -77,6 +77,7 @@ def test_file_lifecycle_youtube(client, temp_test_dir):
         # Perform download
         download_response = client.get(download_url)
         assert download_response.status_code == 200
+        assert os.path.exists(full_path), "CSV export should be generated on first download"
         
         # 4. Cleanup Phase
         download_response.close()
@@ -87,8 +88,12 @@ def test_file_lifecycle_youtube(client, temp_test_dir):
         
         # Now trigger explicit session cleanup to ensure everything is wiped.
         client.post('/cleanup-session')
+        # The files are overwritten and removed by the background deletion queue
+        deletion_queue.join()
         
         assert not os.path.exists(user_temp_path), "User directory should be removed after clean up"
+        base_dir = TemporaryFileManager.get_base_temp_dir()
+        assert not [d for d in os.listdir(base_dir) if d.startswith(TemporaryFileManager.DELETING_PREFIX)]
 
 
 def test_manual_cleanup_lifecycle(client, temp_test_dir):
@@ -102,7 +107,7 @@ def test_manual_cleanup_lifecycle(client, temp_test_dir):
         sess['authenticated'] = True
 
     with patch('tempfile.gettempdir', return_value=temp_test_dir):
-        user_temp_path = os.path.join(temp_test_dir, f"user_{user_id}")
+        user_temp_path = os.path.join(TemporaryFileManager.get_base_temp_dir(), f"user_{user_id}")
         os.makedirs(user_temp_path, exist_ok=True)
         
         # Create a dummy file
@@ -114,5 +119,8 @@ def test_manual_cleanup_lifecycle(client, temp_test_dir):
         
         # Call valid cleanup
         client.post('/cleanup-session')
+        deletion_queue.join()
         
         assert not os.path.exists(dummy_file), "Explicit cleanup should remove user files"
+        base_dir = TemporaryFileManager.get_base_temp_dir()
+        assert not [d for d in os.listdir(base_dir) if d.startswith(TemporaryFileManager.DELETING_PREFIX)]
@@ -25,10 +25,7 @@ def test_file_cleanup(client):
     """Test that cleanup_user_files_immediately removes the user directory."""
     # We will simulate the existence of a user directory
     user_id = 'cleanup_test_user'
-    base_temp = '/tmp' #/tmp is usually safe, or use tempfile.gettempdir()
-    import tempfile
-    base_temp = tempfile.gettempdir()
-    user_dir = os.path.join(base_temp, f"user_{user_id}")
+    user_dir = os.path.join(TemporaryFileManager.get_base_temp_dir(), f"user_{user_id}")
     os.makedirs(user_dir, exist_ok=True)
     
     # Create a dummy file
@@ -40,3 +37,189 @@ def test_file_cleanup(client):
     TemporaryFileManager.cleanup_user_files_immediately(user_id)
     
     assert not os.path.exists(user_dir)
+
+def test_expiry_index_pops_only_due_marks(fake_clock):
+    from app.utils.file_manager import ExpiryIndex
+    fake_clock.now = 100.0
+    index = ExpiryIndex(clock=fake_clock)
+    index.mark('a', 10)
+    index.mark('b', 20)
+    index.mark('c', 5)
+    index.mark('c', 30)  # marked again: the first deadline no longer applies
+    assert index.unmark('b')
+
+    fake_clock.now = 115
+    assert index.pop_due() == ['a']
+    fake_clock.now = 200
+    assert index.pop_due() == ['c']
+    assert len(index) == 0
+
+def test_cleanup_deletes_expired_files_without_scanning(client, temp_test_dir, fake_clock):
+    from unittest.mock import patch
+    from app.utils.file_manager import ExpiryIndex, deletion_queue
+    expired = os.path.join(temp_test_dir, 'expired.csv')
+    kept = os.path.join(temp_test_dir, 'kept.csv')
+    for path in (expired, kept):
+        with open(path, 'w') as f:
+            f.write('data')
+
+    with patch.object(TemporaryFileManager, 'expiry_index', ExpiryIndex(clock=fake_clock)), \
+         patch('os.listdir', side_effect=AssertionError('directory scanned')):
+        TemporaryFileManager.mark_file_for_cleanup(expired)
+        TemporaryFileManager.mark_file_for_cleanup(kept)
+        TemporaryFileManager.protect_file_for_download(kept)
+        fake_clock.now = TemporaryFileManager.DOWNLOAD_WINDOW + 1
+        with client.application.test_request_context():
+            TemporaryFileManager.cleanup_temp_files()
+    deletion_queue.join()
+
+    assert not os.path.exists(expired)
+    assert os.path.exists(kept)
+    assert not os.path.exists(f"{expired}.metadata")
+
+def test_periodic_sweep_deletes_expired_files_without_a_request(client, temp_test_dir, fake_clock):
+    from unittest.mock import patch
+    from app.utils.file_manager import ExpiryIndex, OrphanReaper, deletion_queue
+    expired = os.path.join(temp_test_dir, 'expired.csv')
+    with open(expired, 'w') as f:
+        f.write('data')
+
+    reaper = OrphanReaper()
+    with patch.object(TemporaryFileManager, 'expiry_index', ExpiryIndex(clock=fake_clock)), \
+         patch('tempfile.gettempdir', return_value=temp_test_dir):
+        TemporaryFileManager.mark_file_for_cleanup(expired)
+        fake_clock.now = TemporaryFileManager.DOWNLOAD_WINDOW + 1
+        with client.application.app_context():
+            try:
+                reaper.sweep()
+            finally:
+                reaper.release()
+    deletion_queue.join()
+
+    assert not os.path.exists(expired)
+
+def test_single_reaper_removes_only_old_user_dirs(temp_test_dir):
+    import time
+    from unittest.mock import patch
+    from app.utils.file_manager import OrphanReaper
+    with patch('tempfile.gettempdir', return_value=temp_test_dir):
+        base_dir = TemporaryFileManager.get_base_temp_dir()
+        old_dir, new_dir = os.path.join(base_dir, 'user_old'), os.path.join(base_dir, 'user_new')
+        for path in (old_dir, new_dir):
+            os.makedirs(path)
+            with open(os.path.join(path, 'data.csv'), 'w') as f:
+                f.write('data')
+        unrelated = os.path.join(temp_test_dir, 'user_other_app')
+        os.makedirs(unrelated)
+
+        first, second = OrphanReaper(), OrphanReaper()
+        try:
+            assert first.is_elected()
+            assert not second.is_elected()  # a second worker does not scan while the first holds the lock
+            assert second.run_once() == 0
+
+            stale = time.time() + TemporaryFileManager.MAX_FILE_AGE_SECONDS + 1
+            with patch('time.time', return_value=stale):
+                assert first.run_once() == 2
+        finally:
+            first.release()
+        assert second.is_elected()  # and takes over once it is released
+        second.release()
+
+    assert not os.path.exists(old_dir) and not os.path.exists(new_dir)
+    assert os.path.exists(unrelated)  # only the app's base directory is scanned
+
+def test_secure_delete_overwrites_in_place_in_bounded_chunks(temp_test_dir, monkeypatch):
+    from app.utils import file_manager
+    monkeypatch.setattr(file_manager, 'SECURE_DELETE_CHUNK_BYTES', 64 * 1024)
+    path = os.path.join(temp_test_dir, 'export.xlsx')
+    with open(path, 'wb') as f:
+        f.write(b'\0' * (200 * 1024 + 5))
+    # A second link to the inode shows what happened to the file's blocks
+    witness = os.path.join(temp_test_dir, 'witness')
+    os.link(path, witness)
+
+    draws = []
+    urandom = os.urandom
+    monkeypatch.setattr(file_manager.os, 'urandom', lambda n: draws.append(n) or urandom(n))
+    TemporaryFileManager._secure_file_delete(path)
+
+    assert not os.path.exists(path)
+    assert max(draws) == 64 * 1024
+    with open(witness, 'rb') as f:
+        data = f.read()
+    assert len(data) == 200 * 1024 + 5 and data.count(0) < len(data) // 100
+
+def test_secure_delete_batch_shares_random_bytes(temp_test_dir, monkeypatch):
+    from app.utils import file_manager
+    paths = []
+    for i in range(20):
+        paths.append(os.path.join(temp_test_dir, f'chart_{i}.png'))
+        with open(paths[-1], 'wb') as f:
+            f.write(b'x' * 1024)
+
+    draws = []
+    urandom = os.urandom
+    monkeypatch.setattr(file_manager.os, 'urandom', lambda n: draws.append(n) or urandom(n))
+    assert TemporaryFileManager._secure_delete_files(paths + [os.path.join(temp_test_dir, 'missing')]) == 20
+
+    assert not any(os.path.exists(path) for path in paths)
+    assert len(draws) < 10 and sum(draws) < 20 * 1024 * 2
+
+def test_deletion_queue_deletes_in_the_background_and_drains(temp_test_dir):
+    from app.utils.file_manager import DeletionQueue
+    directory = os.path.join(temp_test_dir, 'deleting_x')
+    os.makedirs(directory)
+    paths = [os.path.join(temp_test_dir, f'export_{i}.csv') for i in range(3)] + [os.path.join(directory, 'chart.png')]
+    for path in paths:
+        with open(path, 'w') as f:
+            f.write('data')
+
+    deleter = DeletionQueue(maxsize=10)
+    assert deleter.submit(paths[0])
+    deleter.join()
+    assert not os.path.exists(paths[0])
+
+    assert all(deleter.submit(path) for path in paths[1:3] + [directory])
+    deleter.drain()
+    assert not any(os.path.exists(path) for path in paths) and not os.path.exists(directory)
+    # Once drained, paths are deleted synchronously
+    with open(paths[0], 'w') as f:
+        f.write('data')
+    assert not deleter.submit(paths[0]) and not os.path.exists(paths[0])
+
+def test_deletion_queue_falls_back_to_synchronous_deletes_when_full(temp_test_dir, caplog):
+    from unittest.mock import patch
+    from app.utils.file_manager import DeletionQueue
+    paths = [os.path.join(temp_test_dir, f'export_{i}.csv') for i in range(2)]
+    for path in paths:
+        with open(path, 'w') as f:
+            f.write('data')
+
+    deleter = DeletionQueue(maxsize=1)
+    with patch.object(deleter, '_ensure_worker', return_value=True):  # no worker: the queue stays full
+        assert deleter.submit(paths[0])
+        assert not deleter.submit(paths[1])
+    assert os.path.exists(paths[0]) and not os.path.exists(paths[1])
+    assert "Deletion queue full" in caplog.text
+    deleter.drain()
+    assert not os.path.exists(paths[0])
+
+def test_ended_session_directory_is_renamed_then_purged(client, temp_test_dir):
+    from unittest.mock import patch
+    from app.utils.file_manager import deletion_queue
+    with patch('tempfile.gettempdir', return_value=temp_test_dir):
+        user_dir = os.path.join(TemporaryFileManager.get_base_temp_dir(), 'user_ended_session')
+        os.makedirs(user_dir)
+        with open(os.path.join(user_dir, 'export.csv'), 'w') as f:
+            f.write('data')
+
+        with patch.object(deletion_queue, 'submit') as submit:
+            TemporaryFileManager.cleanup_user_files_immediately('ended_session')
+        assert not os.path.exists(user_dir)
+        deleting_dir, = submit.call_args.args
+        assert os.path.basename(deleting_dir).startswith(TemporaryFileManager.DELETING_PREFIX)
+
+        deletion_queue.submit(deleting_dir)
+        deletion_queue.join()
+        assert os.listdir(TemporaryFileManager.get_base_temp_dir()) == []
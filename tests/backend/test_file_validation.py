@@ -0,0 +1,56 @@
+import pandas as pd
+import numpy as np
+from app.utils.file_validation import (
+    sanitize_for_spreadsheet,
+    sanitize_series_for_spreadsheet,
+    sanitize_dataframe_for_spreadsheet,
+)
+
+def test_sanitize_series_matches_scalar_sanitizer():
+    """The vectorised sanitiser must produce exactly what the per-cell version does."""
+    values = ['=SUM(A1)', '+1', '-2', '@cmd', 'safe', '', None, np.nan, 42, "'quoted"]
+    series = pd.Series(values, dtype=object)
+
+    expected = series.apply(sanitize_for_spreadsheet)
+    result = sanitize_series_for_spreadsheet(series)
+
+    assert result.tolist()[:6] == expected.tolist()[:6]
+    assert result.iloc[6] is None
+    assert pd.isna(result.iloc[7])
+    assert result.iloc[8] == 42
+    assert result.iloc[9] == "'quoted"
+
+def test_sanitize_series_returns_input_when_nothing_matches():
+    series = pd.Series(['a', 'b', None], dtype=object)
+    assert sanitize_series_for_spreadsheet(series) is series
+
+def test_sanitize_dataframe_shares_untouched_columns():
+    """Only columns that contain formula-like cells are rebuilt."""
+    df = pd.DataFrame({
+        'title': ['=HYPERLINK("x")', 'normal'],
+        'channel': ['a', 'b'],
+        'count': [1, 2],
+    })
+
+    result = sanitize_dataframe_for_spreadsheet(df)
+
+    assert result['title'].tolist() == ['\'=HYPERLINK("x")', 'normal']
+    assert df['title'].iloc[0] == '=HYPERLINK("x")'  # input left untouched
+    assert np.shares_memory(result['count'].values, df['count'].values)
+
+def test_sanitize_dataframe_without_matches_is_noop():
+    df = pd.DataFrame({'title': ['a', 'b'], 'count': [1, 2]})
+    assert sanitize_dataframe_for_spreadsheet(df) is df
+
+def test_size_check_hashes_the_upload_in_the_same_pass():
+    import io
+    import hashlib
+    from app.utils.file_validation import validate_file_size
+
+    stream = io.BytesIO(b'{"a": 1}')
+    stream.read(3)
+    digest = hashlib.sha256()
+
+    assert validate_file_size(stream, digest=digest, chunk_size=2)
+    assert digest.hexdigest() == hashlib.sha256(b'{"a": 1}').hexdigest()
+    assert stream.tell() == 0
@@ -2,7 +2,7 @@ import pytest
 import os
 import json
 import pandas as pd
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 from werkzeug.datastructures import FileStorage
 from app.handlers.instagram import process_instagram_file
 from app.handlers.generate_synthetic_data import generate_synthetic_data
@@ -10,7 +10,7 @@ from app.handlers.generate_synthetic_data import generate_synthetic_data
 @pytest.fixture
 def mock_user_temp_dir(tmp_path):
     """Mock the get_user_temp_dir to return a temporary directory."""
-    with patch('app.handlers.instagram.get_user_temp_dir', return_value=str(tmp_path)):
+    with patch('app.utils.output_sink.get_user_temp_dir', return_value=str(tmp_path)):
         with patch('app.handlers.generate_synthetic_data.get_user_temp_dir', return_value=str(tmp_path)):
             yield str(tmp_path)
 
@@ -53,20 +53,16 @@ def test_process_instagram_file_with_synthetic_data(synthetic_instagram_data, mo
     """Test processing of synthetically generated Instagram data."""
     
     # Mock plotting to avoid GUI issues during test
-    with patch('app.handlers.instagram.plt.subplots') as mock_subplots, \
-         patch('app.handlers.instagram.save_image_temp_file', return_value='mock_chart.png'), \
-         patch('app.handlers.instagram.safe_save_file', return_value='mock_safe_file.csv'):
+    with patch('app.handlers.instagram.render_charts', side_effect=lambda specs, sink: ['mock_chart.png'] * len(specs)) as mock_render, \
+         patch('app.utils.output_sink.save_dataset_snapshot', return_value='mock_export'):
         
-        mock_fig = MagicMock()
-        mock_ax = MagicMock()
-        mock_subplots.return_value = (mock_fig, mock_ax)
-        
-        # Call the processing function
-        # process_instagram_file returns many values, let's unpack them
-        df, unique_filename, insights, bump_chart, day_heatmap, month_heatmap, time_heatmap, preview_data, has_valid_data = process_instagram_file(synthetic_instagram_data)
+        result = process_instagram_file(synthetic_instagram_data)
+
+    df, insights, preview_data = result.df, result.insights, result.preview
 
     # Assertions
-    assert has_valid_data is True
+    assert result.has_valid_data is True
+    assert len(mock_render.call_args.args[0]) == 4
     assert not df.empty
     assert 'category' in df.columns
     assert 'timestamp' in df.columns
@@ -80,7 +76,7 @@ def test_process_instagram_file_with_synthetic_data(synthetic_instagram_data, mo
     assert insights['unique_authors'] > 0
     
     # Verify exports
-    assert unique_filename.endswith('.csv')
+    assert result.export('csv').endswith('.csv')
     assert isinstance(preview_data, dict)
     assert 'rows' in preview_data
     assert len(preview_data['rows']) > 0
@@ -90,11 +86,11 @@ def test_process_instagram_file_empty():
     files = []
     
     # Expect empty results, not an error
-    df, unique_filename, insights, bump_chart, day_heatmap, month_heatmap, time_heatmap, preview_data, has_valid_data = process_instagram_file(files)
+    result = process_instagram_file(files)
     
-    assert df.empty
-    assert has_valid_data is False
-    assert insights == {}
+    assert result.df.empty
+    assert result.has_valid_data is False
+    assert result.insights == {}
 
 def test_process_instagram_file_invalid_json(mock_user_temp_dir):
     """Test processing with an invalid JSON file."""
@@ -105,8 +101,8 @@ def test_process_instagram_file_invalid_json(mock_user_temp_dir):
     )
     
     # Should handle gracefully and return empty/fail state if no other valid files
-    df, unique_filename, insights, bump_chart, day_heatmap, month_heatmap, time_heatmap, preview_data, has_valid_data = process_instagram_file([bad_json])
+    result = process_instagram_file([bad_json])
     
-    assert df.empty
-    assert has_valid_data is False
+    assert result.df.empty
+    assert result.has_valid_data is False
 
@@ -0,0 +1,48 @@
+import os
+from unittest.mock import patch
+import pandas as pd
+from werkzeug.datastructures import FileStorage
+from app import charts
+from app.handlers.youtube import process_youtube_file
+from app.handlers.tiktok import process_tiktok_file
+from app.handlers.generate_synthetic_data import generate_synthetic_data
+from app.utils.file_manager import output_directory
+from app.utils.output_sink import DirectorySink, MemorySink, NullSink
+
+def _upload(tmp_path, platform, filename):
+    with output_directory(str(tmp_path)):
+        generate_synthetic_data('techie', 'low', filename, platform=platform)
+    with open(os.path.join(tmp_path, filename), 'rb') as f:
+        return [FileStorage(stream=pd.io.common.BytesIO(f.read()), filename=filename, content_type='application/json')]
+
+def test_null_sink_skips_charts_and_exports(tmp_path):
+    files = _upload(tmp_path, 'youtube', 'watch-history.json')
+
+    with patch.object(charts, 'chart_image') as chart_image:
+        result = process_youtube_file(files, NullSink())
+
+    chart_image.assert_not_called()
+    assert result.insights['total_videos'] == len(result.df)
+    assert all(name is None for name in result.charts.values())
+    assert result.exports == {}
+    assert result.export('csv') == ''
+
+def test_memory_sink_keeps_outputs_in_memory(tmp_path):
+    files = _upload(tmp_path, 'tiktok', 'user_data.json')
+    sink = MemorySink()
+
+    result = process_tiktok_file(files, sink)
+
+    assert sorted(sink.charts) == sorted(result.charts.values())
+    assert all(image.startswith(b'\x89PNG') for image in sink.charts.values())
+    export_id = result.export('csv').rsplit('.', 1)[0]
+    assert len(sink.datasets[export_id]) == len(result.df)
+
+def test_directory_sink_builds_exports(tmp_path):
+    files = _upload(tmp_path, 'tiktok', 'user_data.json')
+    out = tmp_path / 'out'
+
+    result = process_tiktok_file(files, DirectorySink(str(out)))
+
+    assert result.exports == {'csv': 'tiktok.csv', 'xlsx': 'tiktok.xlsx', 'txt': 'tiktok.txt'}
+    assert set(os.listdir(out)) == set(result.exports.values()) | set(result.charts.values())
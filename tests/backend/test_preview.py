@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from app.utils.dataset import ColumnarDataset
+from app.utils.preview import DatasetPreview
+from app.utils.file_manager import TemporaryFileManager
+
+def _preview():
+    df = pd.DataFrame({
+        'video_title': ['Cats', 'dogs', None, 'Cat videos', 'Birds'],
+        'channel': ['Pets', 'Pets', 'Nature', None, 'Nature'],
+        'timestamp': pd.to_datetime(['2023-01-03', '2023-01-01', None, '2023-01-02', '2023-01-05']).tz_localize('UTC'),
+        'year': [2023, 2021, 2022, 2020, 2024],
+    })
+    return DatasetPreview(ColumnarDataset.from_frame(df))
+
+def test_pagination_without_sort_or_filter():
+    page = _preview().page(offset=1, limit=2)
+
+    assert page['total'] == 5
+    assert [row[0] for row in page['rows']] == ['dogs', None]
+    assert page['rows'][0][2] == '2023-01-01T00:00:00+00:00'
+
+def test_sort_puts_missing_values_last():
+    preview = _preview()
+
+    titles = [row[0] for row in preview.page(sort='video_title')['rows']]
+    years = [row[3] for row in preview.page(sort='year', descending=True)['rows']]
+    dates = [row[2] for row in preview.page(sort='timestamp')['rows']]
+
+    assert titles == ['Birds', 'Cat videos', 'Cats', 'dogs', None]
+    assert years == [2024, 2023, 2022, 2021, 2020]
+    assert dates[-1] is None
+
+def test_filter_is_case_insensitive_and_combines_with_sort():
+    preview = _preview()
+
+    page = preview.page(query='CAT', sort='year')
+    channel_page = preview.page(query='nature', column_name='channel')
+
+    assert page['total'] == 2
+    assert [row[0] for row in page['rows']] == ['Cat videos', 'Cats']
+    assert [row[0] for row in channel_page['rows']] == [None, 'Birds']
+    assert preview.filter_mask('cat') is preview.filter_mask('Cat')
+
+def test_sort_orders_are_memoised():
+    preview = _preview()
+    assert preview.sort_order('channel') is preview.sort_order('channel')
+    assert np.array_equal(preview.sort_order('year'), [3, 1, 2, 0, 4])
+
+def test_sort_orders_are_built_with_the_preview():
+    preview = _preview()
+
+    with patch('app.utils.preview._ascending_order', side_effect=AssertionError('sorted on request')):
+        page = preview.page(sort='channel', descending=True)
+
+    assert [row[1] for row in page['rows']][:2] == [None, 'Pets']
+
+def test_preview_route(client, temp_test_dir):
+    user_id = 'test_preview_user'
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['authenticated'] = True
+
+    with patch('tempfile.gettempdir', return_value=temp_test_dir):
+        user_temp_path = os.path.join(TemporaryFileManager.get_base_temp_dir(), f"user_{user_id}")
+        os.makedirs(user_temp_path, exist_ok=True)
+        _preview().dataset.save(os.path.join(user_temp_path, 'abc.npz'))
+
+        response = client.get('/preview/abc?q=cat&limit=1')
+        missing = client.get('/preview/unknown')
+        bad_sort = client.get('/preview/abc?sort=nope')
+
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 2
+    assert len(response.get_json()['rows']) == 1
+    assert missing.status_code == 404
+    assert bad_sort.status_code == 400
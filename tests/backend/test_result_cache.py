@@ -0,0 +1,103 @@
+import io
+import re
+import json
+from unittest.mock import patch
+from app.utils.result_cache import ResultCache
+
+def test_lru_eviction_is_bounded_by_total_bytes():
+    cache = ResultCache(max_bytes=100, ttl_seconds=60)
+    cache.put('user_a', 'one', 'first', 40)
+    cache.put('user_b', 'two', 'second', 40)
+    cache.get('user_a', 'one')  # 'one' becomes most recently used
+    cache.put('user_a', 'three', 'third', 40)
+
+    assert cache.get('user_b', 'two') is None
+    assert cache.get('user_a', 'one') == 'first'
+    assert cache.total_bytes == 80
+    assert cache.put('user_a', 'huge', 'x', 101) is False
+
+def test_entries_expire_after_ttl(fake_clock):
+    cache = ResultCache(max_bytes=100, ttl_seconds=30, clock=fake_clock)
+    cache.put('user_a', 'key', 'value', 10)
+
+    fake_clock.now = 29
+    assert cache.get('user_a', 'key') == 'value'
+    fake_clock.now = 30
+    assert cache.get('user_a', 'key') is None
+    assert cache.total_bytes == 0
+
+def test_expired_entries_are_swept_without_a_get(monkeypatch, fake_clock):
+    from app.utils import result_cache as result_cache_module
+    from app.utils.file_manager import TemporaryFileManager
+    cache = ResultCache(max_bytes=100, ttl_seconds=30, clock=fake_clock)
+    monkeypatch.setattr(result_cache_module, 'result_cache', cache)
+    cache.put('user_a', 'key', 'value', 10)
+    fake_clock.now = 20
+    cache.put('user_b', 'key', 'value', 10)
+
+    fake_clock.now = 30
+    assert TemporaryFileManager.purge_expired_memory() == 1
+    assert len(cache) == 1
+    assert cache.total_bytes == 10
+    assert cache.get('user_b', 'key') == 'value'
+
+def test_purge_user_only_drops_that_session():
+    cache = ResultCache(max_bytes=100, ttl_seconds=60)
+    cache.put('user_a', 'one', 1, 10)
+    cache.put('user_a', 'two', 2, 10)
+    cache.put('user_b', 'one', 3, 10)
+
+    assert cache.purge_user('user_a') == 2
+    assert cache.get('user_b', 'one') == 3
+    assert len(cache) == 1
+
+def test_dashboard_rerenders_from_cache_until_session_cleanup(client, temp_test_dir):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'test_cache_user'
+        sess['authenticated'] = True
+
+    youtube_data = [{
+        "header": "YouTube",
+        "title": "Watched Test Video",
+        "titleUrl": "https://www.youtube.com/watch?v=123",
+        "time": "2023-01-01T12:00:00.000Z",
+        "products": ["YouTube"]
+    }]
+
+    with patch('tempfile.gettempdir', return_value=temp_test_dir):
+        upload = (io.BytesIO(json.dumps(youtube_data).encode('utf-8')), 'watch-history.json')
+        client.post('/dashboard/youtube', data={'file': upload})
+
+        refreshed = client.get('/dashboard/youtube')
+        client.post('/cleanup-session')
+        after_cleanup = client.get('/dashboard/youtube')
+
+    assert b"Download CSV" in refreshed.data
+    assert b"Download CSV" not in after_cleanup.data
+
+def test_identical_resubmission_is_not_reprocessed(client, temp_test_dir):
+    from app.handlers.youtube import process_youtube_file
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'test_memo_user'
+        sess['authenticated'] = True
+
+    youtube_data = [{
+        "header": "YouTube",
+        "title": "Watched Test Video",
+        "titleUrl": "https://www.youtube.com/watch?v=123",
+        "time": "2023-01-01T12:00:00.000Z",
+        "products": ["YouTube"]
+    }]
+    content = json.dumps(youtube_data).encode('utf-8')
+
+    with patch('tempfile.gettempdir', return_value=temp_test_dir), \
+         patch('app.routes.process_youtube_file', side_effect=process_youtube_file) as mock_process:
+        first = client.post('/dashboard/youtube', data={'file': (io.BytesIO(content), 'watch-history.json')})
+        second = client.post('/dashboard/youtube', data={'file': (io.BytesIO(content), 'renamed.json')})
+        changed = client.post('/dashboard/youtube', data={'file': (io.BytesIO(content + b' '), 'watch-history.json')})
+
+    csv_link = re.compile(rb'download_csv/[\w-]+\.csv')
+    assert mock_process.call_count == 2
+    assert csv_link.search(first.data).group() == csv_link.search(second.data).group()
+    assert b"Download CSV" in changed.data
@@ -0,0 +1,94 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from app.utils.dataset import ColumnarDataset
+from app.utils.preview import DatasetPreview
+from app.utils.file_manager import TemporaryFileManager
+from app.utils.search_index import SearchIndex, tokenize
+
+def _frame():
+    return pd.DataFrame({
+        'video_title': ['Cats and Dogs', 'dogs', None, 'Cat videos', 'Best CATS compilation', 'Cats and Dogs'],
+        'channel': ['Pets TV', 'Pets TV', 'Nature', None, 'Nature cats', 'Other'],
+        'year': [2023, 2021, 2022, 2020, 2024, 2024],
+    })
+
+def test_tokenize_lowercases_and_deduplicates():
+    assert tokenize("Cats, cats & DOGS!") == ['cats', 'dogs']
+
+def test_search_intersects_tokens_across_columns():
+    index = SearchIndex.build(ColumnarDataset.from_frame(_frame()), ['video_title', 'channel'])
+
+    assert index.search('cats').tolist() == [0, 4, 5]
+    assert index.search('dogs cats').tolist() == [0, 5]
+    assert index.search('Pets dogs').tolist() == [0, 1]
+    assert index.search('nature', 'channel').tolist() == [2, 4]
+    assert index.search('cat').tolist() == [3]
+    assert index.search('unknown words').tolist() == []
+
+def test_search_matches_brute_force():
+    rng = np.random.default_rng(3)
+    words = np.array(['news', 'music', 'live', 'tutorial', 'python', 'cooking', 'vlog', 'review'])
+    titles = [' '.join(rng.choice(words, size=rng.integers(1, 5))) for _ in range(3000)]
+    channels = [f"channel {i}" for i in rng.integers(0, 50, size=3000)]
+    df = pd.DataFrame({'video_title': titles, 'channel': channels})
+    index = SearchIndex.build(ColumnarDataset.from_frame(df), ['video_title', 'channel'])
+
+    for query in ['news', 'music live', 'python review vlog', 'channel 7', 'cooking 12']:
+        tokens = tokenize(query)
+        expected = [
+            i for i, (title, channel) in enumerate(zip(titles, channels))
+            if all(t in re.findall(r'\w+', title.lower()) or t in re.findall(r'\w+', channel.lower()) for t in tokens)
+        ]
+        assert index.search(query).tolist() == expected
+
+def test_preview_search_combines_with_sort():
+    preview = DatasetPreview(ColumnarDataset.from_frame(_frame()))
+
+    page = preview.page(search='cats', sort='year', descending=True)
+
+    assert page['total'] == 3
+    assert [row[2] for row in page['rows']] == [2024, 2024, 2023]
+    assert preview.nbytes > preview.dataset.nbytes + preview.search_index.nbytes
+
+def test_search_route(client, temp_test_dir):
+    user_id = 'test_search_user'
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['authenticated'] = True
+
+    with patch('tempfile.gettempdir', return_value=temp_test_dir):
+        user_temp_path = os.path.join(TemporaryFileManager.get_base_temp_dir(), f"user_{user_id}")
+        os.makedirs(user_temp_path, exist_ok=True)
+        ColumnarDataset.from_frame(_frame()).save(os.path.join(user_temp_path, 'abc.npz'))
+
+        response = client.get('/search/abc?q=cats+dogs&limit=1')
+        empty = client.get('/search/abc?q=')
+        bad_column = client.get('/search/abc?q=cats&column=year')
+
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 2
+    assert response.get_json()['rows'] == [['Cats and Dogs', 'Pets TV', 2023]]
+    assert empty.status_code == 400
+    assert bad_column.status_code == 400
+
+def test_search_index_is_built_with_the_snapshot(client, temp_test_dir):
+    from flask import session
+    from app.utils.export import save_dataset_snapshot
+    user_id = 'test_search_snapshot_user'
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['authenticated'] = True
+
+    with patch('tempfile.gettempdir', return_value=temp_test_dir):
+        with client.application.test_request_context():
+            session['user_id'] = user_id
+            export_id = save_dataset_snapshot(_frame(), {'exports': ['csv']}, TemporaryFileManager.get_user_temp_dir())
+
+        with patch.object(SearchIndex, 'build', side_effect=AssertionError('index built on request')):
+            response = client.get(f'/search/{export_id}?q=cats')
+
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 3
@@ -3,7 +3,7 @@ import pytest
 import os
 import json
 import pandas as pd
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 from werkzeug.datastructures import FileStorage
 from app.handlers.tiktok import process_tiktok_file
 from app.handlers.generate_synthetic_data import generate_synthetic_data
@@ -11,7 +11,7 @@ from app.handlers.generate_synthetic_data import generate_synthetic_data
 @pytest.fixture
 def mock_user_temp_dir(tmp_path):
     """Mock the get_user_temp_dir to return a temporary directory."""
-    with patch('app.handlers.tiktok.get_user_temp_dir', return_value=str(tmp_path)):
+    with patch('app.utils.output_sink.get_user_temp_dir', return_value=str(tmp_path)):
         with patch('app.handlers.generate_synthetic_data.get_user_temp_dir', return_value=str(tmp_path)):
             yield str(tmp_path)
 
@@ -35,21 +35,16 @@ def test_process_tiktok_file_with_synthetic_data(synthetic_tiktok_data, mock_use
     """Test processing of synthetically generated TikTok data."""
     
     # Mock plotting and file interactions
-    with patch('app.handlers.tiktok.plt.subplots') as mock_subplots, \
-         patch('app.handlers.tiktok.save_image_temp_file', return_value='mock_chart.png'), \
-         patch('app.handlers.tiktok.safe_save_file', return_value='mock_safe_file.csv'):
+    with patch('app.handlers.tiktok.render_charts', side_effect=lambda specs, sink: ['mock_chart.png'] * len(specs)) as mock_render, \
+         patch('app.utils.output_sink.save_dataset_snapshot', return_value='mock_export'):
         
-        mock_fig = MagicMock()
-        mock_ax = MagicMock()
-        mock_subplots.return_value = (mock_fig, mock_ax)
-        
-        # process_tiktok_file returns: df, csv_name, excel_name, url_name, insights, day_heatmap, time_heatmap, month_heatmap, success, preview
         result = process_tiktok_file(synthetic_tiktok_data)
-        
-        df, csv_name, excel_name, url_name, insights, day_hm, time_hm, month_hm, success, preview = result
+
+    df, insights, preview = result.df, result.insights, result.preview
 
     # Assertions
-    assert success is True
+    assert result.has_valid_data is True
+    assert [spec['type'] for spec in mock_render.call_args.args[0]] == ['heatmap', 'heatmap', 'heatmap']
     assert not df.empty
     assert 'video_title' in df.columns
     assert 'source' in df.columns
@@ -57,9 +52,11 @@ def test_process_tiktok_file_with_synthetic_data(synthetic_tiktok_data, mock_use
     
     # Verify insights
     assert insights['total_videos'] == len(df)
+    assert insights['sessions']['session_count'] >= 1
     
     # Verify exports (mocked names)
-    assert 'mock_safe_file' in csv_name
+    assert result.export('csv') == 'mock_export.csv'
+    assert result.export('txt') == 'mock_export.txt'
     
     assert isinstance(preview, dict)
     assert len(preview['rows']) > 0
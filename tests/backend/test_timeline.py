@@ -0,0 +1,80 @@
+import os
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from werkzeug.datastructures import FileStorage
+from app.handlers import timeline
+from app.handlers.timeline import process_timeline_files, ingest_uploads, build_timeline_cube, TIMELINE_COLUMNS
+from app.handlers.generate_synthetic_data import generate_synthetic_data
+
+@pytest.fixture
+def mock_user_temp_dir(tmp_path):
+    """Mock the get_user_temp_dir to return a temporary directory."""
+    with patch('app.utils.output_sink.get_user_temp_dir', return_value=str(tmp_path)):
+        with patch('app.handlers.generate_synthetic_data.get_user_temp_dir', return_value=str(tmp_path)):
+            yield str(tmp_path)
+
+@pytest.fixture
+def synthetic_uploads(mock_user_temp_dir):
+    """Synthetic exports for all three platforms as (filename, bytes) pairs."""
+    uploads = {}
+    for platform, persona, filename in [('youtube', 'techie', 'watch-history.json'),
+                                        ('tiktok', 'fitness', 'user_data.json'),
+                                        ('instagram', 'career', 'liked_posts.json')]:
+        path = os.path.join(mock_user_temp_dir, filename)
+        generate_synthetic_data(persona, 'low', path, platform=platform)
+        with open(path, 'rb') as f:
+            uploads[platform] = [(filename, f.read())]
+    return uploads
+
+def test_ingest_normalises_all_platforms(synthetic_uploads):
+    df = ingest_uploads(synthetic_uploads)
+
+    assert list(df.columns) == TIMELINE_COLUMNS
+    assert set(df['platform']) == {'youtube', 'tiktok', 'instagram'}
+    assert str(df['timestamp'].dt.tz) == 'UTC'
+    assert df['timestamp'].is_monotonic_increasing
+    assert not df['creator'].isin(['Unknown']).any()
+
+def test_parallel_ingestion_matches_inline(synthetic_uploads, monkeypatch):
+    inline = ingest_uploads(synthetic_uploads)
+
+    monkeypatch.setattr(timeline, 'TIMELINE_PARALLEL_MIN_BYTES', 0)
+    monkeypatch.setattr(timeline.os, 'cpu_count', lambda: 3)
+    parallel = ingest_uploads(synthetic_uploads)
+
+    pd.testing.assert_frame_equal(parallel, inline)
+
+def test_cube_marginals_match_groupby(synthetic_uploads):
+    df = ingest_uploads(synthetic_uploads)
+    cube = build_timeline_cube(df)
+
+    per_platform_day = cube['counts'].sum(axis=(1, 2, 4))
+    expected = df.groupby(['platform', df['timestamp'].dt.dayofweek]).size()
+    for (platform, day), count in expected.items():
+        assert per_platform_day[timeline.TIMELINE_PLATFORMS.index(platform), day] == count
+    assert cube['counts'].sum() == len(df)
+
+def test_process_timeline_files(synthetic_uploads, mock_user_temp_dir):
+    files = {
+        platform: [FileStorage(stream=pd.io.common.BytesIO(content), filename=name) for name, content in uploads]
+        for platform, uploads in synthetic_uploads.items()
+    }
+
+    with patch('app.handlers.timeline.render_charts', side_effect=lambda specs, sink: ['mock_chart.png'] * len(specs)) as mock_render, \
+         patch('app.utils.output_sink.save_dataset_snapshot', return_value='mock_export'):
+
+        result = process_timeline_files(files)
+
+    df, insights = result.df, result.insights
+    assert result.has_valid_data is True
+    assert [spec['type'] for spec in mock_render.call_args.args[0]] == ['heatmap', 'heatmap', 'heatmap', 'stacked_bar']
+    assert insights['total_events'] == len(df)
+    assert sum(insights['platform_counts'].values()) == len(df)
+    assert result.exports == {'csv': 'mock_export.csv', 'xlsx': 'mock_export.xlsx'}
+    assert result.chart('top_creators') == 'mock_chart.png'
+    assert result.preview['columns'] == TIMELINE_COLUMNS
+
+def test_process_timeline_files_empty():
+    with pytest.raises(ValueError):
+        process_timeline_files({})
@@ -3,7 +3,7 @@ import pytest
 import os
 import json
 import pandas as pd
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 from werkzeug.datastructures import FileStorage
 from app.handlers.youtube import process_youtube_file
 from app.handlers.generate_synthetic_data import generate_synthetic_data
@@ -11,7 +11,7 @@ from app.handlers.generate_synthetic_data import generate_synthetic_data
 @pytest.fixture
 def mock_user_temp_dir(tmp_path):
     """Mock the get_user_temp_dir to return a temporary directory."""
-    with patch('app.handlers.youtube.get_user_temp_dir', return_value=str(tmp_path)):
+    with patch('app.utils.output_sink.get_user_temp_dir', return_value=str(tmp_path)):
         with patch('app.handlers.generate_synthetic_data.get_user_temp_dir', return_value=str(tmp_path)):
             yield str(tmp_path)
 
@@ -35,21 +35,17 @@ def test_process_youtube_file_with_synthetic_data(synthetic_youtube_data, mock_u
     """Test processing of synthetically generated YouTube data."""
     
     # Mock plotting and file interactions
-    with patch('app.handlers.youtube.plt.subplots') as mock_subplots, \
-         patch('app.handlers.youtube.save_image_temp_file', return_value='mock_chart.png'), \
-         patch('app.handlers.youtube.safe_save_file', return_value='mock_safe_file.csv'):
+    with patch('app.handlers.youtube.render_charts', side_effect=lambda specs, sink: ['mock_chart.png'] * len(specs)) as mock_render, \
+         patch('app.utils.output_sink.save_dataset_snapshot', return_value='mock_export'):
         
-        mock_fig = MagicMock()
-        mock_ax = MagicMock()
-        mock_subplots.return_value = (mock_fig, mock_ax)
-        
-        # process_youtube_file returns: df, excel_filename, unique_filename, insights, bump_chart_name, day_heatmap_name, month_heatmap_name, time_heatmap_name, not df.empty, preview_data
         result = process_youtube_file(synthetic_youtube_data)
-        
-        df, excel_name, csv_name, insights, bump, day_hm, month_hm, time_hm, success, preview = result
+
+    df, insights, preview = result.df, result.insights, result.preview
 
     # Assertions
-    assert success is True
+    assert result.has_valid_data is True
+    assert set(result.charts) == {'top_channels', 'day_heatmap', 'month_heatmap', 'time_heatmap'}
+    assert [spec['type'] for spec in mock_render.call_args.args[0]] == ['bump', 'heatmap', 'heatmap', 'heatmap']
     assert not df.empty
     assert 'video_title' in df.columns
     assert 'channel' in df.columns
@@ -57,10 +53,10 @@ def test_process_youtube_file_with_synthetic_data(synthetic_youtube_data, mock_u
     
     # Verify insights
     assert insights['total_videos'] == len(df)
+    assert insights['sessions']['session_count'] >= 1
     
     # Verify exports (mocked names)
-    assert 'mock_safe_file' in csv_name
-    # Excel name might come from safe_save_file return or basename logic, check mocked return usage
+    assert result.exports == {'csv': 'mock_export.csv', 'xlsx': 'mock_export.xlsx'}
     
     assert isinstance(preview, dict)
     assert len(preview['rows']) > 0
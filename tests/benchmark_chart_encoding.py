@@ -0,0 +1,78 @@
+"""
+Benchmark: chart render time and file size, savefig(bbox_inches='tight') (previous
+pipeline) vs a single Agg draw encoded by Pillow with different settings.
+
+Run from the repository root:
+
+    PYTHONPATH=src python tests/benchmark_chart_encoding.py [repetitions]
+"""
+import io
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import matplotlib
+
+from app.charts import (DAY_NAMES, MONTH_NAMES, STYLE_CONTEXTS, PERSISTENT_CHART_TYPES, _figure_pixels,
+                        draw_chart, encode_image)
+
+def _specs():
+    rng = np.random.default_rng(0)
+    channels = [f'Channel {i}' for i in range(30)]
+    bump = pd.DataFrame([
+        (year, channels[c], rank + 1, int(rng.integers(10, 900)))
+        for year in range(2015, 2025)
+        for rank, c in enumerate(rng.choice(30, 5, replace=False))
+    ], columns=['year', 'channel', 'rank', 'view_counts'])
+    return {
+        'day heatmap': {'type': 'heatmap', 'size': (8, 2),
+                        'data': pd.DataFrame([rng.integers(0, 900, 7)], index=['Count'], columns=DAY_NAMES)},
+        'month heatmap': {'type': 'heatmap', 'size': (10, 6),
+                          'data': pd.DataFrame(rng.integers(0, 90, (10, 12)), index=range(2015, 2025), columns=MONTH_NAMES)},
+        'bump (10 years)': {'type': 'bump', 'data': bump, 'dpi': 120,
+                            'label_column': 'channel', 'value_column': 'view_counts'},
+    }
+
+def _done(spec, fig):
+    if spec['type'] not in PERSISTENT_CHART_TYPES:
+        fig.clear()
+
+def render_savefig(spec):
+    fig = draw_chart(spec)
+    buffer = io.BytesIO()
+    with matplotlib.rc_context(STYLE_CONTEXTS[spec['type']]):
+        fig.savefig(buffer, bbox_inches='tight', dpi=spec.get('dpi', 100), format='png', pad_inches=0.1)
+    _done(spec, fig)
+    return buffer.getvalue()
+
+def single_draw(**settings):
+    def render(spec):
+        fig = draw_chart(spec)
+        with matplotlib.rc_context(STYLE_CONTEXTS[spec['type']]):
+            pixels = _figure_pixels(fig)
+        _done(spec, fig)
+        return encode_image(pixels, **settings)
+    return render
+
+PIPELINES = {
+    'savefig tight (before)': render_savefig,
+    'png zlib 6': single_draw(image_format='png', compress_level=6, colors=0),
+    'png zlib 1': single_draw(image_format='png', compress_level=1, colors=0),
+    'png 256 colours': single_draw(image_format='png', compress_level=6, colors=256),
+    'webp lossless': single_draw(image_format='webp'),
+}
+
+def main(repetitions: int = 10) -> None:
+    print(f"{'chart':<17}{'pipeline':<24}{'ms':>8}{'KB':>8}")
+    for name, spec in _specs().items():
+        for pipeline, render in PIPELINES.items():
+            image = render(spec)  # warm up
+            start = time.perf_counter()
+            for _ in range(repetitions):
+                render(spec)
+            elapsed = (time.perf_counter() - start) / repetitions * 1000
+            print(f"{name:<17}{pipeline:<24}{elapsed:>8.1f}{len(image) / 1024:>8.1f}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
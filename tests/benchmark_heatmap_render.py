@@ -0,0 +1,73 @@
+"""
+Benchmark: per-chart heatmap render time, seaborn (previous implementation) vs app.charts.
+
+Run from the repository root:
+
+    PYTHONPATH=src python tests/benchmark_heatmap_render.py [repetitions]
+
+Both paths render the same grids to PNG in memory. Seaborn is only imported here,
+to reproduce what the handlers did before; the application no longer depends on
+it, so install it separately (pip install seaborn) to run the comparison.
+"""
+import io
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from app.charts import DAY_NAMES, MONTH_NAMES, TIME_RANGES, draw_chart
+
+def _grids():
+    rng = np.random.default_rng(0)
+    return {
+        'day (1x7)': (pd.DataFrame([rng.integers(0, 900, 7)], index=['Count'], columns=DAY_NAMES), (8, 2)),
+        'time (1x6)': (pd.DataFrame([rng.integers(0, 900, 6)], index=['Count'], columns=TIME_RANGES), (8, 2)),
+        'month (10x12)': (pd.DataFrame(rng.integers(0, 90, (10, 12)), index=range(2015, 2025), columns=MONTH_NAMES), (10, 6)),
+    }
+
+def render_seaborn(data, size):
+    import seaborn as sns
+    fig, ax = plt.subplots(figsize=size)
+    sns.heatmap(data, annot=True, fmt="d", cmap="Blues", ax=ax, cbar=False, linewidths=0, linecolor='none')
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.tick_params(axis='both', which='both', length=0)
+    ax.set_xlabel("")
+    ax.set_ylabel("")
+    plt.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, bbox_inches='tight', dpi=100, format='png', pad_inches=0.1)
+    plt.close(fig)
+    return buffer.getvalue()
+
+def render_charts(data, size):
+    spec = {'type': 'heatmap', 'data': data, 'size': size}
+    fig = draw_chart(spec)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, bbox_inches='tight', dpi=100, format='png', pad_inches=0.1)
+    # Like render_chart, the heatmap figure is kept as is for the next render
+    return buffer.getvalue()
+
+def _time(render, data, size, repetitions):
+    render(data, size)  # warm up (imports, font cache)
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        render(data, size)
+    return (time.perf_counter() - start) / repetitions * 1000
+
+def main(repetitions: int = 20) -> None:
+    start = time.perf_counter()
+    import seaborn  # noqa: F401
+    print(f"seaborn import: {(time.perf_counter() - start) * 1000:.0f} ms (no longer paid by workers)")
+    print(f"{'grid':<15}{'seaborn ms':>12}{'app.charts ms':>15}{'speed-up':>10}")
+    for name, (data, size) in _grids().items():
+        before = _time(render_seaborn, data, size, repetitions)
+        after = _time(render_charts, data, size, repetitions)
+        print(f"{name:<15}{before:>12.1f}{after:>15.1f}{before / after:>9.1f}x")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
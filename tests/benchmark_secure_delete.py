@@ -0,0 +1,70 @@
+"""
+Benchmark: secure deletion time and peak memory, one os.urandom buffer as large
+as the file (previous implementation) vs chunked overwrites from a RandomFill,
+and many small files deleted one by one vs as a batch.
+
+Run from the repository root (SECURE_DELETE_FSYNC=false leaves the disk out):
+
+    PYTHONPATH=src python tests/benchmark_secure_delete.py [directory]
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+from app.utils.file_manager import RandomFill, TemporaryFileManager
+
+SIZES = {'1 KB': 1024, '64 KB': 64 * 1024, '1 MB': 1024 ** 2, '10 MB': 10 * 1024 ** 2, '100 MB': 100 * 1024 ** 2}
+SMALL_FILES = 1000
+
+def delete_whole_buffer(path):
+    file_size = os.path.getsize(path)
+    with open(path, 'wb') as f:
+        f.write(os.urandom(file_size))
+    os.remove(path)
+
+PIPELINES = {
+    'whole-file buffer (before)': delete_whole_buffer,
+    'chunked, fresh random': lambda path: TemporaryFileManager._secure_file_delete(path),
+    'chunked, reused chunk': lambda path: TemporaryFileManager._secure_file_delete(path, RandomFill(fresh=False)),
+}
+
+def _write(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+
+def _measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main(directory):
+    print(f"{'file':<14}{'pipeline':<30}{'ms':>10}{'peak KB':>10}")
+    path = os.path.join(directory, 'benchmark.bin')
+    for name, size in SIZES.items():
+        for pipeline, delete in PIPELINES.items():
+            _write(path, size)
+            elapsed, peak = _measure(lambda: delete(path))
+            print(f"{name:<14}{pipeline:<30}{elapsed:>10.1f}{peak / 1024:>10.0f}")
+
+    paths = [os.path.join(directory, f'small_{i}.bin') for i in range(SMALL_FILES)]
+    for pipeline, run in {
+        'one by one': lambda: [TemporaryFileManager._secure_file_delete(p) for p in paths],
+        'batch': lambda: TemporaryFileManager._secure_delete_files(paths),
+    }.items():
+        for p in paths:
+            _write(p, 1024)
+        elapsed, peak = _measure(run)
+        print(f"{f'{SMALL_FILES} x 1 KB':<14}{pipeline:<30}{elapsed:>10.1f}{peak / 1024:>10.0f}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            main(directory)